@@ -0,0 +1,88 @@
+"""
+Feed handshake messages to a Connection one byte at a time.
+
+The cost per byte should stay flat as the message grows, showing that the
+receive buffer is linear in the number of bytes received. The socksv4 case
+feeds an unbounded userid in 16-byte chunks, checking that the NUL byte
+search resumes where the previous recv stopped.
+
+Usage:
+    python -m benchmarks.bench_buffer [--number N]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import struct
+import timeit
+
+from socks5 import Connection
+from socks5._buffer import ReceiveBuffer
+
+
+def _request(domain_length):
+    domainname = b"a" * domain_length
+    return struct.pack("!BBxBB", 0x5, 0x1, 0x3, domain_length) + domainname + struct.pack("!H", 80)
+
+
+def _trickle(backend, raw_data):
+    conn = Connection(our_role="server", backend=backend)
+    conn._conn.machine.set_state("request")
+    for i in range(len(raw_data)):
+        conn.recv(raw_data[i:i + 1])
+
+
+def _trickle_socks4(backend, header, userid):
+    conn = Connection(our_role="server", backend=backend, max_userid_length=None, max_buffer_size=None)
+    conn._conn.machine.set_state("greeting_request")
+    conn.recv(header)
+    for i in range(0, len(userid), 16):
+        conn.recv(userid[i:i + 16])
+    conn.recv(b"\0")
+
+
+def _concat_bytes(chunks):
+    buf = b""
+    for chunk in chunks:
+        buf += chunk
+
+
+def _receive_buffer(chunks):
+    buf = ReceiveBuffer()
+    for chunk in chunks:
+        buf.append(chunk)
+
+
+def main(number):
+    print("{:<24} {:>8} {:>14}".format("1-byte chunks", "bytes", "ns per byte"))
+    for backend in ("struct", "construct"):
+        for domain_length in (16, 64, 128, 255):
+            raw_data = _request(domain_length)
+            elapsed = min(timeit.repeat(lambda: _trickle(backend, raw_data), number=number, repeat=3))
+            print("{:<24} {:>8} {:>14.1f}".format(
+                "recv " + backend, len(raw_data), elapsed / number / len(raw_data) * 1e9))
+
+    print()
+    print("{:<24} {:>8} {:>14}".format("16-byte chunks", "bytes", "ns per byte"))
+    header = struct.pack("!BBH4B", 0x4, 0x1, 80, 127, 0, 0, 1)
+    for backend in ("struct", "construct"):
+        for userid_length in (256, 4096, 65536):
+            userid = b"a" * userid_length
+            elapsed = min(timeit.repeat(
+                lambda: _trickle_socks4(backend, header, userid), number=max(number // 10, 1), repeat=3))
+            print("{:<24} {:>8} {:>14.1f}".format(
+                "recv socks4 " + backend, userid_length, elapsed / max(number // 10, 1) / userid_length * 1e9))
+
+    print()
+    print("{:<24} {:>8} {:>14}".format("append 1-byte chunks", "bytes", "ns per byte"))
+    for length in (1024, 16384, 65536):
+        chunks = [b"a"] * length
+        for name, func in (("bytes +=", _concat_bytes), ("ReceiveBuffer", _receive_buffer)):
+            elapsed = min(timeit.repeat(lambda: func(chunks), number=10, repeat=3))
+            print("{:<24} {:>8} {:>14.1f}".format(name, length, elapsed / 10 / length * 1e9))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="socks5 receive buffer benchmark")
+    parser.add_argument("--number", dest="number", type=int, help="iterations per sample", default=100)
+    options = parser.parse_args()
+    main(options.number)
@@ -0,0 +1,91 @@
+"""
+Compare the construct and struct codec backends per message type.
+
+Usage:
+    python -m benchmarks.bench_codec [--number N]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import struct
+import timeit
+
+from socks5 import _reader, _writer
+from socks5 import _struct_reader, _struct_writer
+from socks5 import Socks4Request, Socks4Response
+from socks5 import GreetingRequest, GreetingResponse
+from socks5 import Request, Response, UDPDatagram
+from socks5 import AUTH_TYPE, REQ_COMMAND, RESP_STATUS, ADDR_TYPE
+
+READ_SAMPLES = [
+    ("greeting_request", "socks5", struct.pack("!BB2B", 0x5, 0x2, 0x00, 0x02)),
+    ("greeting_request", "socks4", struct.pack("!BBH4B6sB", 0x4, 0x1, 80, 127, 0, 0, 1, b"Johnny", 0)),
+    ("greeting_request", "socks4a", struct.pack("!BBH4B6sB14sB", 0x4, 0x1, 80, 0, 0, 0, 1, b"Johnny", 0, b"www.google.com", 0)),
+    ("greeting_response", "socks5", struct.pack("!BB", 0x5, 0x0)),
+    ("greeting_response", "socks4", struct.pack("!BBH4B", 0, 0x5a, 80, 127, 0, 0, 1)),
+    ("request", "ipv4", struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 80)),
+    ("request", "ipv6", struct.pack("!BBxB8HH", 0x5, 0x1, 0x4, 0, 0, 0, 0, 0, 0, 0, 1, 80)),
+    ("request", "domainname", struct.pack("!BBxBB14sH", 0x5, 0x1, 0x3, 14, b"www.google.com", 80)),
+    ("response", "ipv4", struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 80)),
+    ("udp_datagram", "ipv4", struct.pack("!HBB4BH", 0, 0, 0x1, 127, 0, 0, 1, 53) + b"\x00" * 512),
+]
+
+WRITE_SAMPLES = [
+    ("greeting_request", "socks5", lambda: GreetingRequest([AUTH_TYPE["NO_AUTH"], AUTH_TYPE["USERNAME_PASSWD"]])),
+    ("greeting_request", "socks4", lambda: Socks4Request(REQ_COMMAND["CONNECT"], "127.0.0.1", 80, "Johnny")),
+    ("greeting_response", "socks5", lambda: GreetingResponse(AUTH_TYPE["NO_AUTH"])),
+    ("greeting_response", "socks4", lambda: Socks4Response(RESP_STATUS["REQUEST_GRANTED"], "127.0.0.1", 80)),
+    ("request", "ipv4", lambda: Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], "127.0.0.1", 80)),
+    ("request", "domainname", lambda: Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["DOMAINNAME"], "www.google.com", 80)),
+    ("response", "ipv4", lambda: Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 80)),
+    ("udp_datagram", "ipv4", lambda: UDPDatagram(0, ADDR_TYPE["IPV4"], "127.0.0.1", 53, b"\x00" * 512)),
+]
+
+
+def _measure(func, number):
+    try:
+        func()
+    except Exception as e:
+        return None, e
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6, None
+
+
+def _report(name, variant, construct_result, struct_result):
+    construct_us, error = construct_result
+    struct_us, _ = struct_result
+    if construct_us is None:
+        print("{:<28} {:>12} {:>12.2f} {:>9}  ({})".format(
+            name + " " + variant, "n/a", struct_us, "", type(error).__name__))
+        return
+
+    print("{:<28} {:>12.2f} {:>12.2f} {:>8.1f}x".format(
+        name + " " + variant, construct_us, struct_us, construct_us / struct_us))
+
+
+def main(number):
+    print("{:<28} {:>12} {:>12} {:>9}".format("read", "construct us", "struct us", "speedup"))
+    for name, variant, raw_data in READ_SAMPLES:
+        construct_func = getattr(_reader, "read_" + name)
+        struct_func = getattr(_struct_reader, "read_" + name)
+        _report(
+            name, variant,
+            _measure(lambda: construct_func(raw_data), number),
+            _measure(lambda: struct_func(raw_data), number))
+
+    print()
+    print("{:<28} {:>12} {:>12} {:>9}".format("write", "construct us", "struct us", "speedup"))
+    for name, variant, event_factory in WRITE_SAMPLES:
+        construct_func = getattr(_writer, "write_" + name)
+        struct_func = getattr(_struct_writer, "write_" + name)
+        # NOTE: the construct writer mutates the event, so build a fresh one per call.
+        _report(
+            name, variant,
+            _measure(lambda: construct_func(event_factory()), number),
+            _measure(lambda: struct_func(event_factory()), number))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="socks5 codec benchmark")
+    parser.add_argument("--number", dest="number", type=int, help="iterations per sample", default=10000)
+    options = parser.parse_args()
+    main(options.number)
@@ -0,0 +1,122 @@
+"""
+Measure how fast connections are created and how much memory they hold.
+
+Creation covers Connection() and initiate_connection(). The memory figure is
+the traced allocation per idle connection, and the handshake figure runs a
+full server side socks5 handshake on the struct backend, either on a fresh
+connection or on one taken from a ConnectionPool. The username/password
+handshake is run once with a separate rfc1929 connection and once on a single
+connection created with rfc1929=True. tracemalloc requires python 3.
+
+Usage:
+    python -m benchmarks.bench_connection [--number N]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import timeit
+import tracemalloc
+
+from socks5 import Connection, ConnectionPool, GreetingResponse, Response
+from socks5.define import AUTH_TYPE, ADDR_TYPE, RESP_STATUS
+from socks5.auth import rfc1929
+
+_GREETING_REQUEST = b"\x05\x01\x00"
+_AUTH_GREETING_REQUEST = b"\x05\x01\x02"
+_AUTH_REQUEST = b"\x01\x04user\x08password"
+_REQUEST = b"\x05\x01\x00\x01\x7f\x00\x00\x01\x1f\x90"
+
+
+def _create(factory):
+    conn = factory()
+    conn.initiate_connection()
+    return conn
+
+
+def _handshake(conn):
+    conn.initiate_connection()
+    conn.recv(_GREETING_REQUEST)
+    conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+    conn.recv(_REQUEST)
+    conn.send(Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+
+
+def _fresh_handshake():
+    _handshake(Connection(our_role="server", backend="struct"))
+
+
+def _pooled_handshake(pool):
+    conn = pool.acquire()
+    _handshake(conn)
+    pool.release(conn)
+
+
+def _separate_auth_handshake():
+    conn = Connection(our_role="server", backend="struct")
+    conn.initiate_connection()
+    conn.recv(_AUTH_GREETING_REQUEST)
+    conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+
+    auth_conn = rfc1929.Connection(our_role="server")
+    auth_conn.initiate_connection()
+    auth_conn.recv(conn.trailing_data + _AUTH_REQUEST)
+    auth_conn.send(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"]))
+    conn.auth_end(auth_conn.trailing_data)
+
+    conn.recv(_REQUEST)
+    conn.send(Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+
+
+def _unified_auth_handshake():
+    conn = Connection(our_role="server", backend="struct", rfc1929=True)
+    conn.initiate_connection()
+    conn.recv(_AUTH_GREETING_REQUEST)
+    conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+    conn.recv(_AUTH_REQUEST)
+    conn.send(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"]))
+    conn.recv(_REQUEST)
+    conn.send(Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+
+
+def _bytes_per_connection(factory, count=10000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    conns = [_create(factory) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del conns
+    return (after - before) / count
+
+
+def main(number):
+    factories = (
+        ("socks5 server", lambda: Connection(our_role="server")),
+        ("socks5 client", lambda: Connection(our_role="client")),
+        ("rfc1929 server", lambda: rfc1929.Connection(our_role="server")),
+    )
+
+    print("{:<20} {:>16} {:>12}".format("", "connections/s", "bytes each"))
+    for name, factory in factories:
+        elapsed = min(timeit.repeat(lambda: _create(factory), number=number, repeat=3))
+        print("{:<20} {:>16,.0f} {:>12.0f}".format(name, number / elapsed, _bytes_per_connection(factory)))
+
+    pool = ConnectionPool(lambda: Connection(our_role="server", backend="struct"))
+    print()
+    print("{:<20} {:>16}".format("", "handshakes/s"))
+    for name, func in (("fresh", _fresh_handshake), ("pooled", lambda: _pooled_handshake(pool))):
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        print("{:<20} {:>16,.0f}".format(name, number / elapsed))
+    print("pool reuse rate: {:.4f}".format(pool.reuse_rate))
+
+    print()
+    print("{:<20} {:>16}".format("rfc1929", "handshakes/s"))
+    for name, func in (("separate", _separate_auth_handshake), ("unified", _unified_auth_handshake)):
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        print("{:<20} {:>16,.0f}".format(name, number / elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="socks5 connection benchmark")
+    parser.add_argument("--number", dest="number", type=int, help="iterations per sample", default=10000)
+    options = parser.parse_args()
+    main(options.number)
@@ -0,0 +1,54 @@
+"""
+Compare the idna codec with the domain name cache.
+
+The destinations are drawn from a pool of hot domain names, so the cached
+path mostly costs a dict lookup, while the codec path runs idna every time.
+Received names are decoded without a cache, there is nothing to compare.
+
+Usage:
+    python -m benchmarks.bench_domain [--number N] [--domains N]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import random
+import timeit
+
+from socks5 import _domain as domain
+
+
+def _names(count):
+    rng = random.Random(1928)
+    pool = ["host{0}.example{1}.com".format(i, i % 7) for i in range(count)]
+    return [rng.choice(pool) for _ in range(10000)]
+
+
+def _codec_encode(names):
+    for name in names:
+        name.encode("idna")
+
+
+def _cached_encode(names):
+    for name in names:
+        domain.encode(name)
+
+
+def main(number, domains):
+    domain.clear()
+    names = _names(domains)
+
+    print("{:<12} {:>12} {:>12} {:>9} {:>9}".format("", "codec ns", "cached ns", "speedup", "hit rate"))
+    codec_time = min(timeit.repeat(lambda: _codec_encode(names), number=number, repeat=3))
+    cached_time = min(timeit.repeat(lambda: _cached_encode(names), number=number, repeat=3))
+    per_call = number * len(names)
+    print("{:<12} {:>12.1f} {:>12.1f} {:>8.1f}x {:>9.4f}".format(
+        "encode", codec_time / per_call * 1e9, cached_time / per_call * 1e9, codec_time / cached_time,
+        domain.cache_info().hit_rate))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="socks5 domain name cache benchmark")
+    parser.add_argument("--number", dest="number", type=int, help="iterations per sample", default=10)
+    parser.add_argument("--domains", dest="domains", type=int, help="number of distinct domains", default=2000)
+    options = parser.parse_args()
+    main(options.number, options.domains)
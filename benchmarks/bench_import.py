@@ -0,0 +1,69 @@
+"""
+Measure the startup cost of socks5 in fresh interpreters.
+
+import time is the cumulative "socks5" entry reported by
+``python -X importtime -c "import socks5"``, which requires python 3.7.
+First handshake is the time from the start of the import to the end of a full
+server side handshake, so it includes whatever the import deferred.
+
+Usage:
+    python -m benchmarks.bench_import [--runs N]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import sys
+import argparse
+import subprocess
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FIRST_HANDSHAKE = """
+import time
+start = time.perf_counter()
+from socks5 import Connection, GreetingResponse, Response
+from socks5.define import AUTH_TYPE, ADDR_TYPE, RESP_STATUS
+conn = Connection(our_role="server", backend={backend!r})
+conn.initiate_connection()
+conn.recv(b"\\x05\\x01\\x00")
+conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+conn.recv(b"\\x05\\x01\\x00\\x01\\x7f\\x00\\x00\\x01\\x1f\\x90")
+conn.send(Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+print(time.perf_counter() - start)
+"""
+
+
+def _run(args):
+    return subprocess.run(
+        [sys.executable] + args, cwd=_ROOT, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def _import_time():
+    stderr = _run(["-X", "importtime", "-c", "import socks5"]).stderr
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "socks5":
+            return int(fields[1]) / 1000
+    raise RuntimeError("socks5 not found in the importtime output")
+
+
+def _first_handshake(backend):
+    return float(_run(["-c", _FIRST_HANDSHAKE.format(backend=backend)]).stdout) * 1000
+
+
+def main(runs):
+    print("{:<32} {:>10}".format("median of {} runs".format(runs), "ms"))
+    samples = sorted(_import_time() for _ in range(runs))
+    print("{:<32} {:>10.2f}".format("import socks5", samples[runs // 2]))
+
+    for backend in ("struct", "construct"):
+        samples = sorted(_first_handshake(backend) for _ in range(runs))
+        print("{:<32} {:>10.2f}".format("first handshake, " + backend, samples[runs // 2]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="socks5 startup benchmark")
+    parser.add_argument("--runs", dest="runs", type=int, help="interpreter runs per sample", default=11)
+    options = parser.parse_args()
+    main(options.runs)
@@ -0,0 +1,100 @@
+"""
+Compare the rfc1929 codec with the construct definitions it replaced.
+
+The construct column parses or builds with socks5.auth.rfc1929._data_structure
+and goes through the validating event constructors, like the reader and the
+writer used to. The handshake rows run a full server side exchange.
+
+Usage:
+    python -m benchmarks.bench_rfc1929 [--number N]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import struct
+import sys
+import timeit
+
+from socks5.define import RESP_STATUS
+from socks5.auth.rfc1929 import Connection, AuthRequest, AuthResponse
+from socks5.auth.rfc1929 import _data_structure as data_structure
+from socks5.auth.rfc1929._reader import read_auth_request, read_auth_response
+from socks5.auth.rfc1929._writer import write_auth_request, write_auth_response
+
+if sys.version_info.major <= 2:
+    string_func = unicode
+else:
+    string_func = str
+
+AUTH_REQUEST = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+AUTH_RESPONSE = struct.pack("!BB", 0x1, 0x0)
+
+
+def _construct_read_auth_request(data):
+    parsed_data = data_structure.AuthRequest.parse(data)
+    return AuthRequest(
+        string_func(parsed_data["username"], encoding="ascii"),
+        string_func(parsed_data["password"], encoding="ascii"))
+
+
+def _construct_read_auth_response(data):
+    return AuthResponse(data_structure.AuthResponse.parse(data)["status"])
+
+
+def _construct_write_auth_request(event):
+    return data_structure.AuthRequest.build(dict(
+        version=1, username=event.username.encode("ascii"), password=event.password.encode("ascii")))
+
+
+def _construct_write_auth_response(event):
+    return data_structure.AuthResponse.build(dict(version=1, status=event.status))
+
+
+def _handshake(conn):
+    conn.reset()
+    conn.initiate_connection()
+    event = conn.recv(AUTH_REQUEST)
+    event.username
+    event.password
+    conn.send(AuthResponse(RESP_STATUS["SUCCESS"]))
+
+
+def _measure(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def main(number):
+    auth_request = AuthRequest("user", "password")
+    auth_response = AuthResponse(RESP_STATUS["SUCCESS"])
+    samples = [
+        ("read auth_request",
+         # NOTE: the fields of a wire-backed event are decoded on access, touch them.
+         lambda: _construct_read_auth_request(AUTH_REQUEST).password,
+         lambda: read_auth_request(AUTH_REQUEST).password),
+        ("read auth_response",
+         lambda: _construct_read_auth_response(AUTH_RESPONSE),
+         lambda: read_auth_response(AUTH_RESPONSE)),
+        ("write auth_request",
+         lambda: _construct_write_auth_request(auth_request),
+         lambda: write_auth_request(auth_request)),
+        ("write auth_response",
+         lambda: _construct_write_auth_response(auth_response),
+         lambda: write_auth_response(auth_response)),
+    ]
+
+    print("{:<28} {:>12} {:>12} {:>9}".format("", "construct us", "rfc1929 us", "speedup"))
+    for name, construct_func, func in samples:
+        construct_us = _measure(construct_func, number)
+        us = _measure(func, number)
+        print("{:<28} {:>12.2f} {:>12.2f} {:>8.1f}x".format(name, construct_us, us, construct_us / us))
+
+    conn = Connection(our_role="server")
+    print()
+    print("{:<28} {:>12.2f}".format("server handshake us", _measure(lambda: _handshake(conn), number)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="rfc1929 codec benchmark")
+    parser.add_argument("--number", dest="number", type=int, help="iterations per sample", default=10000)
+    options = parser.parse_args()
+    main(options.number)
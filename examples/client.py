@@ -27,7 +27,7 @@ def do_socks_protocol(sock):
     sock.send(_data)
 
     while True:
-        _data = sock.recv(1024)
+        _data = sock.recv(socks_conn.bytes_needed())
         _event = socks_conn.recv(_data)
 
         if _event != "NeedMoreData":
@@ -41,7 +41,7 @@ def do_socks_protocol(sock):
     sock.send(_data)
 
     while True:
-        _data = sock.recv(1024)
+        _data = sock.recv(socks_conn.bytes_needed())
         _event = socks_conn.recv(_data)
 
         if _event != "NeedMoreData":
@@ -13,14 +13,22 @@ from socks5 import Connection, Socks4Response, GreetingResponse, Response
 from socks5 import AUTH_TYPE, RESP_STATUS, ADDR_TYPE
 
 
+async def recv_event(client, conn):
+    # NOTE: read exactly what the current message still needs.
+    while True:
+        data = await client.recv(conn.bytes_needed())
+        _event = conn.recv(data)
+        if _event != "NeedMoreData":
+            return _event
+
+
 async def socks5_handler(client, addr):
     print("client connect from address: {}".format(addr))
     conn = Connection(our_role="server")
     conn.initiate_connection()
 
     # greeting request
-    data = await client.recv(1024)
-    _event = conn.recv(data)
+    _event = await recv_event(client, conn)
     print("receiving event: {}".format(_event))
 
     # greeting response
@@ -31,8 +39,7 @@ async def socks5_handler(client, addr):
         await client.send(data)
 
         # socks request
-        data = await client.recv(1024)
-        _event = conn.recv(data)
+        _event = await recv_event(client, conn)
         print("receiving event: {}".format(_event))
 
         # socks response
@@ -0,0 +1,59 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from socks5 import GreetingResponse, Response
+from socks5 import AUTH_TYPE, RESP_STATUS
+from socks5 import Connection
+from socks5.auth.rfc1929 import AuthResponse
+import socket
+
+USERS = {"user": "password"}
+
+
+def next_event(conn, sock, replies):
+    """
+    Return the next event, answering from the buffered data when the client
+    pipelined its messages. The coalesced replies are only written out when
+    the server has to wait for the client.
+    """
+    data = b""
+    while True:
+        events = conn.recv_events(data)
+        if events:
+            return events[0]
+
+        if replies:
+            sock.sendall(replies)
+            del replies[:]
+        data = sock.recv(4096)
+        if not data:
+            raise EOFError("client closed the connection")
+
+
+sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+sock.bind(("127.0.0.1", 5580))
+
+sock.listen(5)
+
+while True:
+    clientsock, address = sock.accept()
+    socks_conn = Connection(our_role="server", rfc1929=True)
+    socks_conn.initiate_connection()
+    replies = bytearray()
+
+    _event = next_event(socks_conn, clientsock, replies)
+    print(_event)
+    replies += socks_conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+
+    _event = next_event(socks_conn, clientsock, replies)
+    print(_event)
+    if USERS.get(_event.username) != _event.password:
+        replies += socks_conn.send(AuthResponse(RESP_STATUS["GENRAL_FAILURE"]))
+        clientsock.sendall(replies)
+        clientsock.close()
+        continue
+    replies += socks_conn.send(AuthResponse(RESP_STATUS["SUCCESS"]))
+
+    _event = next_event(socks_conn, clientsock, replies)
+    print(_event)
+    replies += socks_conn.send(Response(RESP_STATUS["SUCCESS"], _event.atyp, _event.addr, _event.port))
+    clientsock.sendall(replies)
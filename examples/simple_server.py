@@ -16,7 +16,7 @@ while True:
     socks_conn.initiate_connection()
 
     while True:
-        data = clientsock.recv(1024)
+        data = clientsock.recv(socks_conn.bytes_needed())
         _event = socks_conn.recv(data)
         if _event != "NeedMoreData":
             break
@@ -30,7 +30,7 @@ while True:
     clientsock.send(_data)
 
     while True:
-        data = clientsock.recv(1024)
+        data = clientsock.recv(socks_conn.bytes_needed())
         _event = socks_conn.recv(data)
         if _event != "NeedMoreData":
             break
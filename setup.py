@@ -40,7 +40,6 @@ Documentation: https://github.com/mike820324/socks5/blob/master/README.md
     include_package_data=True,
     install_requires=[
         "ipaddress==1.0.16",
-        "transitions==0.4.1",
         "construct==2.8.8"
     ]
 )
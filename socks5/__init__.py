@@ -1,6 +1,51 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import sys
+import importlib
+
 from socks5.define import *
-from socks5.events import *
 from socks5.exception import *
-from socks5.connection import Connection
+
+# NOTE: the events, the connection and their codecs are imported on first
+# attribute access, so that a bare "import socks5" stays cheap.
+_LAZY_ATTRIBUTES = {
+    "NeedMoreData": ("socks5.events", "NeedMoreData"),
+    "Socks4Request": ("socks5.events", "Socks4Request"),
+    "Socks4Response": ("socks5.events", "Socks4Response"),
+    "GreetingRequest": ("socks5.events", "GreetingRequest"),
+    "GreetingResponse": ("socks5.events", "GreetingResponse"),
+    "Request": ("socks5.events", "Request"),
+    "Response": ("socks5.events", "Response"),
+    "UDPDatagram": ("socks5.events", "UDPDatagram"),
+    "Connection": ("socks5.connection", "Connection"),
+    "ConnectionPool": ("socks5.pool", "ConnectionPool"),
+    "domain_cache_info": ("socks5._domain", "cache_info"),
+}
+
+
+# NOTE: python2 requires native str in __all__.
+__all__ = [str(name) for name in [
+    "AUTH_TYPE", "REQ_COMMAND", "RESP_STATUS", "ADDR_TYPE", "EVENT_TAG",
+    "ParserError", "ProtocolError",
+] + sorted(_LAZY_ATTRIBUTES)]
+
+
+def _load(name):
+    module_name, attr = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in _LAZY_ATTRIBUTES:
+            raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+        return _load(name)
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+else:
+    # NOTE: module level __getattr__ needs python 3.7, import everything upfront.
+    for _name in _LAZY_ATTRIBUTES:
+        _load(_name)
@@ -0,0 +1,91 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+
+def check_space(buf, offset, length):
+    """
+    Raise ValueError when buf cannot hold length bytes at offset.
+    """
+    if offset < 0 or offset + length > len(buf):
+        raise ValueError("buffer too small, {0} bytes required at offset {1}".format(length, offset))
+
+
+def write_into(data, buf, offset):
+    """
+    Copy already serialized data into buf at offset, return its length.
+    """
+    check_space(buf, offset, len(data))
+    buf[offset:offset + len(data)] = data
+    return len(data)
+
+
+class ReceiveBuffer(object):
+    """
+    A growable receive buffer shared by the connection objects.
+
+    Incoming data is appended to a bytearray in amortized constant time and
+    consumed bytes are only tracked by an offset. The consumed prefix is
+    discarded lazily, either when everything has been consumed or right before
+    the remaining bytes are handed to a reader. Feeding a message one byte at a
+    time therefore costs linear time instead of quadratic.
+
+    Any buffer-protocol object (bytes, bytearray, memoryview, ...) can be fed.
+    When nothing is buffered, feed returns the data itself so it can be parsed
+    without a copy, and only the bytes left over after consume are retained.
+    """
+
+    __slots__ = ("_data", "_start", "_pending")
+
+    def __init__(self):
+        self._data = bytearray()
+        self._start = 0
+        self._pending = None
+
+    def __len__(self):
+        return len(self._data) - self._start
+
+    def append(self, data):
+        self._data += data
+
+    def feed(self, data):
+        """
+        Add the data and return the bytes to parse.
+
+        consume must be called once afterwards with the number of bytes parsed,
+        since the returned object may be the caller-owned data itself.
+        """
+        if not self._data:
+            if not isinstance(data, (bytes, bytearray, memoryview)):
+                data = memoryview(data)
+            self._pending = data
+            return data
+
+        self.append(data)
+        return self.peek()
+
+    def peek(self):
+        """
+        Return the unconsumed bytes.
+
+        The returned bytearray is owned by the buffer and is only valid until
+        the next call to append, feed, consume or clear.
+        """
+        if self._start:
+            del self._data[:self._start]
+            self._start = 0
+        return self._data
+
+    def consume(self, length):
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            if length < len(pending):
+                self._data += pending[length:]
+            return
+
+        self._start += length
+        if self._start >= len(self._data):
+            self.clear()
+
+    def clear(self):
+        del self._data[:]
+        self._start = 0
+        self._pending = None
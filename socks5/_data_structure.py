@@ -32,10 +32,16 @@ AddrType = Enum(
     IPV6=0x04
 )
 
-Requestv4 = Struct(
+# NOTE: the reader only parses the fixed header, the NUL terminated fields are
+# sliced at the NUL bytes found by the framing instead of scanned by CString.
+Requestv4Header = Struct(
     "cmd" / Byte,
     "port" / Int16ub,
     "addr" / BytesInteger(4),
+)
+
+Requestv4 = Struct(
+    Embedded(Requestv4Header),
     "name" / CString(),
     "domainname" / If(this.addr == 1, CString())
 )
@@ -108,3 +114,18 @@ Response = Struct(
     ),
     "port" / Int16ub
 )
+
+UDPHeader = Struct(
+    Padding(2),
+    "frag" / Byte,
+    "atyp" / Byte,
+    "addr" / Switch(
+        this.atyp,
+        {
+            0x1: BytesInteger(4),
+            0x4: BytesInteger(16),
+            0x3: PascalString(Byte)
+        }
+    ),
+    "port" / Int16ub
+)
@@ -0,0 +1,125 @@
+"""
+Cached encoding and decoding of domain names.
+
+The idna codec runs in pure python for every label, while a proxy usually
+talks to a small set of hot destinations. The writers therefore go through a
+bounded, thread-safe LRU cache, so a repeated domain name costs a dict lookup.
+Received names are plain ascii, decoding them is cheaper than a cache lookup,
+so they are only interned and parsed events share one string object per
+hostname.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+from collections import OrderedDict, namedtuple
+
+try:
+    from functools import lru_cache
+except ImportError:
+    lru_cache = None
+
+if sys.version_info.major <= 2:
+    string_func = unicode
+
+    # NOTE: python2 intern only accepts byte strings, the cache still hands
+    # out a single object per hostname.
+    def _intern(value):
+        return value
+else:
+    string_func = str
+    _intern = sys.intern
+
+MAXSIZE = 4096
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize", "hit_rate"])
+
+
+class LRUCache(object):
+    """
+    A bounded least recently used cache of func(key).
+
+    This is the fallback for pythons without functools.lru_cache and exposes
+    the same cache_info and cache_clear methods.
+
+    Args:
+        func (callable): compute the value of a missing key.
+        maxsize (int): the maximum number of entries kept.
+    """
+
+    def __init__(self, func, maxsize=MAXSIZE):
+        # NOTE: threading is only imported for the fallback, it is slow to import.
+        import threading
+
+        self._func = func
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __call__(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                pass
+            else:
+                self._data[key] = value
+                self._hits += 1
+                return value
+
+        # NOTE: func runs outside of the lock, two threads missing the same
+        # key at once only compute it twice.
+        value = self._func(key)
+
+        with self._lock:
+            self._misses += 1
+            self._data[key] = value
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def cache_info(self):
+        with self._lock:
+            return self._hits, self._misses, self._maxsize, len(self._data)
+
+    def cache_clear(self):
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+def _make_cache(func, maxsize=MAXSIZE):
+    if lru_cache is None:
+        return LRUCache(func, maxsize)
+    return lru_cache(maxsize=maxsize)(func)
+
+
+def _info(cache):
+    hits, misses, maxsize, currsize = cache.cache_info()
+    total = hits + misses
+    return CacheInfo(hits, misses, maxsize, currsize, hits / total if total else 0.0)
+
+
+def _encode(name):
+    return name.encode("idna")
+
+
+def decode(data):
+    return _intern(string_func(data, encoding="ascii"))
+
+
+# NOTE: the cache is called directly on the hot path.
+encode = _make_cache(_encode)
+
+
+def cache_info():
+    """
+    Return the CacheInfo tuple of the encode cache.
+    """
+    return _info(encode)
+
+
+def clear():
+    encode.cache_clear()
@@ -0,0 +1,230 @@
+"""
+Length computation for the socks handshake frames.
+
+Each function peeks at the length-determining bytes of the frame at the
+start of data (version, NMETHODS, ATYP, the domain name length octet and the
+socksv4 NUL terminators) and returns the total length of that frame.
+
+When the frame is still incomplete, the returned value is the smallest frame
+length consistent with the bytes seen so far. Therefore ``length - len(data)``
+is the minimum number of bytes still missing, and ``len(data) >= length``
+means the whole frame is available.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import struct
+import operator
+
+from socks5.exception import ParserError
+from socks5.define import ADDR_TYPE, REQ_COMMAND, RESP_STATUS
+
+if sys.version_info.major <= 2:
+    _uint8 = struct.Struct("!B")
+
+    def byte_at(data, offset):
+        return _uint8.unpack_from(data, offset)[0]
+else:
+    byte_at = operator.getitem
+
+SOCKS4_HEADER_LENGTH = 8
+SOCKS5_HEADER_LENGTH = 4
+
+# NOTE: socksv4a use the address 0.0.0.1 to indicate a trailing domain name
+SOCKS4A_ADDR = b"\x00\x00\x00\x01"
+
+# NOTE: the default bounds of the socksv4 NUL terminated fields, without the
+# NUL byte. 255 matches the longest domain name socks5 can carry.
+SOCKS4_MAX_USERID_LENGTH = 255
+SOCKS4_MAX_DOMAIN_LENGTH = 255
+
+# NOTE: the shortest socks5 address is an empty domain name: length octet + port.
+_MIN_ADDR_PORT_LENGTH = 3
+
+_ADDR_LENGTH = {
+    ADDR_TYPE["IPV4"]: 4,
+    ADDR_TYPE["IPV6"]: 16,
+}
+
+# NOTE: the one-byte codes are checked as soon as they arrive, so garbage is
+# rejected without waiting for the rest of the frame.
+_SOCKS4_COMMANDS = frozenset((0x1, 0x2))
+_SOCKS4_STATUSES = frozenset((0x5a, 0x5b, 0x5c, 0x5d))
+_REQ_COMMANDS = frozenset(REQ_COMMAND.values())
+RESP_STATUSES = frozenset(RESP_STATUS.values())
+
+
+def check_code(data, offset, valid_codes, message):
+    if len(data) > offset and byte_at(data, offset) not in valid_codes:
+        raise ParserError(message)
+
+
+def check_ascii(data, start, end, message):
+    """
+    Raise ParserError unless data[start:end] is ascii.
+
+    The events decode their names on first access, so the readers check the
+    bytes while the frame is still being received.
+    """
+    field = bytearray(data[start:end])
+    if field and max(field) > 0x7f:
+        raise ParserError(message)
+
+
+def check_domainname(data, length, func_name):
+    if byte_at(data, 3) == ADDR_TYPE["DOMAINNAME"]:
+        check_ascii(data, SOCKS5_HEADER_LENGTH + 1, length - 2, "{}: Incorrect domain name.".format(func_name))
+
+
+def find_nul(data, offset, end=None):
+    """
+    Return the index of the first NUL byte in data[offset:end], or -1.
+    """
+    if end is None:
+        end = len(data)
+    if isinstance(data, memoryview):
+        # NOTE: memoryview has no find method, copy the range to search it.
+        index = bytes(data[offset:end]).find(b"\0")
+        return index if index < 0 else offset + index
+    return data.find(b"\0", offset, end)
+
+
+def _scan_nul(data, offset, start, max_length, field):
+    """
+    Return the index of the NUL byte terminating the field starting at start,
+    scanning from offset, or -1 when it has not been received yet.
+    """
+    if max_length is None:
+        return find_nul(data, offset)
+
+    # NOTE: the NUL byte of the longest valid field is at start + max_length.
+    limit = start + max_length + 1
+    end = find_nul(data, offset, limit)
+    if end < 0 and len(data) >= limit:
+        raise ParserError("read_greeting_request: {} is too long.".format(field))
+    return end
+
+
+def scan_socks4_request(data, userid_end=-1, offset=SOCKS4_HEADER_LENGTH,
+                        max_userid_length=None, max_domain_length=None):
+    """
+    Compute the length of the socksv4/4a request at the start of data.
+
+    The scan can be resumed when more data has been appended to the same
+    request: pass back the returned userid_end and offset, so that the bytes
+    already searched for a NUL byte are not searched again.
+
+    Args:
+        data (bytes): the buffered bytes, starting with the version byte.
+        userid_end (int): the index of the userid NUL byte, -1 if not found yet.
+        offset (int): the index to resume the search for a NUL byte from.
+        max_userid_length (int): reject a longer userid, None for no bound.
+        max_domain_length (int): reject a longer socksv4a domain name, None
+            for no bound.
+
+    Return:
+        The (length, userid_end, offset) tuple.
+
+    Raise:
+        ParserError: the command is not supported, the userid or the domain
+            name exceeds its bound, or the socksv4a domain name is empty.
+    """
+    check_code(data, 1, _SOCKS4_COMMANDS, "read_greeting_request: Incorrect command.")
+    if len(data) < SOCKS4_HEADER_LENGTH:
+        return SOCKS4_HEADER_LENGTH + 1, userid_end, offset
+
+    is_socks4a = bytes(data[4:8]) == SOCKS4A_ADDR
+    if userid_end < 0:
+        userid_end = _scan_nul(data, offset, SOCKS4_HEADER_LENGTH, max_userid_length, "userid")
+        if userid_end < 0:
+            offset = max(len(data), offset)
+            # NOTE: socksv4a needs the domain name NUL byte as well.
+            return offset + (2 if is_socks4a else 1), userid_end, offset
+        offset = userid_end + 1
+
+    if not is_socks4a:
+        return userid_end + 1, userid_end, offset
+
+    end = _scan_nul(data, offset, userid_end + 1, max_domain_length, "domain name")
+    if end < 0:
+        offset = max(len(data), offset)
+        return offset + 1, userid_end, offset
+
+    # NOTE: the address 0.0.0.1 is only valid with a domain name.
+    if end == userid_end + 1:
+        raise ParserError("read_greeting_request: Empty domain name.")
+    return end + 1, userid_end, end
+
+
+def _addr_port_length(data, func_name):
+    if len(data) < SOCKS5_HEADER_LENGTH:
+        return SOCKS5_HEADER_LENGTH + _MIN_ADDR_PORT_LENGTH
+
+    atyp = byte_at(data, 3)
+    if atyp in _ADDR_LENGTH:
+        return SOCKS5_HEADER_LENGTH + _ADDR_LENGTH[atyp] + 2
+
+    if atyp == ADDR_TYPE["DOMAINNAME"]:
+        if len(data) < SOCKS5_HEADER_LENGTH + 1:
+            return SOCKS5_HEADER_LENGTH + _MIN_ADDR_PORT_LENGTH
+        return SOCKS5_HEADER_LENGTH + 1 + byte_at(data, 4) + 2
+
+    raise ParserError("{}: Incorrect address type.".format(func_name))
+
+
+def greeting_request_length(data):
+    if len(data) < 1:
+        return 2
+
+    version = byte_at(data, 0)
+    if version == 5:
+        if len(data) < 2:
+            return 2
+        return 2 + byte_at(data, 1)
+
+    elif version == 4:
+        return scan_socks4_request(data)[0]
+
+    raise ParserError("read_greeting_request: Incorrect version.")
+
+
+def greeting_response_length(data):
+    if len(data) < 1:
+        return 2
+
+    version = byte_at(data, 0)
+    if version == 5:
+        return 2
+
+    # NOTE: socksv4 will have a null byte in front
+    elif version == 0:
+        check_code(data, 1, _SOCKS4_STATUSES, "read_greeting_response: Incorrect status.")
+        return SOCKS4_HEADER_LENGTH
+
+    raise ParserError("read_greeting_response: Incorrect version.")
+
+
+def request_length(data):
+    if len(data) >= 1 and byte_at(data, 0) != 5:
+        raise ParserError("read_request: Incorrect version.")
+
+    check_code(data, 1, _REQ_COMMANDS, "read_request: Incorrect command.")
+    return _addr_port_length(data, "read_request")
+
+
+def response_length(data):
+    if len(data) >= 1 and byte_at(data, 0) != 5:
+        raise ParserError("read_response: Incorrect version.")
+
+    check_code(data, 1, RESP_STATUSES, "read_response: Incorrect status.")
+    return _addr_port_length(data, "read_response")
+
+
+def udp_header_length(data):
+    """
+    Return the length of the rfc1928 udp request header, RSV FRAG ATYP
+    DST.ADDR DST.PORT, in front of the datagram payload.
+    """
+    if len(data) >= 2 and (byte_at(data, 0) or byte_at(data, 1)):
+        raise ParserError("read_udp_datagram: Incorrect reserved field.")
+    return _addr_port_length(data, "read_udp_datagram")
@@ -0,0 +1,100 @@
+"""
+Address conversion helpers built on socket.inet_pton/inet_ntop.
+
+The events keep ip addresses in their packed 4/16-byte network form, which is
+what goes on the wire. These helpers move between the packed form, the text
+form and integers, so ipaddress objects are only built when user code asks
+for them.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import struct
+import numbers
+
+# NOTE: the _socket extension module provides inet_pton/inet_ntop without the
+# import cost of the socket wrapper module.
+import _socket as socket
+
+if sys.version_info.major <= 2:
+    string_func = unicode
+else:
+    string_func = str
+
+IPV4_LENGTH = 4
+IPV6_LENGTH = 16
+
+_ipv4 = struct.Struct("!I")
+_ipv6 = struct.Struct("!QQ")
+_MASK_64 = (1 << 64) - 1
+
+
+def _pack(family, length, addr):
+    if isinstance(addr, bytes):
+        if len(addr) != length:
+            raise ValueError("packed address should be {} bytes".format(length))
+        return addr
+
+    if isinstance(addr, string_func):
+        try:
+            return socket.inet_pton(family, addr)
+        except (socket.error, ValueError):
+            raise ValueError("Invalid address {}".format(addr))
+
+    if isinstance(addr, numbers.Integral) and not isinstance(addr, bool):
+        if not 0 <= addr < (1 << (length * 8)):
+            raise ValueError("address {} out of range".format(addr))
+        if length == IPV4_LENGTH:
+            return _ipv4.pack(addr)
+        return _ipv6.pack(addr >> 64, addr & _MASK_64)
+
+    # NOTE: ipaddress.IPv4Address and ipaddress.IPv6Address expose the packed form.
+    packed = getattr(addr, "packed", None)
+    if isinstance(packed, bytes) and len(packed) == length:
+        return packed
+
+    raise ValueError("Invalid address {!r}".format(addr))
+
+
+def pack_ipv4(addr):
+    """
+    Return the 4-byte packed form of addr.
+
+    addr can be a text address, an integer, a 4-byte packed address or an
+    ipaddress.IPv4Address. ValueError is raised for anything else.
+    """
+    return _pack(socket.AF_INET, IPV4_LENGTH, addr)
+
+
+def pack_ipv6(addr):
+    """
+    Return the 16-byte packed form of addr.
+
+    addr can be a text address, an integer, a 16-byte packed address or an
+    ipaddress.IPv6Address. ValueError is raised for anything else.
+    """
+    return _pack(socket.AF_INET6, IPV6_LENGTH, addr)
+
+
+def to_text(packed):
+    if len(packed) == IPV4_LENGTH:
+        return string_func(socket.inet_ntop(socket.AF_INET, packed))
+    return string_func(socket.inet_ntop(socket.AF_INET6, packed))
+
+
+def to_int(packed):
+    if len(packed) == IPV4_LENGTH:
+        return _ipv4.unpack(packed)[0]
+    high, low = _ipv6.unpack(packed)
+    return (high << 64) | low
+
+
+def to_ip_address(packed):
+    """
+    Return the ipaddress object of a packed address.
+    """
+    import ipaddress
+
+    if len(packed) == IPV4_LENGTH:
+        return ipaddress.IPv4Address(to_int(packed))
+    return ipaddress.IPv6Address(to_int(packed))
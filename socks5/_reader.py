@@ -1,15 +1,16 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import sys
-import construct
 
 from socks5 import _data_structure as data_structure
-from socks5.exception import ParserError
+from socks5 import _framing as framing
+from socks5 import _domain as domain
 from socks5.define import ADDR_TYPE
 from socks5.events import NeedMoreData
 from socks5.events import Socks4Request, Socks4Response
 from socks5.events import GreetingRequest, GreetingResponse
-from socks5.events import Request, Response
+from socks5.events import Request, Response, UDPDatagram
+from socks5.exception import ParserError
 
 if sys.version_info.major <= 2:
     string_func = unicode
@@ -18,35 +19,37 @@ else:
 
 
 def read_greeting_request(data):
-    try:
-        parsed_data = dict(data_structure.GreetingRequest.parse(data))
-    except (construct.FieldError, construct.RangeError):
-        return NeedMoreData()
-    except construct.ValidationError:
-        raise ParserError("read_greeting_request: Incorrect version.")
+    length = framing.greeting_request_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
 
-    if parsed_data["version"] == 5:
-        parsed_data.pop("version")
-        parsed_data.pop("nmethod")
-        return GreetingRequest(**parsed_data)
+    if framing.byte_at(data, 0) == 4:
+        return _read_socks4_request(data)
 
-    elif parsed_data["version"] == 4:
-        parsed_data.pop("version")
-        parsed_data["name"] = string_func(parsed_data["name"], encoding="ascii")
-        if parsed_data["domainname"]:
-            parsed_data["domainname"] = string_func(parsed_data["domainname"], encoding="ascii")
-        else:
-            parsed_data.pop("domainname")
-        return Socks4Request(**parsed_data)
+    parsed_data = dict(data_structure.GreetingRequest.parse(data))
+    parsed_data.pop("version")
+    parsed_data.pop("nmethod")
+    return GreetingRequest(**parsed_data)
+
+
+def _read_socks4_request(data):
+    length, userid_end, _ = framing.scan_socks4_request(data)
+    framing.check_ascii(data, framing.SOCKS4_HEADER_LENGTH, length, "read_greeting_request: Incorrect userid.")
+    parsed_data = dict(data_structure.Requestv4Header.parse(bytes(data[1:framing.SOCKS4_HEADER_LENGTH])))
+    parsed_data["name"] = string_func(bytes(data[framing.SOCKS4_HEADER_LENGTH:userid_end]), encoding="ascii")
+
+    domainname = bytes(data[userid_end + 1:length - 1])
+    if domainname:
+        parsed_data["domainname"] = domain.decode(domainname)
+    return Socks4Request(**parsed_data)
 
 
 def read_greeting_response(data):
-    try:
-        parsed_data = dict(data_structure.GreetingResponse.parse(data))
-    except (construct.FieldError, construct.RangeError):
-        return NeedMoreData()
-    except construct.ValidationError:
-        raise ParserError("read_greeting_response: Incorrect version.")
+    length = framing.greeting_response_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    parsed_data = dict(data_structure.GreetingResponse.parse(data))
 
     if parsed_data["version"] == 5:
         parsed_data.pop("version")
@@ -59,30 +62,46 @@ def read_greeting_response(data):
 
 
 def read_request(data):
-    try:
-        parsed_data = dict(data_structure.Request.parse(data))
-    except (construct.FieldError, construct.RangeError):
-        return NeedMoreData()
-    except construct.ValidationError:
-        raise ParserError("read_request: Incorrect version.")
+    length = framing.request_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    framing.check_domainname(data, length, "read_request")
+    parsed_data = dict(data_structure.Request.parse(data))
 
     parsed_data.pop("version")
     if parsed_data["atyp"] == ADDR_TYPE["DOMAINNAME"]:
-        parsed_data["addr"] = string_func(parsed_data["addr"], encoding="ascii")
+        parsed_data["addr"] = domain.decode(parsed_data["addr"])
 
     return Request(**parsed_data)
 
 
 def read_response(data):
-    try:
-        parsed_data = dict(data_structure.Response.parse(data))
-    except (construct.FieldError, construct.RangeError):
-        return NeedMoreData()
-    except construct.ValidationError:
-        raise ParserError("read_response: Incorrect version.")
+    length = framing.response_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    framing.check_domainname(data, length, "read_response")
+    parsed_data = dict(data_structure.Response.parse(data))
 
     parsed_data.pop("version")
     if parsed_data["atyp"] == ADDR_TYPE["DOMAINNAME"]:
-        parsed_data["addr"] = string_func(parsed_data["addr"], encoding="ascii")
+        parsed_data["addr"] = domain.decode(parsed_data["addr"])
 
     return Response(**parsed_data)
+
+
+def read_udp_datagram(data):
+    # NOTE: a datagram arrives whole, a short header is malformed.
+    length = framing.udp_header_length(data)
+    if len(data) < length:
+        raise ParserError("read_udp_datagram: Incomplete header.")
+
+    framing.check_domainname(data, length, "read_udp_datagram")
+
+    view = memoryview(data)
+    parsed_data = dict(data_structure.UDPHeader.parse(view[:length].tobytes()))
+    if parsed_data["atyp"] == ADDR_TYPE["DOMAINNAME"]:
+        parsed_data["addr"] = domain.decode(parsed_data["addr"])
+
+    return UDPDatagram(data=view[length:], **parsed_data)
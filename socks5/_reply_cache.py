@@ -0,0 +1,88 @@
+"""
+A bounded cache of serialized server replies.
+
+A server sends the same handful of replies over and over, e.g. the greeting
+response selecting NO_AUTH or the response carrying the relay's bound address.
+The replies are cached by their field tuple, so sending them again skips the
+writer. The greeting responses are built at import time and never evicted.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from socks5.define import ADDR_TYPE, AUTH_TYPE, RESP_STATUS, EVENT_TAG
+from socks5.events import GreetingResponse, Response, Socks4Response
+from socks5 import _struct_writer
+
+MAXSIZE = 1024
+
+_GREETING_RESPONSE = EVENT_TAG["GreetingResponse"]
+_SOCKS4_RESPONSE = EVENT_TAG["Socks4Response"]
+
+_static_replies = {}
+_replies = {}
+# NOTE: the keys written once since the last reset. A reply is only cached the
+#       second time it is written, so the one-off replies, e.g. a bound address
+#       with an ephemeral port, never take a slot in _replies.
+_seen = set()
+
+
+def reply_key(event):
+    if event.event_tag == _GREETING_RESPONSE:
+        return (event.event_tag, event.auth_type)
+
+    elif event.event_tag == _SOCKS4_RESPONSE:
+        return (event.event_tag, event.status, event.packed_addr, event.port)
+
+    if event.atyp == ADDR_TYPE["DOMAINNAME"]:
+        return (event.event_tag, event.status, event.atyp, event.addr, event.port)
+    return (event.event_tag, event.status, event.atyp, event.packed_addr, event.port)
+
+
+def write_reply(event, writer):
+    """
+    Return the serialized reply, calling writer(event) only on a cache miss.
+    """
+    key = reply_key(event)
+    data = _static_replies.get(key)
+    if data is not None:
+        return data
+
+    data = _replies.get(key)
+    if data is not None:
+        return data
+
+    data = writer(event)
+    if key in _seen:
+        _seen.discard(key)
+        if len(_replies) < MAXSIZE:
+            _replies[key] = data
+    else:
+        if len(_seen) >= MAXSIZE:
+            _seen.clear()
+        _seen.add(key)
+    return data
+
+
+def clear():
+    _replies.clear()
+    _seen.clear()
+
+
+def _build_static_replies():
+    # NOTE: a failure Response or Socks4Response with a zero address is not
+    #       prebuilt, ServerConnection.send only accepts a reply carrying the
+    #       address and port of the request.
+    for auth_type in ("NO_AUTH", "USERNAME_PASSWD", "NO_SUPPORT_AUTH_METHOD"):
+        event = GreetingResponse(AUTH_TYPE[auth_type])
+        _static_replies[reply_key(event)] = _struct_writer.write_greeting_response(event)
+
+
+_build_static_replies()
+
+# NOTE: the failure replies sent when a deadline expires, without an event.
+#       Their zero address would be refused by ServerConnection.send, so
+#       write_reply never looks them up.
+NO_ACCEPTABLE_METHOD = _static_replies[(_GREETING_RESPONSE, AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"])]
+SOCKS4_REJECTED = _struct_writer.write_greeting_response(
+    Socks4Response(RESP_STATUS["REQUEST_REJECTED"], 0, 0))
+GENERAL_FAILURE = _struct_writer.write_response(
+    Response(RESP_STATUS["GENRAL_FAILURE"], ADDR_TYPE["IPV4"], 0, 0))
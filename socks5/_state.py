@@ -0,0 +1,54 @@
+"""
+A minimal table-driven state machine shared by the connection objects.
+
+The current state is stored as a small integer, an index into the class-level
+``states`` tuple. The connections keep their readers, writers and frame length
+functions in tuples indexed by the same integer, so dispatching on the state
+is a tuple lookup.
+
+``state`` still returns the state name, and ``machine.set_state(name)`` is kept
+for code written against transitions.Machine.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+
+class _Machine(object):
+    __slots__ = ("_model",)
+
+    def __init__(self, model):
+        self._model = model
+
+    def set_state(self, state):
+        self._model._state = self._model.state_index(state)
+
+
+class StateMachine(object):
+    __slots__ = ("_state",)
+
+    states = ("init",)
+
+    def __init__(self):
+        self._state = 0
+
+    @property
+    def state(self):
+        return self.states[self._state]
+
+    @property
+    def machine(self):
+        return _Machine(self)
+
+    @classmethod
+    def state_index(cls, state):
+        try:
+            return cls.states.index(state)
+        except ValueError:
+            raise ValueError("State '{}' is not a registered state.".format(state))
+
+    @classmethod
+    def handlers(cls, module, prefix, suffix=""):
+        """
+        Return the module functions named prefix + state + suffix, one per
+        state, with None for the states that have no such function.
+        """
+        return tuple(getattr(module, prefix + state + suffix, None) for state in cls.states)
@@ -0,0 +1,67 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from socks5 import _framing as framing
+from socks5._framing import byte_at
+from socks5.events import NeedMoreData
+from socks5.events import Socks4Request, Socks4Response
+from socks5.events import GreetingRequest, GreetingResponse
+from socks5.events import Request, Response, UDPDatagram
+from socks5.exception import ParserError
+
+
+def _frame(data, length):
+    # NOTE: data may be owned by the receive buffer, the events keep a copy.
+    return bytes(data[:length])
+
+
+def read_greeting_request(data):
+    length = framing.greeting_request_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    if byte_at(data, 0) == 5:
+        return GreetingRequest.from_wire(_frame(data, length))
+
+    framing.check_ascii(data, framing.SOCKS4_HEADER_LENGTH, length, "read_greeting_request: Incorrect userid.")
+    return Socks4Request.from_wire(_frame(data, length))
+
+
+def read_greeting_response(data):
+    length = framing.greeting_response_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    if byte_at(data, 0) == 5:
+        return GreetingResponse.from_wire(_frame(data, length))
+
+    # NOTE: socksv4 will have a null byte in front
+    return Socks4Response.from_wire(_frame(data, length))
+
+
+def read_request(data):
+    length = framing.request_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    framing.check_domainname(data, length, "read_request")
+    return Request.from_wire(_frame(data, length))
+
+
+def read_response(data):
+    length = framing.response_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    framing.check_domainname(data, length, "read_response")
+    return Response.from_wire(_frame(data, length))
+
+
+def read_udp_datagram(data):
+    # NOTE: a datagram arrives whole, a short header is malformed.
+    length = framing.udp_header_length(data)
+    if len(data) < length:
+        raise ParserError("read_udp_datagram: Incomplete header.")
+
+    framing.check_domainname(data, length, "read_udp_datagram")
+
+    return UDPDatagram.from_wire(data, length)
@@ -0,0 +1,158 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import struct
+
+from socks5 import _domain as domain
+from socks5._buffer import check_space
+from socks5.define import ADDR_TYPE, EVENT_TAG
+
+_socks4 = struct.Struct("!BBH4s")
+_socks5_header = struct.Struct("!BBxB")
+_udp_header = struct.Struct("!xxBB")
+_greeting = struct.Struct("!BB")
+_port = struct.Struct("!H")
+_ipv4_port = struct.Struct("!4sH")
+_ipv6_port = struct.Struct("!16sH")
+
+_GREETING_REQUEST = EVENT_TAG["GreetingRequest"]
+_GREETING_RESPONSE = EVENT_TAG["GreetingResponse"]
+
+
+def _encode_addr(event):
+    """
+    Return the encoded domain name, or None for an ip address.
+    """
+    if event.atyp == ADDR_TYPE["DOMAINNAME"]:
+        return domain.encode(event.addr)
+    return None
+
+
+def _addr_port_length(event, domainname):
+    if event.atyp == ADDR_TYPE["IPV4"]:
+        return _ipv4_port.size
+    elif event.atyp == ADDR_TYPE["IPV6"]:
+        return _ipv6_port.size
+    return 1 + len(domainname) + _port.size
+
+
+def _write_addr_port_into(event, domainname, buf, offset):
+    if event.atyp == ADDR_TYPE["IPV4"]:
+        _ipv4_port.pack_into(buf, offset, event.packed_addr, event.port)
+
+    elif event.atyp == ADDR_TYPE["IPV6"]:
+        _ipv6_port.pack_into(buf, offset, event.packed_addr, event.port)
+
+    else:
+        length = len(domainname)
+        buf[offset] = length
+        buf[offset + 1:offset + 1 + length] = domainname
+        _port.pack_into(buf, offset + 1 + length, event.port)
+
+
+def _write_socks5_into(code, event, buf, offset):
+    domainname = _encode_addr(event)
+    length = _socks5_header.size + _addr_port_length(event, domainname)
+    check_space(buf, offset, length)
+
+    _socks5_header.pack_into(buf, offset, 5, code, event.atyp)
+    _write_addr_port_into(event, domainname, buf, offset + _socks5_header.size)
+    return length
+
+
+def _write_addr_port(event):
+    if event.atyp == ADDR_TYPE["IPV4"]:
+        return _ipv4_port.pack(event.packed_addr, event.port)
+
+    elif event.atyp == ADDR_TYPE["IPV6"]:
+        return _ipv6_port.pack(event.packed_addr, event.port)
+
+    addr = domain.encode(event.addr)
+    return struct.pack("!B", len(addr)) + addr + _port.pack(event.port)
+
+
+def write_greeting_request(event):
+    if event.event_tag == _GREETING_REQUEST:
+        return _greeting.pack(5, len(event.methods)) + bytes(bytearray(event.methods))
+
+    data = _socks4.pack(4, event.cmd, event.port, event.packed_addr) + event.name.encode("ascii") + b"\0"
+    if event.domainname:
+        data += domain.encode(event.domainname) + b"\0"
+    return data
+
+
+def write_greeting_request_into(event, buf, offset=0):
+    if event.event_tag == _GREETING_REQUEST:
+        nmethod = len(event.methods)
+        check_space(buf, offset, 2 + nmethod)
+        _greeting.pack_into(buf, offset, 5, nmethod)
+        buf[offset + 2:offset + 2 + nmethod] = bytearray(event.methods)
+        return 2 + nmethod
+
+    name = event.name.encode("ascii")
+    domainname = domain.encode(event.domainname) if event.domainname else None
+
+    length = _socks4.size + len(name) + 1
+    if domainname is not None:
+        length += len(domainname) + 1
+    check_space(buf, offset, length)
+
+    _socks4.pack_into(buf, offset, 4, event.cmd, event.port, event.packed_addr)
+    offset += _socks4.size
+    buf[offset:offset + len(name)] = name
+    buf[offset + len(name)] = 0
+    if domainname is not None:
+        offset += len(name) + 1
+        buf[offset:offset + len(domainname)] = domainname
+        buf[offset + len(domainname)] = 0
+    return length
+
+
+def write_greeting_response(event):
+    if event.event_tag == _GREETING_RESPONSE:
+        return _greeting.pack(5, event.auth_type)
+
+    # NOTE: socksv4 will have a null byte in front
+    return _socks4.pack(0, event.status, event.port, event.packed_addr)
+
+
+def write_greeting_response_into(event, buf, offset=0):
+    if event.event_tag == _GREETING_RESPONSE:
+        check_space(buf, offset, _greeting.size)
+        _greeting.pack_into(buf, offset, 5, event.auth_type)
+        return _greeting.size
+
+    check_space(buf, offset, _socks4.size)
+    _socks4.pack_into(buf, offset, 0, event.status, event.port, event.packed_addr)
+    return _socks4.size
+
+
+def write_request(event):
+    return _socks5_header.pack(5, event.cmd, event.atyp) + _write_addr_port(event)
+
+
+def write_request_into(event, buf, offset=0):
+    return _write_socks5_into(event.cmd, event, buf, offset)
+
+
+def write_response(event):
+    return _socks5_header.pack(5, event.status, event.atyp) + _write_addr_port(event)
+
+
+def write_response_into(event, buf, offset=0):
+    return _write_socks5_into(event.status, event, buf, offset)
+
+
+def write_udp_datagram(event):
+    return _udp_header.pack(event.frag, event.atyp) + _write_addr_port(event) + memoryview(event.data).tobytes()
+
+
+def write_udp_datagram_into(event, buf, offset=0):
+    domainname = _encode_addr(event)
+    header_length = _udp_header.size + _addr_port_length(event, domainname)
+    length = header_length + len(event.data)
+    check_space(buf, offset, length)
+
+    _udp_header.pack_into(buf, offset, event.frag, event.atyp)
+    _write_addr_port_into(event, domainname, buf, offset + _udp_header.size)
+    buf[offset + header_length:offset + length] = event.data
+    return length
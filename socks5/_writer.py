@@ -1,65 +1,75 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import ipaddress
-from socks5.define import ADDR_TYPE
+from socks5 import _inet as inet
+from socks5 import _domain as domain
+from socks5._buffer import write_into
+from socks5.define import ADDR_TYPE, EVENT_TAG
 from socks5._data_structure import GreetingRequest, GreetingResponse
-from socks5._data_structure import Request, Response
+from socks5._data_structure import Request, Response, UDPHeader
 
+_GREETING_REQUEST = EVENT_TAG["GreetingRequest"]
+_GREETING_RESPONSE = EVENT_TAG["GreetingResponse"]
 
-def write_greeting_request(event):
-    event_dict = event.__dict__
 
-    if event == "GreetingRequest":
-        event_dict["version"] = 5
-    if event == "Socks4Request":
-        event_dict["version"] = 4
-        event_dict["addr"] = int(event.addr)
-        event_dict["name"] = event.name.encode("ascii")
-        event_dict["domainname"] = event.domainname.encode("idna")
+def _addr(event):
+    if event.atyp in (ADDR_TYPE["IPV4"], ADDR_TYPE["IPV6"]):
+        return inet.to_int(event.packed_addr)
+    return domain.encode(event.addr)
+
 
+def write_greeting_request(event):
+    if event.event_tag == _GREETING_REQUEST:
+        return GreetingRequest.build(dict(version=5, nmethod=event.nmethod, methods=event.methods))
+
+    event_dict = dict(
+        version=4,
+        cmd=event.cmd,
+        port=event.port,
+        addr=inet.to_int(event.packed_addr),
+        name=event.name.encode("ascii"),
+        domainname=domain.encode(event.domainname))
     return GreetingRequest.build(event_dict)
 
 
 def write_greeting_response(event):
-    event_dict = event.__dict__
-
-    if event == "GreetingResponse":
-        event_dict["version"] = 5
-    if event == "Socks4Response":
-        # NOTE: socksv4 will have a null byte in front
-        event_dict["version"] = 0
-        event_dict["addr"] = int(event.addr)
+    if event.event_tag == _GREETING_RESPONSE:
+        return GreetingResponse.build(dict(version=5, auth_type=event.auth_type))
 
+    # NOTE: socksv4 will have a null byte in front
+    event_dict = dict(version=0, status=event.status, port=event.port, addr=inet.to_int(event.packed_addr))
     return GreetingResponse.build(event_dict)
 
 
 def write_request(event):
-    event_dict = event.__dict__
+    event_dict = dict(version=5, cmd=event.cmd, atyp=event.atyp, addr=_addr(event), port=event.port)
+    return Request.build(event_dict)
+
+
+def write_response(event):
+    event_dict = dict(version=5, status=event.status, atyp=event.atyp, addr=_addr(event), port=event.port)
+    return Response.build(event_dict)
 
-    event_dict["version"] = 5
-    if event.atyp == ADDR_TYPE["IPV4"]:
-        event_dict["addr"] = int(ipaddress.IPv4Address(event.addr))
 
-    elif event.atyp == ADDR_TYPE["IPV6"]:
-        event_dict["addr"] = int(ipaddress.IPv6Address(event.addr))
+def write_greeting_request_into(event, buf, offset=0):
+    return write_into(write_greeting_request(event), buf, offset)
 
-    else:
-        event_dict["addr"] = event.addr.encode("idna")
 
-    return Request.build(event_dict)
+def write_greeting_response_into(event, buf, offset=0):
+    return write_into(write_greeting_response(event), buf, offset)
 
 
-def write_response(event):
-    event_dict = event.__dict__
+def write_request_into(event, buf, offset=0):
+    return write_into(write_request(event), buf, offset)
 
-    event_dict["version"] = 5
-    if event.atyp == ADDR_TYPE["IPV4"]:
-        event_dict["addr"] = int(ipaddress.IPv4Address(event.addr))
 
-    elif event.atyp == ADDR_TYPE["IPV6"]:
-        event_dict["addr"] = int(ipaddress.IPv6Address(event.addr))
+def write_response_into(event, buf, offset=0):
+    return write_into(write_response(event), buf, offset)
 
-    else:
-        event_dict["addr"] = event.addr.encode("idna")
 
-    return Response.build(event_dict)
+def write_udp_datagram(event):
+    event_dict = dict(frag=event.frag, atyp=event.atyp, addr=_addr(event), port=event.port)
+    return UDPHeader.build(event_dict) + memoryview(event.data).tobytes()
+
+
+def write_udp_datagram_into(event, buf, offset=0):
+    return write_into(write_udp_datagram(event), buf, offset)
@@ -5,6 +5,8 @@ from construct import Struct
 from construct import Byte, Int8ub
 from construct import PascalString
 
+# NOTE: the reader and the writer are hand-rolled, these definitions are the
+# reference the tests and the benchmarks compare them against.
 AuthRequest = Struct(
     "version" / OneOf(Int8ub, [1]),
     "username" / PascalString(Byte),
@@ -0,0 +1,30 @@
+"""
+Length computation for the rfc1929 username/password frames.
+
+See socks5._framing for the meaning of the returned length.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from socks5.exception import ParserError
+from socks5._framing import byte_at, check_code, RESP_STATUSES
+
+
+def auth_request_length(data):
+    if len(data) >= 1 and byte_at(data, 0) != 1:
+        raise ParserError("read_auth_request: Incorrect version.")
+
+    if len(data) < 2:
+        return 3
+
+    password_offset = 2 + byte_at(data, 1)
+    if len(data) <= password_offset:
+        return password_offset + 1
+    return password_offset + 1 + byte_at(data, password_offset)
+
+
+def auth_response_length(data):
+    if len(data) >= 1 and byte_at(data, 0) != 1:
+        raise ParserError("read_auth_response: Incorrect version.")
+
+    check_code(data, 1, RESP_STATUSES, "read_auth_response: Incorrect status.")
+    return 2
@@ -1,42 +1,28 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import sys
-import construct
-
-from socks5.exception import ParserError
 from socks5.events import NeedMoreData
+from socks5._framing import check_ascii
 
-from . import _data_structure as data_structure
+from . import _framing as framing
 from .events import AuthRequest, AuthResponse
 
-if sys.version_info.major <= 2:
-    string_func = unicode
-else:
-    string_func = str
-
 
 def read_auth_request(data):
-    try:
-        parsed_data = dict(data_structure.AuthRequest.parse(data))
-    except (construct.FieldError, construct.RangeError):
-        return NeedMoreData()
-    except construct.ValidationError:
-        raise ParserError("read_auth_request: Incorrect version.")
+    length = framing.auth_request_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
 
-    parsed_data.pop("version")
-    parsed_data["username"] = string_func(parsed_data["username"], encoding="ascii")
-    parsed_data["password"] = string_func(parsed_data["password"], encoding="ascii")
+    password_offset = 2 + framing.byte_at(data, 1)
+    check_ascii(data, 2, password_offset, "read_auth_request: Incorrect username.")
+    check_ascii(data, password_offset + 1, length, "read_auth_request: Incorrect password.")
 
-    return AuthRequest(**parsed_data)
+    # NOTE: data may be owned by the receive buffer, the events keep a copy.
+    return AuthRequest.from_wire(bytes(data[:length]))
 
 
 def read_auth_response(data):
-    try:
-        parsed_data = dict(data_structure.AuthResponse.parse(data))
-    except (construct.FieldError, construct.RangeError):
-        return NeedMoreData()
-    except construct.ValidationError:
-        raise ParserError("read_auth_response: Incorrect version.")
-
-    parsed_data.pop("version")
-    return AuthResponse(**parsed_data)
+    length = framing.auth_response_length(data)
+    if len(data) < length:
+        return NeedMoreData(length - len(data))
+
+    return AuthResponse.from_wire(bytes(data[:length]))
@@ -1,19 +1,43 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from ._data_structure import AuthRequest, AuthResponse
+import struct
 
+from socks5.define import RESP_STATUS
+from socks5._buffer import write_into
 
-def write_auth_request(event):
-    event_dict = event.__dict__
+VERSION = 1
+
+_header = struct.Struct("!BB")
+_length = struct.Struct("!B")
+
+# NOTE: an auth response is two bytes, every possible frame is built once.
+AUTH_RESPONSE_FRAMES = dict(
+    (status, _header.pack(VERSION, status)) for status in RESP_STATUS.values())
+
+
+def _encode(value, name):
+    data = value.encode("ascii")
+    if len(data) > 255:
+        raise ValueError("{} too long".format(name))
+    return data
 
-    event_dict["version"] = 1
-    event_dict["username"] = event.username.encode("ascii")
-    event_dict["password"] = event.password.encode("ascii")
-    return AuthRequest.build(event_dict)
+
+def write_auth_request(event):
+    username = _encode(event.username, "username")
+    password = _encode(event.password, "password")
+    return b"".join((_header.pack(VERSION, len(username)), username, _length.pack(len(password)), password))
 
 
 def write_auth_response(event):
-    event_dict = event.__dict__
+    try:
+        return AUTH_RESPONSE_FRAMES[event.status]
+    except KeyError:
+        raise ValueError("Unsupported status code")
+
+
+def write_auth_request_into(event, buf, offset=0):
+    return write_into(write_auth_request(event), buf, offset)
+
 
-    event_dict["version"] = 1
-    return AuthResponse.build(event_dict)
+def write_auth_response_into(event, buf, offset=0):
+    return write_into(write_auth_response(event), buf, offset)
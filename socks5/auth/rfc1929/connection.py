@@ -1,104 +1,110 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from transitions import Machine
-
 from socks5.exception import ProtocolError
+from socks5.define import EVENT_TAG
+from socks5.events import NeedMoreData
+from socks5._buffer import ReceiveBuffer
+from socks5._state import StateMachine
+from ._framing import auth_request_length, auth_response_length
 from ._reader import read_auth_request, read_auth_response
 from ._writer import write_auth_request, write_auth_response
 
+_NEED_MORE_DATA = EVENT_TAG["NeedMoreData"]
+_AUTH_REQUEST = EVENT_TAG["AuthRequest"]
+_AUTH_RESPONSE = EVENT_TAG["AuthResponse"]
+
+
+INIT, AUTH_REQUEST, AUTH_RESPONSE, END = range(4)
+
 
-class _ClientConnection(object):
-    states = [
+class _BaseConnection(StateMachine):
+    __slots__ = ("_buffer",)
+
+    states = (
         'init',
         'auth_request',
         'auth_response',
         'end'
-    ]
+    )
 
     def __init__(self):
-        self._buffer = b""
-        self.machine = Machine(
-            model=self, states=self.states, initial='init')
+        super(_BaseConnection, self).__init__()
+        self._buffer = ReceiveBuffer()
 
     def initiate_connection(self):
-        self.machine.set_state("auth_request")
+        self._state = AUTH_REQUEST
 
-    def recv(self, data):
-        if self.state != "auth_response":
-            raise ProtocolError("ClientConnection.recv: Incorrect state {}".format(self.state))
+    def reset(self):
+        self._state = INIT
+        self._buffer.clear()
 
-        self._buffer += data
-        current_event = read_auth_response(self._buffer)
+    @property
+    def trailing_data(self):
+        return bytes(self._buffer.peek())
 
-        if current_event == 'NeedMoreData':
-            return current_event
-        else:
-            self._buffer = b""
+    def can_recv(self):
+        return self._state == self._recv_state
+
+    def bytes_needed(self):
+        if self._state != self._recv_state:
+            return 0
 
-        if self.state == 'auth_response':
-            self.machine.set_state('end')
+        buffered_data = self._buffer.peek()
+        return max(self._frame_length(buffered_data) - len(buffered_data), 0)
 
+    def recv(self, data):
+        if self._state != self._recv_state:
+            raise ProtocolError("{0}.recv: Incorrect state {1}".format(self.role_name, self.state))
+
+        buffered_data = self._buffer.feed(data)
+        length = self._frame_length(buffered_data)
+        if len(buffered_data) < length:
+            self._buffer.consume(0)
+            return NeedMoreData(length - len(buffered_data))
+
+        current_event = self._reader(buffered_data)
+        self._buffer.consume(length)
+        self._state += 1
         return current_event
 
     def send(self, event):
-        if self.state != "auth_request":
-            raise ProtocolError("ClientConnection.send: Incorrect state {}".format(self.state))
+        if self._state != self._send_state:
+            raise ProtocolError("{0}.send: Incorrect state {1}".format(self.role_name, self.state))
 
-        if self.state == "auth_request" and event != "AuthRequest":
-            raise ProtocolError("ClientConnection.send: Incorrect event {0} in state: {1}".format(event, self.state))
+        if getattr(event, "event_tag", None) != self._send_tag:
+            raise ProtocolError("{0}.send: Incorrect event {1} in state: {2}".format(self.role_name, event, self.state))
 
-        if self.state == "auth_request":
-            self.machine.set_state("auth_response")
+        self._state += 1
+        return self._writer(event)
 
-        return write_auth_request(event)
 
+class _ClientConnection(_BaseConnection):
+    __slots__ = ()
 
-class _ServerConnection(object):
-    states = [
-        'init',
-        'auth_request',
-        'auth_response',
-        'end'
-    ]
+    role_name = "ClientConnection"
+    _recv_state = AUTH_RESPONSE
+    _send_state = AUTH_REQUEST
+    _send_tag = _AUTH_REQUEST
+    _reader = staticmethod(read_auth_response)
+    _writer = staticmethod(write_auth_request)
+    _frame_length = staticmethod(auth_response_length)
 
-    def __init__(self):
-        self._buffer = b""
-        self.machine = Machine(
-            model=self, states=self.states, initial='init')
 
-    def initiate_connection(self):
-        self.machine.set_state("auth_request")
+class _ServerConnection(_BaseConnection):
+    __slots__ = ()
 
-    def recv(self, data):
-        if self.state != "auth_request":
-            raise ProtocolError("ServerConnection.recv: Incorrect state {}".format(self.state))
-
-        self._buffer += data
-        current_event = read_auth_request(self._buffer)
-
-        if current_event == "NeedMoreData":
-            return current_event
-        else:
-            self._buffer = b""
-
-        if self.state == 'auth_request':
-            self.machine.set_state('auth_response')
-
-        return current_event
-
-    def send(self, event):
-        if self.state != "auth_response":
-            raise ProtocolError("ServerConnection.recv: Incorrect state {}".format(self.state))
-
-        if self.state == "auth_response" and event != "AuthResponse":
-            raise ProtocolError("ServerConnection.send: Incorrect event {0} in state: {1}".format(event, self.state))
-
-        if self.state == "auth_response":
-            self.machine.set_state("end")
-        return write_auth_response(event)
+    role_name = "ServerConnection"
+    _recv_state = AUTH_REQUEST
+    _send_state = AUTH_RESPONSE
+    _send_tag = _AUTH_RESPONSE
+    _reader = staticmethod(read_auth_request)
+    _writer = staticmethod(write_auth_response)
+    _frame_length = staticmethod(auth_request_length)
 
 
 class Connection(object):
+    __slots__ = ("_conn",)
+
     def __init__(self, our_role):
         if our_role == "server":
             self._conn = _ServerConnection()
@@ -110,8 +116,43 @@ class Connection(object):
     def initiate_connection(self):
         self._conn.initiate_connection()
 
+    def reset(self):
+        """
+        Return the connection to the init state with an empty buffer, so that
+        it can be reused.
+        """
+        self._conn.reset()
+
+    @property
+    def trailing_data(self):
+        """
+        The received bytes that have not been consumed by any event yet.
+        """
+        return self._conn.trailing_data
+
+    def bytes_needed(self):
+        """
+        Return the minimum number of additional bytes required to complete
+        the current message, or 0 when the connection does not expect data.
+        """
+        return self._conn.bytes_needed()
+
     def recv(self, data):
         return self._conn.recv(data)
 
+    def recv_events(self, data=b""):
+        """
+        Feed the raw data and return every event that can be parsed from the
+        buffered bytes under the current state.
+        """
+        events = []
+        current_event = self._conn.recv(data)
+        while current_event.event_tag != _NEED_MORE_DATA:
+            events.append(current_event)
+            if not self._conn.can_recv():
+                break
+            current_event = self._conn.recv(b"")
+        return events
+
     def send(self, event):
         return self._conn.send(event)
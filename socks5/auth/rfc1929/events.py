@@ -1,16 +1,22 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import sys
-from socks5.define import RESP_STATUS
+from socks5.define import RESP_STATUS, EVENT_TAG
+from socks5.events import lazy_field
+from socks5._framing import byte_at
 
 if sys.version_info.major <= 2:
     string_func = unicode
 else:
     string_func = str
 
+_STATUS_CODES = frozenset(RESP_STATUS.values())
+
 
 class NeedMoreData(object):
+    __slots__ = ()
     event_type = "NeedMoreData"
+    event_tag = EVENT_TAG["NeedMoreData"]
 
     def __eq__(self, value):
         return self.event_type == value
@@ -59,7 +65,9 @@ class AuthRequest(object):
         >>> event.password == "password"
         True
     """
+    __slots__ = ("_frame", "_lazy_username", "_lazy_password")
     event_type = "AuthRequest"
+    event_tag = EVENT_TAG["AuthRequest"]
 
     def __init__(self, username, password):
         if not isinstance(username, string_func) or not isinstance(password, string_func):
@@ -71,6 +79,26 @@ class AuthRequest(object):
         self.username = username
         self.password = password
 
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete auth request frame.
+
+        The frame must have been checked by the reader. The username and
+        password are decoded from the frame when first accessed.
+        """
+        event = cls.__new__(cls)
+        event._frame = frame
+        return event
+
+    @lazy_field
+    def username(self):
+        return string_func(self._frame[2:2 + byte_at(self._frame, 1)], encoding="ascii")
+
+    @lazy_field
+    def password(self):
+        return string_func(self._frame[3 + byte_at(self._frame, 1):], encoding="ascii")
+
     def __eq__(self, value):
         return self.event_type == value
 
@@ -78,7 +106,7 @@ class AuthRequest(object):
         return not self.__eq__(value)
 
     def __str__(self):
-        return "SOCKSv5 Auth Request: username: {username}, password: {password}".format(**self.__dict__)
+        return "SOCKSv5 Auth Request: username: {0}, password: {1}".format(self.username, self.password)
 
 
 class AuthResponse(object):
@@ -103,14 +131,30 @@ class AuthResponse(object):
         >>> event.status == 0
         True
     """
+    __slots__ = ("_frame", "status")
     event_type = "AuthResponse"
+    event_tag = EVENT_TAG["AuthResponse"]
 
     def __init__(self, status):
-        if status not in RESP_STATUS.values():
+        if status not in _STATUS_CODES:
             raise ValueError("Unsupported status code")
 
         self.status = status
 
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete auth response frame.
+        """
+        status = byte_at(frame, 1)
+        if status not in _STATUS_CODES:
+            raise ValueError("Unsupported status code")
+
+        event = cls.__new__(cls)
+        event._frame = frame
+        event.status = status
+        return event
+
     def __eq__(self, value):
         return self.event_type == value
 
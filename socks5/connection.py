@@ -1,233 +1,762 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from transitions import Machine
-
-from socks5.exception import ProtocolError
-from socks5.define import AUTH_TYPE
-from socks5 import _reader as reader
-from socks5 import _writer as writer
-
-
-class _ClientConnection(object):
-    states = [
-        'init',
-        'greeting_request',
-        'greeting_response',
-        'auth_inprogress',
-        'request',
-        'response',
-        'end'
-    ]
-
-    def __init__(self):
-        self._buffer = b""
-        self.machine = Machine(
-            model=self, states=self.states, initial='init')
-        self._version = 0xff
+import os
+import time
+import importlib
+
+from socks5.exception import ProtocolError, ParserError
+from socks5.define import AUTH_TYPE, EVENT_TAG
+from socks5.events import NeedMoreData
+from socks5 import _framing as framing
+from socks5.auth.rfc1929 import _framing as rfc1929_framing
+from socks5.auth.rfc1929 import _writer as rfc1929_writer
+from socks5 import _reply_cache
+from socks5._buffer import ReceiveBuffer
+from socks5._state import StateMachine
+
+# NOTE: the backend modules are imported on first use, so that importing
+# socks5 does not pay for construct when the struct backend is used.
+BACKENDS = {
+    "construct": ("socks5._reader", "socks5._writer"),
+    "struct": ("socks5._struct_reader", "socks5._struct_writer"),
+}
+
+# NOTE: the rfc1929 codec does not depend on the backend.
+RFC1929_CODEC = ("socks5.auth.rfc1929._reader", "socks5.auth.rfc1929._writer")
+
+# NOTE: the codec backend can be chosen at import time with the SOCKS5_BACKEND
+# environment variable, or per connection with the backend argument.
+DEFAULT_BACKEND = os.environ.get("SOCKS5_BACKEND", "construct")
+
+# NOTE: the bound on the bytes of an incomplete message. The largest handshake
+# message is an rfc1929 auth request of 513 bytes, so the default only matters
+# for a socksv4 request without userid or domain name bounds.
+MAX_BUFFER_SIZE = 65536
+
+# NOTE: python2 has no monotonic clock.
+_monotonic = getattr(time, "monotonic", time.time)
+
+
+def _backend_name(backend):
+    if backend is None:
+        backend = DEFAULT_BACKEND
+
+    if backend not in BACKENDS:
+        raise ValueError("unknown backend {}".format(backend))
+    return backend
+
+
+# NOTE: events are dispatched on their integer event_tag, comparing an event
+# with its event_type string is kept for user code only.
+_NEED_MORE_DATA = EVENT_TAG["NeedMoreData"]
+_SOCKS4_REQUEST = EVENT_TAG["Socks4Request"]
+_SOCKS4_RESPONSE = EVENT_TAG["Socks4Response"]
+_GREETING_REQUEST = EVENT_TAG["GreetingRequest"]
+_GREETING_RESPONSE = EVENT_TAG["GreetingResponse"]
+_REQUEST = EVENT_TAG["Request"]
+_RESPONSE = EVENT_TAG["Response"]
+_AUTH_REQUEST = EVENT_TAG["AuthRequest"]
+_AUTH_RESPONSE = EVENT_TAG["AuthResponse"]
+
+
+def _event_tag(event):
+    return getattr(event, "event_tag", None)
+
+
+def _addr_key(event):
+    # NOTE: compare the packed form so that no ipaddress object is built.
+    if event.packed_addr is None:
+        return event.addr
+    return event.packed_addr
+
+
+# NOTE: both roles walk through the same states, indexed by these integers.
+# auth_request and auth_response are only entered by a connection running the
+# rfc1929 sub-negotiation itself, otherwise the user drives auth_inprogress.
+_STATES = (
+    'init',
+    'greeting_request',
+    'greeting_response',
+    'auth_inprogress',
+    'auth_request',
+    'auth_response',
+    'request',
+    'response',
+    'end'
+)
+(INIT, GREETING_REQUEST, GREETING_RESPONSE, AUTH_INPROGRESS, AUTH_REQUEST, AUTH_RESPONSE,
+ REQUEST, RESPONSE, END) = range(len(_STATES))
+
+_FRAME_LENGTHS = tuple(
+    getattr(framing, state + "_length", None) or getattr(rfc1929_framing, state + "_length", None)
+    for state in _STATES)
+
+# NOTE: the state entered after the message of a state has been exchanged.
+# The greeting response and the auth response are resolved with
+# _AUTH_NEXT_STATE and _AUTH_RESULT_STATE instead.
+_NEXT_STATE = {
+    GREETING_REQUEST: GREETING_RESPONSE,
+    AUTH_REQUEST: AUTH_RESPONSE,
+    REQUEST: RESPONSE,
+    RESPONSE: END,
+}
+
+_AUTH_NEXT_STATE = {
+    AUTH_TYPE["NO_AUTH"]: REQUEST,
+    AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]: END,
+}
+
+_USERNAME_PASSWD = AUTH_TYPE["USERNAME_PASSWD"]
+
+# NOTE: the handshake phase each state belongs to, the timeouts argument gives
+# a budget per phase. No deadline runs in the init and end states.
+TIMEOUT_PHASES = ("greeting", "auth", "request")
+_PHASES = (None, "greeting", "greeting", "auth", "auth", "auth", "request", "request", None)
+
+# NOTE: the failure replies a server owes the client when the budget of the
+# state runs out. The states waiting on the client have nothing to answer.
+_SOCKS5_NO_METHOD = _reply_cache.NO_ACCEPTABLE_METHOD
+_SOCKS4_REJECTED = _reply_cache.SOCKS4_REJECTED
+_AUTH_FAILURE = rfc1929_writer.AUTH_RESPONSE_FRAMES[1]
+_GENERAL_FAILURE = _reply_cache.GENERAL_FAILURE
+
+
+def _check_timeouts(timeouts):
+    if timeouts is None:
+        return None
+
+    for phase, budget in timeouts.items():
+        if phase not in TIMEOUT_PHASES:
+            raise ValueError("unknown timeout phase {}".format(phase))
+        if budget is not None and budget < 0:
+            raise ValueError("the {} timeout should not be negative".format(phase))
+    return dict(timeouts)
+
+
+class _BaseConnection(StateMachine):
+    __slots__ = (
+        "_readers", "_writers", "_writers_into", "_buffer",
+        "_version", "_auth_methods", "_addr_type", "_addr", "_port",
+        "_max_userid_length", "_max_domain_length", "_scan_userid_end", "_scan_offset",
+        "_rfc1929", "_max_buffer_size", "_timeouts", "_clock", "_deadline", "_deadline_phase")
+
+    states = _STATES
+
+    def __init__(self, backend=None,
+                 max_userid_length=framing.SOCKS4_MAX_USERID_LENGTH,
+                 max_domain_length=framing.SOCKS4_MAX_DOMAIN_LENGTH,
+                 rfc1929=False, max_buffer_size=MAX_BUFFER_SIZE, timeouts=None, clock=None):
+        super(_BaseConnection, self).__init__()
+        self._readers, self._writers, self._writers_into = self._handler_tables(_backend_name(backend))
+        self._buffer = ReceiveBuffer()
+        self._max_userid_length = max_userid_length
+        self._max_domain_length = max_domain_length
+        self._rfc1929 = rfc1929
+        self._max_buffer_size = max_buffer_size
+        self._timeouts = _check_timeouts(timeouts)
+        self._clock = clock or _monotonic
         self._auth_methods = [AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]]
+        self.reset()
+
+    def reset(self):
+        self._state = INIT
+        self._buffer.clear()
+
+        self._version = 0xff
+        # NOTE: the methods received or sent are appended after NO_SUPPORT_AUTH_METHOD.
+        del self._auth_methods[1:]
         self._addr_type = 0xff
         self._addr = 0
         self._port = 0
+        self._reset_scan()
+        self._deadline = None
+        self._deadline_phase = None
+
+    def _reset_scan(self):
+        self._scan_userid_end = -1
+        self._scan_offset = framing.SOCKS4_HEADER_LENGTH
+
+    @classmethod
+    def _handler_tables(cls, backend):
+        """
+        Return the reader, writer and writer_into tuples of the backend,
+        indexed by state, with None for the states this role cannot recv in
+        or send in.
+        """
+        try:
+            return cls._tables[backend]
+        except KeyError:
+            pass
+
+        reader, writer = [importlib.import_module(name) for name in BACKENDS[backend]]
+        auth_reader, auth_writer = [importlib.import_module(name) for name in RFC1929_CODEC]
+
+        def table(states, module, auth_module, prefix, suffix=""):
+            return tuple(
+                (f or auth_f) if i in states else None
+                for i, (f, auth_f) in enumerate(zip(
+                    cls.handlers(module, prefix, suffix), cls.handlers(auth_module, prefix, suffix))))
+
+        tables = (
+            table(cls._recv_states, reader, auth_reader, "read_"),
+            table(cls._send_states, writer, auth_writer, "write_"),
+            table(cls._send_states, writer, auth_writer, "write_", "_into"))
+        cls._tables[backend] = tables
+        return tables
 
     def initiate_connection(self):
-        self.machine.set_state("greeting_request")
+        self._state = GREETING_REQUEST
+
+    def _auth_next_state(self, auth_type):
+        if auth_type == _USERNAME_PASSWD and self._rfc1929:
+            return AUTH_REQUEST
+        return _AUTH_NEXT_STATE.get(auth_type, AUTH_INPROGRESS)
+
+    @staticmethod
+    def _auth_result_state(event):
+        # NOTE: rfc1929 treats every status but 0 as a failure, the peer
+        # closes the connection.
+        return REQUEST if event.status == 0 else END
+
+    def auth_end(self, trailing_data=None):
+        if self._state != AUTH_INPROGRESS:
+            raise ProtocolError("{0}.auth_end: Incorrect state {1}".format(self.role_name, self.state))
+
+        if trailing_data is not None:
+            self._buffer.clear()
+            self._buffer.append(trailing_data)
+        self._state = REQUEST
+
+    @property
+    def trailing_data(self):
+        return bytes(self._buffer.peek())
+
+    def update_deadline(self):
+        """
+        Start the budget of the current phase when the connection has just
+        entered it. The deadline is kept while the phase lasts.
+        """
+        phase = _PHASES[self._recv_index()]
+        if phase == self._deadline_phase:
+            return
+
+        self._deadline_phase = phase
+        budget = self._timeouts.get(phase) if phase is not None else None
+        self._deadline = None if budget is None else self._clock() + budget
+
+    def next_deadline(self):
+        return self._deadline
+
+    def check_timeout(self, now):
+        if self._deadline is None or now < self._deadline:
+            return None
+
+        reply = self._timeout_reply()
+        self._state = END
+        self._deadline = None
+        self._deadline_phase = None
+        return reply
+
+    def _timeout_reply(self):
+        return b""
+
+    def _recv_index(self):
+        """
+        Return the state the next received message belongs to.
+        """
+        return self._state
+
+    def can_recv(self):
+        return self._readers[self._recv_index()] is not None
+
+    def bytes_needed(self):
+        state = self._recv_index()
+        if self._readers[state] is None:
+            return 0
+
+        buffered_data = self._buffer.peek()
+        return max(self._frame_length(buffered_data, state) - len(buffered_data), 0)
+
+    def _frame_length(self, data, state):
+        # NOTE: the socksv4 request is scanned incrementally and within bounds,
+        # so a client holding back the NUL byte cannot make every recv search
+        # the whole buffer again.
+        if state == GREETING_REQUEST and len(data) and framing.byte_at(data, 0) == 4:
+            length, self._scan_userid_end, self._scan_offset = framing.scan_socks4_request(
+                data, self._scan_userid_end, self._scan_offset,
+                self._max_userid_length, self._max_domain_length)
+            return length
+        return _FRAME_LENGTHS[state](data)
+
+    def _recv_event(self, data, state):
+        reader = self._readers[state]
+        if reader is None:
+            raise ProtocolError("{0}.recv: Incorrect state {1}".format(self.role_name, self.state))
+
+        buffered_data = self._buffer.feed(data)
+        length = self._frame_length(buffered_data, state)
+        if len(buffered_data) < length:
+            # NOTE: only the bytes of an incomplete message are bounded, the
+            # data pipelined behind a complete one is kept whatever its size.
+            if self._max_buffer_size is not None and len(buffered_data) > self._max_buffer_size:
+                self._buffer.clear()
+                raise ParserError("{0}.recv: more than {1} bytes buffered".format(
+                    self.role_name, self._max_buffer_size))
+
+            self._buffer.consume(0)
+            return NeedMoreData(length - len(buffered_data))
+
+        # NOTE: the reader only ever sees a complete frame.
+        current_event = reader(buffered_data)
+        self._buffer.consume(length)
+        self._reset_scan()
+        return current_event
 
-    def auth_end(self):
-        if self.state != "auth_inprogress":
-            raise ProtocolError("ClientConnection.auth_end: Incorrect state {}".format(self.state))
-        self.machine.set_state("request")
+    def _get_writer(self, event):
+        writer = self._writers[self._state]
+        if writer is None:
+            raise ProtocolError("{0}.send: Incorrect state {1}".format(self.role_name, self.state))
+
+        if _event_tag(event) not in self.send_tags[self._state]:
+            raise ProtocolError("{0}.send: Incorrect event {1} in state: {2}".format(
+                self.role_name, event, self.state))
+        return writer
+
+    def _check_send(self, event):
+        """
+        Raise ProtocolError when the event does not follow what was received.
+
+        Called before the event is written, so a rejected event leaves both
+        the connection and the caller's buffer untouched.
+        """
+
+    def send_into(self, event, buf, offset):
+        self._get_writer(event)
+        self._check_send(event)
+        length = self._writers_into[self._state](event, buf, offset)
+        self._update_state_on_send(event)
+        return length
+
+
+class _ClientConnection(_BaseConnection):
+    __slots__ = ("_optimistic_auth", "_expected")
+
+    role_name = "ClientConnection"
+    _tables = {}
+    _recv_states = (GREETING_RESPONSE, AUTH_RESPONSE, RESPONSE)
+    _send_states = (GREETING_REQUEST, AUTH_REQUEST, REQUEST)
+    send_tags = {
+        GREETING_REQUEST: (_GREETING_REQUEST, _SOCKS4_REQUEST),
+        AUTH_REQUEST: (_AUTH_REQUEST,),
+        REQUEST: (_REQUEST,),
+    }
+
+    def __init__(self, backend=None,
+                 max_userid_length=framing.SOCKS4_MAX_USERID_LENGTH,
+                 max_domain_length=framing.SOCKS4_MAX_DOMAIN_LENGTH,
+                 rfc1929=False, max_buffer_size=MAX_BUFFER_SIZE, optimistic_auth=None,
+                 timeouts=None, clock=None):
+        if optimistic_auth not in (None, AUTH_TYPE["NO_AUTH"], _USERNAME_PASSWD):
+            raise ValueError("optimistic_auth should be either NO_AUTH or USERNAME_PASSWD")
+
+        if optimistic_auth == _USERNAME_PASSWD and not rfc1929:
+            raise ValueError("optimistic USERNAME_PASSWD requires rfc1929")
+
+        self._optimistic_auth = optimistic_auth
+        # NOTE: the reply states still expected for the messages sent ahead.
+        self._expected = []
+        super(_ClientConnection, self).__init__(
+            backend, max_userid_length, max_domain_length, rfc1929, max_buffer_size, timeouts, clock)
+
+    def reset(self):
+        super(_ClientConnection, self).reset()
+        del self._expected[:]
+
+    def _recv_index(self):
+        if self._expected:
+            return self._expected[0]
+        return self._state
 
     def recv(self, data):
-        if self.state not in ("greeting_response", "response"):
-            raise ProtocolError("ClientConnection.recv: Incorrect state {}".format(self.state))
-
-        self._buffer += data
-        _reader = getattr(reader, "read_" + self.state)
-        current_event = _reader(self._buffer)
+        if self._expected:
+            return self._recv_expected(data)
 
-        if current_event == 'NeedMoreData':
+        current_event = self._recv_event(data, self._state)
+        if current_event.event_tag == _NEED_MORE_DATA:
             return current_event
-        else:
-            self._buffer = b""
 
-        if self.state == 'greeting_response':
-            if current_event == "GreetingResponse":
+        if self._state == GREETING_RESPONSE:
+            if current_event.event_tag == _GREETING_RESPONSE:
                 if self._version != 5 or current_event.auth_type not in self._auth_methods:
                     raise ProtocolError("ClientConnection:recv: receive incorrect data from server")
 
-                if current_event.auth_type == AUTH_TYPE["NO_AUTH"]:
-                    self.machine.set_state('request')
-                elif current_event.auth_type == AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]:
-                    self.machine.set_state("end")
-                else:
-                    self.machine.set_state('auth_inprogress')
+                self._state = self._auth_next_state(current_event.auth_type)
 
-            elif current_event == "Socks4Response":
+            elif current_event.event_tag == _SOCKS4_RESPONSE:
                 if self._version != 4 or self._port != current_event.port:
                     raise ProtocolError("ClientConnection:recv: receive incorrect data from server")
 
-                self.machine.set_state("end")
+                self._state = END
+
+        elif self._state == AUTH_RESPONSE:
+            self._state = self._auth_result_state(current_event)
 
-        elif self.state == 'response':
+        elif self._state == RESPONSE:
             if (self._version != 5 or
                self._addr_type != current_event.atyp or
-               self._addr != current_event.addr or
+               self._addr != _addr_key(current_event) or
                self._port != current_event.port):
                     raise ProtocolError("ClientConnection:recv: receive incorrect data from server")
-            self.machine.set_state('end')
+            self._state = END
 
         return current_event
 
-    def send(self, event):
-        if self.state not in ("greeting_request", "request"):
-            raise ProtocolError("ClientConnection.send: Incorrect state {}".format(self.state))
+    def _recv_expected(self, data):
+        """
+        Receive the reply to a message sent ahead of it in optimistic mode.
+        """
+        state = self._expected[0]
+        current_event = self._recv_event(data, state)
+        if current_event.event_tag == _NEED_MORE_DATA:
+            return current_event
 
-        if self.state == "greeting_request" and (event != "GreetingRequest" and event != "Socks4Request"):
-            raise ProtocolError("ClientConnection.send: Incorrect event {0} in state: {1}".format(event, self.state))
+        del self._expected[0]
+        if state == GREETING_RESPONSE:
+            if current_event.event_tag != _GREETING_RESPONSE:
+                raise ProtocolError("ClientConnection:recv: receive incorrect data from server")
+
+            if current_event.auth_type != self._optimistic_auth:
+                raise ProtocolError(
+                    "ClientConnection:recv: server selected auth method {0}, {1} was assumed".format(
+                        current_event.auth_type, self._optimistic_auth))
+
+        elif state == AUTH_RESPONSE:
+            if self._auth_result_state(current_event) == END:
+                # NOTE: the server closes the connection, no other reply follows.
+                del self._expected[:]
+                self._state = END
+
+        elif state == RESPONSE:
+            if (self._addr_type != current_event.atyp or
+               self._addr != _addr_key(current_event) or
+               self._port != current_event.port):
+                    raise ProtocolError("ClientConnection:recv: receive incorrect data from server")
+            self._state = END
 
-        if self.state == "request" and event != "Request":
-            raise ProtocolError("ClientConnection.send: Incorrect event {0} in state: {1}".format(event, self.state))
+        return current_event
 
-        _writer = getattr(writer, "write_" + self.state)
-        if self.state == "greeting_request":
-            if event == "GreetingRequest":
+    def send(self, event):
+        writer = self._get_writer(event)
+        self._check_send(event)
+        data = writer(event)
+        self._update_state_on_send(event)
+        return data
+
+    def _check_send(self, event):
+        if self._state == GREETING_REQUEST and event.event_tag == _GREETING_REQUEST:
+            if self._optimistic_auth is not None and self._optimistic_auth not in event.methods:
+                raise ProtocolError("ClientConnection.send: the assumed auth method is not offered")
+
+    def _update_state_on_send(self, event):
+        if self._state == GREETING_REQUEST:
+            if event.event_tag == _GREETING_REQUEST:
                 self._version = 5
                 self._auth_methods.extend(event.methods)
-            elif event == "Socks4Request":
+                if self._optimistic_auth is not None:
+                    # NOTE: carry on as if the server had selected the assumed
+                    # method, its reply is checked when it arrives.
+                    self._expected.append(GREETING_RESPONSE)
+                    self._state = self._auth_next_state(self._optimistic_auth)
+                    return
+
+            elif event.event_tag == _SOCKS4_REQUEST:
                 self._version = 4
                 self._port = event.port
-            self.machine.set_state("greeting_response")
 
-        if self.state == "request":
+        elif self._state == REQUEST:
             self._addr_type = event.atyp
-            self._addr = event.addr
+            self._addr = _addr_key(event)
             self._port = event.port
-            self.machine.set_state("response")
 
-        return _writer(event)
+        if self._expected:
+            # NOTE: sent ahead, the reply is expected after the pending ones.
+            self._expected.append(_NEXT_STATE[self._state])
+            self._state = REQUEST if self._state == AUTH_REQUEST else _NEXT_STATE[self._state]
+            return
 
+        self._state = _NEXT_STATE[self._state]
 
-class _ServerConnection(object):
-    states = [
-        'init',
-        'greeting_request',
-        'greeting_response',
-        'auth_inprogress',
-        'request',
-        'response',
-        'end'
-    ]
 
-    def __init__(self):
-        self._buffer = b""
-        self.machine = Machine(
-            model=self, states=self.states, initial='init')
-
-        self._version = 0xff
-        self._auth_methods = [AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]]
-        self._addr_type = 0xff
-        self._addr = 0
-        self._port = 0
+class _ServerConnection(_BaseConnection):
+    __slots__ = ()
 
-    def initiate_connection(self):
-        self.machine.set_state("greeting_request")
-
-    def auth_end(self):
-        if self.state != "auth_inprogress":
-            raise ProtocolError("ServerConnection.auth_end: Incorrect state {}".format(self.state))
-        self.machine.set_state("request")
+    role_name = "ServerConnection"
+    _tables = {}
+    _recv_states = (GREETING_REQUEST, AUTH_REQUEST, REQUEST)
+    _send_states = (GREETING_RESPONSE, AUTH_RESPONSE, RESPONSE)
+    send_tags = {
+        GREETING_RESPONSE: (_GREETING_RESPONSE, _SOCKS4_RESPONSE),
+        AUTH_RESPONSE: (_AUTH_RESPONSE,),
+        RESPONSE: (_RESPONSE,),
+    }
 
     def recv(self, data):
-        if self.state not in ("greeting_request", "request"):
-            raise ProtocolError("ServerConnection.recv: Incorrect state {}".format(self.state))
-
-        self._buffer += data
-        _reader = getattr(reader, "read_" + self.state)
-        current_event = _reader(self._buffer)
-
-        if current_event == "NeedMoreData":
+        current_event = self._recv_event(data, self._state)
+        if current_event.event_tag == _NEED_MORE_DATA:
             return current_event
-        else:
-            self._buffer = b""
 
-        if self.state == 'greeting_request':
-            if current_event == "GreetingRequest":
+        if self._state == GREETING_REQUEST:
+            if current_event.event_tag == _GREETING_REQUEST:
                 self._version = 5
                 self._auth_methods.extend(current_event.methods)
-            elif current_event == "Socks4Request":
+            elif current_event.event_tag == _SOCKS4_REQUEST:
                 self._version = 4
                 self._port = current_event.port
 
-            self.machine.set_state('greeting_response')
-
-        elif self.state == 'request':
-            if current_event == "Request":
+        elif self._state == REQUEST:
+            if current_event.event_tag == _REQUEST:
                 self._addr_type = current_event.atyp
-                self._addr = current_event.addr
+                self._addr = _addr_key(current_event)
                 self._port = current_event.port
 
-            self.machine.set_state('response')
-
-        self._buffer = b""
+        self._state = _NEXT_STATE[self._state]
         return current_event
 
     def send(self, event):
-        if self.state not in ("greeting_response", "response"):
-            raise ProtocolError("ServerConnection.recv: Incorrect state {}".format(self.state))
-
-        if self.state == "greeting_response" and (event != "GreetingResponse" and event != "Socks4Response"):
-            raise ProtocolError("ServerConnection.send: Incorrect event {0} in state: {1}".format(event, self.state))
-
-        if self.state == "response" and event != "Response":
-            raise ProtocolError("ServerConnection.send: Incorrect event {0} in state: {1}".format(event, self.state))
+        writer = self._get_writer(event)
+        self._check_send(event)
+        if event.event_tag == _AUTH_RESPONSE:
+            # NOTE: the auth responses are precomputed by the writer already.
+            data = writer(event)
+        else:
+            data = _reply_cache.write_reply(event, writer)
+        self._update_state_on_send(event)
+        return data
 
-        _writer = getattr(writer, "write_" + self.state)
-        if self.state == "greeting_response":
-            if event == "GreetingResponse":
+    def _check_send(self, event):
+        if self._state == GREETING_RESPONSE:
+            if event.event_tag == _GREETING_RESPONSE:
                 if (self._version != 5 or
                    event.auth_type not in self._auth_methods):
                     raise ProtocolError("ServerConnection.send: incorrect event from user.")
 
-                if event.auth_type == AUTH_TYPE["NO_AUTH"]:
-                    self.machine.set_state("request")
-                elif event.auth_type == AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]:
-                    self.machine.set_state("end")
-                else:
-                    self.machine.set_state("auth_inprogress")
-
-            elif event == "Socks4Response":
+            elif event.event_tag == _SOCKS4_RESPONSE:
                 if self._version != 4 or self._port != event.port:
                     raise ProtocolError("ServerConnection.send: incorrect event from user")
 
-                self.machine.set_state("end")
-
-        if self.state == "response":
+        elif self._state == RESPONSE:
             if (self._version != 5 or
                self._addr_type != event.atyp or
-               self._addr != event.addr or
+               self._addr != _addr_key(event) or
                self._port != event.port):
                     raise ProtocolError("ServerConnection.send: receive incorrect data from server")
-            self.machine.set_state("end")
-        return _writer(event)
+
+    def _update_state_on_send(self, event):
+        if self._state == GREETING_RESPONSE:
+            if event.event_tag == _GREETING_RESPONSE:
+                self._state = self._auth_next_state(event.auth_type)
+
+            elif event.event_tag == _SOCKS4_RESPONSE:
+                self._state = END
+
+        elif self._state == AUTH_RESPONSE:
+            self._state = self._auth_result_state(event)
+
+        elif self._state == RESPONSE:
+            self._state = END
+
+    def _timeout_reply(self):
+        if self._state == GREETING_RESPONSE:
+            return _SOCKS5_NO_METHOD if self._version == 5 else _SOCKS4_REJECTED
+        if self._state == AUTH_RESPONSE:
+            return _AUTH_FAILURE
+        if self._state == RESPONSE:
+            return _GENERAL_FAILURE
+        return b""
 
 
 class Connection(object):
-    def __init__(self, our_role):
+    __slots__ = ("_conn", "_timed")
+
+    def __init__(self, our_role, backend=None,
+                 max_userid_length=framing.SOCKS4_MAX_USERID_LENGTH,
+                 max_domain_length=framing.SOCKS4_MAX_DOMAIN_LENGTH,
+                 rfc1929=False, optimistic_auth=None, max_buffer_size=MAX_BUFFER_SIZE,
+                 timeouts=None, clock=None):
+        """
+        Args:
+            our_role (str): "server" or "client".
+            backend (str): the codec backend, "construct" or "struct".
+            max_userid_length (int): the longest socksv4 userid accepted by
+                the server, None for no bound.
+            max_domain_length (int): the longest socksv4a domain name accepted
+                by the server, None for no bound.
+            rfc1929 (bool): when USERNAME_PASSWD is selected, exchange the
+                rfc1929 AuthRequest and AuthResponse events on this connection
+                instead of entering auth_inprogress.
+            optimistic_auth (int): client only, the auth method the server is
+                assumed to select, NO_AUTH or USERNAME_PASSWD (which requires
+                rfc1929). The greeting, the credentials and the request can
+                then be sent back to back, and the replies are checked in order
+                as they arrive. A server selecting another method raises
+                ProtocolError.
+            max_buffer_size (int): the most bytes buffered for a message that
+                is still incomplete. A recv exceeding it raises ParserError,
+                None for no bound. The data received behind a complete message,
+                e.g. the first payload, is never bounded.
+            timeouts (dict): the budget in seconds of the "greeting", "auth"
+                and "request" phases, counted from the moment the connection
+                enters the phase. A missing or None budget never expires.
+            clock (callable): return the current time, time.monotonic by
+                default. check_timeout must be given times from the same clock.
+        """
         if our_role == "server":
-            self._conn = _ServerConnection()
+            if optimistic_auth is not None:
+                raise ValueError("optimistic_auth is only supported by the client")
+            self._conn = _ServerConnection(
+                backend, max_userid_length, max_domain_length, rfc1929, max_buffer_size, timeouts, clock)
         elif our_role == "client":
-            self._conn = _ClientConnection()
+            self._conn = _ClientConnection(
+                backend, max_userid_length, max_domain_length, rfc1929, max_buffer_size, optimistic_auth,
+                timeouts, clock)
         else:
             raise ValueError("unknonw role {}".format(our_role))
 
+        # NOTE: without timeouts, the deadline is never updated.
+        self._timed = timeouts is not None
+
     def initiate_connection(self):
         self._conn.initiate_connection()
-
-    def auth_end(self):
-        self._conn.auth_end()
+        if self._timed:
+            self._conn.update_deadline()
+
+    def reset(self):
+        """
+        Return the connection to the init state, so that it can be reused for
+        another handshake.
+
+        The buffered data and every field negotiated so far are dropped, the
+        codec backend is kept.
+        """
+        self._conn.reset()
+
+    def auth_end(self, trailing_data=None):
+        """
+        Indicate the authentication has ended.
+
+        Args:
+            trailing_data (bytes): the bytes left over by the authentication
+                sub-protocol, e.g. the trailing_data of the rfc1929 connection.
+                When specified, they replace the bytes buffered by this
+                connection, which have been handed to the sub-protocol.
+        """
+        self._conn.auth_end(trailing_data)
+        if self._timed:
+            self._conn.update_deadline()
+
+    @property
+    def trailing_data(self):
+        """
+        The received bytes that have not been consumed by any event yet.
+
+        Once the connection reaches the end state, these are the bytes the peer
+        sent right after the handshake, e.g. the first application payload.
+        They should be forwarded by the caller, since the connection will not
+        parse them.
+        """
+        return self._conn.trailing_data
+
+    def bytes_needed(self):
+        """
+        Return the minimum number of additional bytes required to complete
+        the current message, based on the fields received so far.
+
+        The value can be used to size the next read exactly. It is 0 when a
+        complete message is already buffered or when the connection does not
+        expect data in the current state.
+        """
+        return self._conn.bytes_needed()
 
     def recv(self, data):
-        return self._conn.recv(data)
+        current_event = self._conn.recv(data)
+        if self._timed:
+            self._conn.update_deadline()
+        return current_event
+
+    def recv_events(self, data=b""):
+        """
+        Feed the raw data and return every event that can be parsed from the
+        buffered bytes under the current state.
+
+        Parsing stops at the first incomplete message, or when the connection
+        reaches a state where the caller has to send first. An empty list means
+        more data is needed.
+
+        Called without data after a send, it returns the messages the peer
+        pipelined behind the one just answered, e.g. the rfc1929 credentials
+        and the request sent along with the greeting. The replies can then be
+        coalesced into a single write with send_into.
+        """
+        events = []
+        current_event = self._conn.recv(data)
+        while current_event.event_tag != _NEED_MORE_DATA:
+            events.append(current_event)
+            if not self._conn.can_recv():
+                break
+            current_event = self._conn.recv(b"")
+
+        if self._timed:
+            self._conn.update_deadline()
+        return events
 
     def send(self, event):
-        return self._conn.send(event)
+        data = self._conn.send(event)
+        if self._timed:
+            self._conn.update_deadline()
+        return data
+
+    def send_into(self, event, buf, offset=0):
+        """
+        Serialize the event straight into a caller-owned buffer.
+
+        Args:
+            event (Event): the event to send.
+            buf (bytearray/memoryview): a writable buffer.
+            offset (int): the position in buf to write the event at.
+
+        Return:
+            The number of bytes written.
+
+        Raise:
+            ValueError: buf is too small to hold the event at offset.
+        """
+        length = self._conn.send_into(event, buf, offset)
+        if self._timed:
+            self._conn.update_deadline()
+        return length
+
+    def next_deadline(self):
+        """
+        Return the time the current phase expires at, on the clock of the
+        connection, or None when no budget is running.
+
+        An event loop can keep the connections ordered by this value, e.g. in
+        a heap, and only call check_timeout on the ones that are due. It
+        changes whenever the connection enters another phase.
+        """
+        return self._conn.next_deadline()
+
+    def check_timeout(self, now):
+        """
+        Expire the connection if the deadline of its current phase has passed.
+
+        Args:
+            now (float): the current time, on the clock of the connection.
+
+        Return:
+            None when the deadline has not passed yet. Otherwise the connection
+            is moved to the end state and the failure reply owed to the peer
+            is returned, which the caller should write before closing. It is
+            empty when the peer is the one expected to send, or for a client.
+        """
+        return self._conn.check_timeout(now)
@@ -38,3 +38,18 @@ ADDR_TYPE = {
     "DOMAINNAME": 0x03,
     "IPV6": 0x04
 }
+
+# NOTE: the event_tag of each event class, used for dispatch instead of a
+# string comparison against event_type.
+EVENT_TAG = {
+    "NeedMoreData": 0,
+    "Socks4Request": 1,
+    "Socks4Response": 2,
+    "GreetingRequest": 3,
+    "GreetingResponse": 4,
+    "Request": 5,
+    "Response": 6,
+    "AuthRequest": 7,
+    "AuthResponse": 8,
+    "UDPDatagram": 9
+}
@@ -1,16 +1,70 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 import sys
-import ipaddress
-from socks5.define import ADDR_TYPE, REQ_COMMAND, RESP_STATUS
+import struct
+from socks5 import _inet as inet
+from socks5 import _domain as domain
+from socks5 import _framing as framing
+from socks5._framing import byte_at, SOCKS4A_ADDR
+from socks5.define import ADDR_TYPE, REQ_COMMAND, RESP_STATUS, EVENT_TAG
 
 if sys.version_info.major <= 2:
     string_func = unicode
 else:
     string_func = str
 
+_port = struct.Struct("!H")
+
+
+class lazy_field(object):
+    """
+    A field of a wire-backed event, computed from the frame on first access.
+
+    The value is stored in the "_lazy_<name>" slot, which the event class must
+    declare in its __slots__. Events built through __init__ assign the field,
+    which fills the slot directly.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.slot = "_lazy_" + func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value = self.func(instance)
+            setattr(instance, self.slot, value)
+            return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
+
+
+# NOTE: the readers only call from_wire on frames whose command and status
+# bytes the framing has already accepted, so these checks never fail there.
+# They only guard direct callers of from_wire.
+def _check_code(code, valid_codes, message):
+    if code not in valid_codes:
+        raise ValueError(message.format(code))
+
 
 class NeedMoreData(object):
+    """
+    This event indicate the raw data is not enough to parse the current event.
+
+    Args:
+        bytes_needed (int): the minimum number of additional bytes required
+            to complete the current message.
+    """
+    __slots__ = ("bytes_needed",)
     event_type = "NeedMoreData"
+    event_tag = EVENT_TAG["NeedMoreData"]
+
+    def __init__(self, bytes_needed=1):
+        self.bytes_needed = bytes_needed
 
     def __eq__(self, value):
         return self.event_type == value
@@ -29,7 +83,8 @@ class Socks4Request(object):
     Args:
         cmd (int):  specify the request socks4 command type.
             The supported value can be found in ::define.py::
-        addr (unicode/int):  specify the address.
+        addr (unicode/int/bytes):  specify the address.
+            An int or a 4-byte packed address is also accepted.
         port (int):  specify the port.
         name (unicode): specify the name identd name.
         domainname (unicode): specify the domain name.
@@ -43,18 +98,20 @@ class Socks4Request(object):
 
     """
 
+    __slots__ = ("_frame", "cmd", "port", "_lazy_packed_addr", "_lazy_name", "_lazy_domainname")
     event_type = "Socks4Request"
+    event_tag = EVENT_TAG["Socks4Request"]
 
     def __init__(self, cmd, addr, port, name, domainname=""):
         if cmd not in [0x1, 0x2]:
             raise ValueError("cmd should be either command or bind")
 
         try:
-            addr = ipaddress.IPv4Address(addr)
-        except ipaddress.AddressValueError:
+            addr = inet.pack_ipv4(addr)
+        except ValueError:
             raise ValueError("Invalid ipaddress format for IPv4")
 
-        if int(addr) == 1 and len(domainname) == 0:
+        if addr == SOCKS4A_ADDR and len(domainname) == 0:
             raise ValueError("Domain name should be specified when addr is 1")
 
         if not isinstance(name, string_func) or not isinstance(domainname, string_func):
@@ -65,12 +122,50 @@ class Socks4Request(object):
         self.name = name
 
         if domainname:
-            self.addr = ipaddress.IPv4Address(1)
+            self.packed_addr = SOCKS4A_ADDR
         else:
-            self.addr = addr
+            self.packed_addr = addr
 
         self.domainname = domainname
 
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete socksv4 request frame.
+
+        The frame must have been checked by the reader, only the command is
+        validated here. The address, name and domain name are sliced out of
+        the frame when first accessed.
+        """
+        cmd = byte_at(frame, 1)
+        _check_code(cmd, (0x1, 0x2), "cmd should be either command or bind")
+
+        event = cls.__new__(cls)
+        event._frame = frame
+        event.cmd = cmd
+        event.port = _port.unpack_from(frame, 2)[0]
+        return event
+
+    @lazy_field
+    def packed_addr(self):
+        return self._frame[4:8]
+
+    @lazy_field
+    def name(self):
+        name_end = framing.find_nul(self._frame, framing.SOCKS4_HEADER_LENGTH)
+        return string_func(self._frame[framing.SOCKS4_HEADER_LENGTH:name_end], encoding="ascii")
+
+    @lazy_field
+    def domainname(self):
+        if self.packed_addr != SOCKS4A_ADDR:
+            return ""
+        name_end = framing.find_nul(self._frame, framing.SOCKS4_HEADER_LENGTH)
+        return domain.decode(self._frame[name_end + 1:-1])
+
+    @property
+    def addr(self):
+        return inet.to_ip_address(self.packed_addr)
+
     def __eq__(self, value):
         return self.event_type == value
 
@@ -96,7 +191,9 @@ class Socks4Response(object):
             - ipaddress.IPv4Address incompatible address format type.
     """
 
+    __slots__ = ("_frame", "status", "port", "_lazy_packed_addr")
     event_type = "Socks4Response"
+    event_tag = EVENT_TAG["Socks4Response"]
 
     def __init__(self, status, addr, port):
         if status not in {0x5a, 0x5b, 0x5c, 0x5d}:
@@ -104,12 +201,37 @@ class Socks4Response(object):
 
         self.status = status
         try:
-            self.addr = ipaddress.IPv4Address(addr)
-        except ipaddress.AddressValueError:
+            self.packed_addr = inet.pack_ipv4(addr)
+        except ValueError:
             raise ValueError("Invalid ipaddress format for IPv4")
 
         self.port = port
 
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete socksv4 response frame.
+
+        The frame must have been checked by the reader, only the status is
+        validated here. The address is sliced out of the frame when first accessed.
+        """
+        status = byte_at(frame, 1)
+        _check_code(status, (0x5a, 0x5b, 0x5c, 0x5d), "Incorrect status code")
+
+        event = cls.__new__(cls)
+        event._frame = frame
+        event.status = status
+        event.port = _port.unpack_from(frame, 2)[0]
+        return event
+
+    @lazy_field
+    def packed_addr(self):
+        return self._frame[4:8]
+
+    @property
+    def addr(self):
+        return inet.to_ip_address(self.packed_addr)
+
     def __eq__(self, value):
         return self.event_type == value
 
@@ -141,7 +263,9 @@ class GreetingRequest(object):
         >>> event.methods == [0, 1]
         True
     """
+    __slots__ = ("_frame", "nmethod", "_lazy_methods")
     event_type = "GreetingRequest"
+    event_tag = EVENT_TAG["GreetingRequest"]
 
     def __init__(self, methods):
         if not isinstance(methods, list) and not isinstance(methods, tuple):
@@ -150,6 +274,22 @@ class GreetingRequest(object):
         self.nmethod = len(methods)
         self.methods = list(methods)
 
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete socks5 greeting request frame.
+
+        The methods list is built from the frame when first accessed.
+        """
+        event = cls.__new__(cls)
+        event._frame = frame
+        event.nmethod = byte_at(frame, 1)
+        return event
+
+    @lazy_field
+    def methods(self):
+        return list(bytearray(self._frame[2:]))
+
     def __eq__(self, value):
         return self.event_type == value
 
@@ -157,7 +297,7 @@ class GreetingRequest(object):
         return not self.__eq__(value)
 
     def __str__(self):
-        return "SOCKSv5 Greeting Request: number of method: {nmethod}, Auth Types : {methods}".format(**self.__dict__)
+        return "SOCKSv5 Greeting Request: number of method: {0}, Auth Types : {1}".format(self.nmethod, self.methods)
 
 
 class GreetingResponse(object):
@@ -179,11 +319,23 @@ class GreetingResponse(object):
         >>> event.auth_type == 0
         True
     """
+    __slots__ = ("_frame", "auth_type")
     event_type = "GreetingResponse"
+    event_tag = EVENT_TAG["GreetingResponse"]
 
     def __init__(self, auth_type):
         self.auth_type = auth_type
 
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete socks5 greeting response frame.
+        """
+        event = cls.__new__(cls)
+        event._frame = frame
+        event.auth_type = byte_at(frame, 1)
+        return event
+
     def __eq__(self, value):
         return self.event_type == value
 
@@ -207,9 +359,13 @@ class Request(object):
         port (int):  specify the port.
 
     Note:
-        The ::addr:: field can accept any ipaddress.ip_address compatible value.
+        The ::addr:: field can accept a text address, an integer, a packed address
+        or an ipaddress object.
         If the ::atyp:: type is domain name, the value **MUST** be a unicode type.
 
+        An ip address is stored in its packed form, exposed as ::packed_addr::.
+        Reading ::addr:: builds the ipaddress object on demand.
+
     Raise:
         ValueError: ValueError will be raised when the following condition occured.
             - specify an unsupported cmd type or atyp type.
@@ -282,7 +438,9 @@ class Request(object):
         >>> event.port
         5580
     """
+    __slots__ = ("_frame", "cmd", "atyp", "port", "_lazy_packed_addr", "_lazy__domainname")
     event_type = "Request"
+    event_tag = EVENT_TAG["Request"]
 
     def __init__(self, cmd, atyp, addr, port):
         if cmd not in REQ_COMMAND.values():
@@ -291,24 +449,62 @@ class Request(object):
         if atyp not in ADDR_TYPE.values():
             raise ValueError("Unsupported address type {}".format(atyp))
 
+        packed_addr = None
         if atyp == ADDR_TYPE["IPV4"]:
             try:
-                addr = ipaddress.IPv4Address(addr)
-            except ipaddress.AddressValueError:
+                packed_addr = inet.pack_ipv4(addr)
+            except ValueError:
                 raise ValueError("Invalid ipaddress format for IPv4")
         elif atyp == ADDR_TYPE["IPV6"]:
             try:
-                addr = ipaddress.IPv6Address(addr)
-            except ipaddress.AddressValueError:
+                packed_addr = inet.pack_ipv6(addr)
+            except ValueError:
                 raise ValueError("Invalid ipaddress format for IPv6")
         elif atyp == ADDR_TYPE["DOMAINNAME"] and not isinstance(addr, string_func):
             raise ValueError("Domain name expect to be unicode string")
 
         self.cmd = cmd
         self.atyp = atyp
-        self.addr = addr
+        self.packed_addr = packed_addr
+        self._domainname = addr if packed_addr is None else None
         self.port = port
 
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete socks5 request frame.
+
+        The frame must have been checked by the reader, only the cmd is
+        validated here. The address is sliced out of the frame when first accessed.
+        """
+        cmd = byte_at(frame, 1)
+        _check_code(cmd, REQ_COMMAND.values(), "Unsupported request command {}")
+
+        event = cls.__new__(cls)
+        event._frame = frame
+        event.cmd = cmd
+        event.atyp = byte_at(frame, 3)
+        event.port = _port.unpack_from(frame, len(frame) - 2)[0]
+        return event
+
+    @lazy_field
+    def packed_addr(self):
+        if self.atyp == ADDR_TYPE["DOMAINNAME"]:
+            return None
+        return self._frame[framing.SOCKS5_HEADER_LENGTH:-2]
+
+    @lazy_field
+    def _domainname(self):
+        if self.atyp != ADDR_TYPE["DOMAINNAME"]:
+            return None
+        return domain.decode(self._frame[framing.SOCKS5_HEADER_LENGTH + 1:-2])
+
+    @property
+    def addr(self):
+        if self.packed_addr is None:
+            return self._domainname
+        return inet.to_ip_address(self.packed_addr)
+
     def __eq__(self, value):
         return self.event_type == value
 
@@ -316,7 +512,8 @@ class Request(object):
         return not self.__eq__(value)
 
     def __str__(self):
-        return "SOCKSv5 Response: Command {cmd} : Address Type {atyp}, Addr : {addr} Port : {port}".format(**self.__dict__)
+        return "SOCKSv5 Response: Command {0} : Address Type {1}, Addr : {2} Port : {3}".format(
+            self.cmd, self.atyp, self.addr, self.port)
 
 
 class Response(object):
@@ -332,9 +529,13 @@ class Response(object):
         port (int):  specify the port.
 
     Note:
-        The ::addr:: field can accept any ipaddress.ip_address compatible value.
+        The ::addr:: field can accept a text address, an integer, a packed address
+        or an ipaddress object.
         If the ::atyp:: type is domain name, the value **MUST** be a unicode type.
 
+        An ip address is stored in its packed form, exposed as ::packed_addr::.
+        Reading ::addr:: builds the ipaddress object on demand.
+
     Raise:
         ValueError: ValueError will be raised when the following condition occured.
             - specify an unsupported status type or atyp type.
@@ -397,7 +598,9 @@ class Response(object):
         >>> event.port
         5580
     """
+    __slots__ = ("_frame", "status", "atyp", "port", "_lazy_packed_addr", "_lazy__domainname")
     event_type = "Response"
+    event_tag = EVENT_TAG["Response"]
 
     def __init__(self, status, atyp, addr, port):
         if status not in RESP_STATUS.values():
@@ -406,23 +609,175 @@ class Response(object):
         if atyp not in ADDR_TYPE.values():
             raise ValueError("Unsupported address type {}".format(atyp))
 
+        packed_addr = None
         if atyp == ADDR_TYPE["IPV4"]:
             try:
-                addr = ipaddress.IPv4Address(addr)
-            except ipaddress.AddressValueError:
+                packed_addr = inet.pack_ipv4(addr)
+            except ValueError:
                 raise ValueError("Invalid ipaddress format for IPv4")
         elif atyp == ADDR_TYPE["IPV6"]:
             try:
-                addr = ipaddress.IPv6Address(addr)
-            except ipaddress.AddressValueError:
+                packed_addr = inet.pack_ipv6(addr)
+            except ValueError:
                 raise ValueError("Invalid ipaddress format for IPv6")
         elif atyp == ADDR_TYPE["DOMAINNAME"] and not isinstance(addr, string_func):
             raise ValueError("Domain name expect to be unicode string")
 
         self.status = status
         self.atyp = atyp
-        self.addr = addr
+        self.packed_addr = packed_addr
+        self._domainname = addr if packed_addr is None else None
+        self.port = port
+
+    @classmethod
+    def from_wire(cls, frame):
+        """
+        Build the event from a complete socks5 response frame.
+
+        The frame must have been checked by the reader, only the status is
+        validated here. The address is sliced out of the frame when first accessed.
+        """
+        status = byte_at(frame, 1)
+        _check_code(status, RESP_STATUS.values(), "Unsupported status code {}")
+
+        event = cls.__new__(cls)
+        event._frame = frame
+        event.status = status
+        event.atyp = byte_at(frame, 3)
+        event.port = _port.unpack_from(frame, len(frame) - 2)[0]
+        return event
+
+    @lazy_field
+    def packed_addr(self):
+        if self.atyp == ADDR_TYPE["DOMAINNAME"]:
+            return None
+        return self._frame[framing.SOCKS5_HEADER_LENGTH:-2]
+
+    @lazy_field
+    def _domainname(self):
+        if self.atyp != ADDR_TYPE["DOMAINNAME"]:
+            return None
+        return domain.decode(self._frame[framing.SOCKS5_HEADER_LENGTH + 1:-2])
+
+    @property
+    def addr(self):
+        if self.packed_addr is None:
+            return self._domainname
+        return inet.to_ip_address(self.packed_addr)
+
+    def __eq__(self, value):
+        return self.event_type == value
+
+    def __ne__(self, value):
+        return not self.__eq__(value)
+
+    def __str__(self):
+        return "SOCKSv5 Response: Status : {0}, Addr : {1} Port : {2}".format(self.status, self.addr, self.port)
+
+
+class UDPDatagram(object):
+    """
+    This event represent a datagram relayed through a socks5 udp association,
+    the udp request header defined in section 7 of rfc1928 and its payload.
+
+    Args:
+        frag (int): the fragment number, 0 for a standalone datagram.
+        atyp (int): specify the destination address type.
+            The supported value can be found in ::define.py::
+        addr (unicode/int): specify the destination address.
+        port (int): specify the destination port.
+        data (bytes/memoryview): the payload.
+
+    Note:
+        A parsed datagram does not copy its payload, ::data:: is a memoryview
+        over the buffer given to the reader. It is only valid until the caller
+        reuses that buffer.
+
+    Raise:
+        ValueError: ValueError will be raised when the following condition occured.
+            - specify an unsupported frag or atyp type.
+            - addr field type incorrect.
+            - addr field mismatched with atyp type.
+
+    Example:
+        >>> event = UDPDatagram(0, 1, "127.0.0.1", 53, b"payload")
+        >>> event == "UDPDatagram"
+        True
+        >>> event.frag
+        0
+        >>> event.addr
+        IPv4Address('127.0.0.1')
+        >>> event.data
+        b'payload'
+    """
+    __slots__ = ("_frame", "frag", "atyp", "port", "data", "_lazy_packed_addr", "_lazy__domainname")
+    event_type = "UDPDatagram"
+    event_tag = EVENT_TAG["UDPDatagram"]
+
+    def __init__(self, frag, atyp, addr, port, data=b""):
+        if not 0 <= frag <= 0xff:
+            raise ValueError("Unsupported fragment number {}".format(frag))
+
+        if atyp not in ADDR_TYPE.values():
+            raise ValueError("Unsupported address type {}".format(atyp))
+
+        packed_addr = None
+        if atyp == ADDR_TYPE["IPV4"]:
+            try:
+                packed_addr = inet.pack_ipv4(addr)
+            except ValueError:
+                raise ValueError("Invalid ipaddress format for IPv4")
+        elif atyp == ADDR_TYPE["IPV6"]:
+            try:
+                packed_addr = inet.pack_ipv6(addr)
+            except ValueError:
+                raise ValueError("Invalid ipaddress format for IPv6")
+        elif atyp == ADDR_TYPE["DOMAINNAME"] and not isinstance(addr, string_func):
+            raise ValueError("Domain name expect to be unicode string")
+
+        self.frag = frag
+        self.atyp = atyp
+        self.packed_addr = packed_addr
+        self._domainname = addr if packed_addr is None else None
         self.port = port
+        self.data = data
+
+    @classmethod
+    def from_wire(cls, datagram, length):
+        """
+        Build the event from a whole datagram whose header, the first length
+        bytes, has been checked by the reader.
+
+        The header, at most 262 bytes, is copied so that the address does not
+        change with the datagram buffer. The payload is a memoryview over the
+        datagram.
+        """
+        view = memoryview(datagram)
+        event = cls.__new__(cls)
+        event._frame = view[:length].tobytes()
+        event.frag = byte_at(view, 2)
+        event.atyp = byte_at(view, 3)
+        event.port = _port.unpack_from(view, length - 2)[0]
+        event.data = view[length:]
+        return event
+
+    @lazy_field
+    def packed_addr(self):
+        if self.atyp == ADDR_TYPE["DOMAINNAME"]:
+            return None
+        return self._frame[framing.SOCKS5_HEADER_LENGTH:-2]
+
+    @lazy_field
+    def _domainname(self):
+        if self.atyp != ADDR_TYPE["DOMAINNAME"]:
+            return None
+        return domain.decode(self._frame[framing.SOCKS5_HEADER_LENGTH + 1:-2])
+
+    @property
+    def addr(self):
+        if self.packed_addr is None:
+            return self._domainname
+        return inet.to_ip_address(self.packed_addr)
 
     def __eq__(self, value):
         return self.event_type == value
@@ -431,4 +786,5 @@ class Response(object):
         return not self.__eq__(value)
 
     def __str__(self):
-        return "SOCKSv5 Response: Status : {status}, Addr : {addr} Port : {port}".format(**self.__dict__)
+        return "SOCKSv5 UDP Datagram: Fragment : {0}, Addr : {1} Port : {2}, Length : {3}".format(
+            self.frag, self.addr, self.port, len(self.data))
@@ -0,0 +1,81 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of reusable connection objects.
+
+    acquire returns an idle connection in the init state, or a new one from
+    factory when the pool is empty. release resets the connection and keeps it
+    for the next acquire, unless maxsize idle connections are already kept.
+
+    The pool is meant to be used from a single thread or event loop.
+
+    Args:
+        factory (callable): create a new connection,
+            e.g. lambda: Connection(our_role="server").
+        maxsize (int): the maximum number of idle connections kept.
+
+    Example:
+        >>> pool = ConnectionPool(lambda: Connection(our_role="server"))
+        >>> conn = pool.acquire()
+        >>> conn.initiate_connection()
+        >>> pool.release(conn)
+        >>> pool.acquire() is conn
+        True
+        >>> pool.reused
+        1
+    """
+
+    def __init__(self, factory, maxsize=1024):
+        if maxsize < 0:
+            raise ValueError("maxsize should not be negative")
+
+        self._factory = factory
+        self._maxsize = maxsize
+        self._idle = []
+
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self.discarded = 0
+
+    def __len__(self):
+        return len(self._idle)
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @property
+    def reuse_rate(self):
+        """
+        The ratio of acquire calls served by a pooled connection.
+        """
+        acquired = self.created + self.reused
+        return self.reused / acquired if acquired else 0.0
+
+    def acquire(self):
+        if self._idle:
+            self.reused += 1
+            return self._idle.pop()
+
+        self.created += 1
+        return self._factory()
+
+    def release(self, conn):
+        """
+        Reset the connection and keep it for reuse.
+
+        The connection must not be used by the caller afterwards.
+        """
+        self.released += 1
+        if len(self._idle) >= self._maxsize:
+            self.discarded += 1
+            return
+
+        conn.reset()
+        self._idle.append(conn)
+
+    def clear(self):
+        del self._idle[:]
@@ -3,7 +3,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import unittest
 import struct
 
-from socks5.exception import ProtocolError
+from socks5.exception import ProtocolError, ParserError
 from socks5.auth.rfc1929 import Connection
 
 from socks5.auth.rfc1929.events import AuthRequest, AuthResponse
@@ -33,6 +33,13 @@ class TestServerConnection(unittest.TestCase):
         self.assertEqual(conn._conn.state, "auth_request")
         self.assertEqual(event, "NeedMoreData")
 
+    def test_recv_non_ascii_username(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+        with self.assertRaises(ParserError):
+            conn.recv(b"\x01\x02\xff\xfe\x01p")
+        self.assertEqual(conn._conn.state, "auth_request")
+
     def test_send_auth_response(self):
         conn = Connection(our_role="server")
         conn._conn.machine.set_state("auth_response")
@@ -70,6 +77,50 @@ class TestServerConnection(unittest.TestCase):
         self.assertEqual(event.username, "user")
         self.assertEqual(event.password, "password")
 
+    def test_recv_in_auth_request_trailing_data(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("auth_request")
+
+        raw_data = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+        request = struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080)
+        event = conn.recv(raw_data + request)
+        self.assertEqual(event, "AuthRequest")
+        self.assertEqual(conn.trailing_data, request)
+
+    def test_recv_events(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+
+        raw_data = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+        self.assertEqual(conn.recv_events(raw_data[:5]), [])
+        events = conn.recv_events(raw_data[5:])
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0], "AuthRequest")
+        self.assertEqual(conn._conn.state, "auth_response")
+
+    def test_recv_memoryview(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+
+        buf = bytearray(struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password"))
+        self.assertEqual(conn.recv(memoryview(buf)[:3]), "NeedMoreData")
+        event = conn.recv(memoryview(buf)[3:])
+        self.assertEqual(event.username, "user")
+        self.assertEqual(event.password, "password")
+
+    def test_bytes_needed(self):
+        conn = Connection(our_role="server")
+        self.assertEqual(conn.bytes_needed(), 0)
+
+        conn.initiate_connection()
+        self.assertEqual(conn.bytes_needed(), 3)
+
+        conn.recv(struct.pack("!BB4s", 0x1, 0x4, b"user"))
+        self.assertEqual(conn.bytes_needed(), 1)
+
+        conn.recv(struct.pack("!B", 0x8))
+        self.assertEqual(conn.bytes_needed(), 8)
+
     def test_recv_incorrect_state_auth_response(self):
         conn = Connection(our_role="server")
         conn._conn.machine.set_state("auth_response")
@@ -139,3 +190,14 @@ class TestClientConnection(unittest.TestCase):
         raw_data = b""
         with self.assertRaises(ProtocolError):
             conn.recv(raw_data)
+
+    def test_reset(self):
+        conn = Connection(our_role="client")
+        conn.initiate_connection()
+        conn.send(AuthRequest("user", "password"))
+        conn.recv(b"\x01")
+
+        conn.reset()
+        self.assertEqual(conn._conn.state, "init")
+        self.assertEqual(conn.trailing_data, b"")
+        self.assertEqual(conn.bytes_needed(), 0)
@@ -42,3 +42,22 @@ class TestEvents(unittest.TestCase):
     def test_rfc1929_auth_response_failed_unsupported_status(self):
         with self.assertRaises(ValueError):
             AuthResponse(0xff)
+
+    def test_rfc1929_auth_request_from_wire(self):
+        event = AuthRequest.from_wire(b"\x01\x04user\x08password")
+        self.assertEqual(event, "AuthRequest")
+        self.assertFalse(hasattr(event, "_lazy_username"))
+        self.assertEqual(event.username, "user")
+        self.assertEqual(event.password, "password")
+
+        event = AuthRequest.from_wire(b"\x01\x00\x00")
+        self.assertEqual(event.username, "")
+        self.assertEqual(event.password, "")
+
+    def test_rfc1929_auth_response_from_wire(self):
+        event = AuthResponse.from_wire(b"\x01\x00")
+        self.assertEqual(event, "AuthResponse")
+        self.assertEqual(event.status, RESP_STATUS["SUCCESS"])
+
+        with self.assertRaises(ValueError):
+            AuthResponse.from_wire(b"\x01\xff")
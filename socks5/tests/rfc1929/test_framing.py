@@ -0,0 +1,34 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+import struct
+
+from socks5.exception import ParserError
+
+from socks5.auth.rfc1929._framing import auth_request_length, auth_response_length
+
+
+class TestFraming(unittest.TestCase):
+    def test_auth_request_length(self):
+        raw_data = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+        self.assertEqual(auth_request_length(b""), 3)
+        self.assertEqual(auth_request_length(raw_data[:1]), 3)
+        self.assertEqual(auth_request_length(raw_data[:2]), 7)
+        self.assertEqual(auth_request_length(raw_data[:6]), 7)
+        self.assertEqual(auth_request_length(raw_data[:7]), 15)
+        self.assertEqual(auth_request_length(raw_data + b"\x05"), 15)
+
+    def test_auth_request_length_incorrect_version(self):
+        with self.assertRaises(ParserError):
+            auth_request_length(b"\x05")
+
+    def test_auth_response_length(self):
+        self.assertEqual(auth_response_length(b""), 2)
+        self.assertEqual(auth_response_length(b"\x01"), 2)
+        with self.assertRaises(ParserError):
+            auth_response_length(b"\x05")
+
+    def test_auth_response_length_incorrect_status(self):
+        self.assertEqual(auth_response_length(b"\x01\x01"), 2)
+        with self.assertRaises(ParserError):
+            auth_response_length(b"\x01\xff")
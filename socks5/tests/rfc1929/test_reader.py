@@ -6,6 +6,7 @@ import struct
 from socks5.exception import ParserError
 from socks5.events import NeedMoreData
 
+from socks5.auth.rfc1929 import _data_structure as data_structure
 from socks5.auth.rfc1929._reader import read_auth_request, read_auth_response
 
 
@@ -26,6 +27,17 @@ class TestReader(unittest.TestCase):
             read_auth_request(
                 struct.pack("!B", 0x4))
 
+    def test_auth_request_failed_non_ascii(self):
+        with self.assertRaises(ParserError):
+            read_auth_request(struct.pack("!BB2sB1s", 0x1, 0x2, b"\xff\xfe", 0x1, b"p"))
+
+        with self.assertRaises(ParserError):
+            read_auth_request(struct.pack("!BB4sB1s", 0x1, 0x4, b"user", 0x1, b"\x80"))
+
+        # NOTE: the password length octet is not part of the checked bytes.
+        event = read_auth_request(struct.pack("!BB4sB200s", 0x1, 0x4, b"user", 200, b"p" * 200))
+        self.assertEqual(event.password, "p" * 200)
+
     def test_auth_response(self):
         auth_response = read_auth_response(
             struct.pack("!BB", 0x1, 0x0))
@@ -40,3 +52,21 @@ class TestReader(unittest.TestCase):
         with self.assertRaises(ParserError):
             read_auth_response(
                 struct.pack("!B", 0x4))
+
+    def test_auth_request_matches_construct(self):
+        for username, password in ((b"", b""), (b"user", b"password"), (b"u" * 255, b"p" * 255)):
+            raw_data = struct.pack("!B", 0x1) + struct.pack("!B", len(username)) + username + \
+                struct.pack("!B", len(password)) + password
+            parsed_data = data_structure.AuthRequest.parse(raw_data)
+            auth_request = read_auth_request(bytearray(raw_data))
+            self.assertEqual(auth_request.username.encode("ascii"), parsed_data["username"])
+            self.assertEqual(auth_request.password.encode("ascii"), parsed_data["password"])
+
+    def test_auth_request_incremental(self):
+        raw_data = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+        for i in range(len(raw_data)):
+            event = read_auth_request(raw_data[:i])
+            self.assertIsInstance(event, NeedMoreData)
+            self.assertGreaterEqual(event.bytes_needed, 1)
+            self.assertLessEqual(i + event.bytes_needed, len(raw_data))
+        self.assertEqual(read_auth_request(raw_data + b"\x05").password, "password")
@@ -6,6 +6,7 @@ import struct
 from socks5.define import RESP_STATUS
 
 from socks5.auth.rfc1929.events import AuthRequest, AuthResponse
+from socks5.auth.rfc1929 import _data_structure as data_structure
 from socks5.auth.rfc1929._writer import write_auth_request, write_auth_response
 
 
@@ -21,3 +22,21 @@ class TestWriter(unittest.TestCase):
         data = write_auth_response(event)
         expected_data = struct.pack("!BB", 0x1, 0x0)
         self.assertEqual(data, expected_data)
+
+    def test_auth_request_matches_construct(self):
+        for username, password in (("", ""), ("user", "password"), ("u" * 255, "p" * 255)):
+            expected_data = data_structure.AuthRequest.build(dict(
+                version=1, username=username.encode("ascii"), password=password.encode("ascii")))
+            self.assertEqual(write_auth_request(AuthRequest(username, password)), expected_data)
+
+    def test_auth_request_too_long(self):
+        event = AuthRequest("user", "password")
+        event.password = "p" * 256
+        with self.assertRaises(ValueError):
+            write_auth_request(event)
+
+    def test_auth_response_precomputed(self):
+        for status in RESP_STATUS.values():
+            data = write_auth_response(AuthResponse(status))
+            self.assertEqual(data, struct.pack("!BB", 0x1, status))
+            self.assertIs(data, write_auth_response(AuthResponse(status)))
@@ -0,0 +1,70 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+
+from socks5._buffer import ReceiveBuffer
+
+
+class TestReceiveBuffer(unittest.TestCase):
+    def test_append(self):
+        buf = ReceiveBuffer()
+        self.assertEqual(len(buf), 0)
+
+        buf.append(b"\x05")
+        buf.append(b"\x01\x00")
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(buf.peek(), b"\x05\x01\x00")
+
+    def test_consume(self):
+        buf = ReceiveBuffer()
+        buf.append(b"\x05\x01\x00\x05\x00")
+
+        buf.consume(3)
+        self.assertEqual(len(buf), 2)
+        self.assertEqual(buf.peek(), b"\x05\x00")
+
+        buf.append(b"\x01")
+        self.assertEqual(buf.peek(), b"\x05\x00\x01")
+
+        buf.consume(3)
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(buf.peek(), b"")
+
+    def test_clear(self):
+        buf = ReceiveBuffer()
+        buf.append(b"\x05\x01\x00")
+        buf.consume(1)
+
+        buf.clear()
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(buf.peek(), b"")
+
+    def test_feed_without_buffered_data(self):
+        buf = ReceiveBuffer()
+        data = bytearray(b"\x05\x01\x00\x05")
+        view = memoryview(data)
+
+        self.assertIs(buf.feed(view), view)
+        buf.consume(3)
+
+        # NOTE: the caller may reuse its buffer once the bytes are consumed.
+        data[3] = 0xff
+        self.assertEqual(len(buf), 1)
+        self.assertEqual(buf.peek(), b"\x05")
+
+    def test_feed_with_buffered_data(self):
+        buf = ReceiveBuffer()
+        buf.feed(memoryview(b"\x05\x01"))
+        buf.consume(0)
+
+        self.assertEqual(buf.feed(memoryview(b"\x00\x05")), b"\x05\x01\x00\x05")
+        buf.consume(3)
+        self.assertEqual(buf.peek(), b"\x05")
+
+    def test_feed_buffer_protocol_object(self):
+        import array
+        buf = ReceiveBuffer()
+        data = buf.feed(array.array(str("B"), [5, 1, 0]))
+        self.assertEqual(bytes(data), b"\x05\x01\x00")
+        buf.consume(3)
+        self.assertEqual(len(buf), 0)
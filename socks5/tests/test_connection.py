@@ -4,8 +4,9 @@ import unittest
 import struct
 import ipaddress
 
-from socks5.exception import ProtocolError
+from socks5.exception import ProtocolError, ParserError
 from socks5.connection import Connection
+from socks5.auth import rfc1929
 
 from socks5.events import (
     Socks4Request, Socks4Response,
@@ -136,12 +137,19 @@ class TestServerConnection(unittest.TestCase):
         with self.assertRaises(ProtocolError):
             conn.send(event)
 
+    def test_send_greeting_response_not_an_event(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("greeting_response")
+
+        with self.assertRaises(ProtocolError):
+            conn.send("GreetingResponse")
+
     def test_send_response(self):
         conn = Connection(our_role="server")
         conn._conn.machine.set_state("response")
         conn._conn._version = 5
         conn._conn._addr_type = ADDR_TYPE["IPV4"]
-        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1")
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
         conn._conn._port = 8080
 
         event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080)
@@ -163,7 +171,7 @@ class TestServerConnection(unittest.TestCase):
         conn._conn.machine.set_state("response")
         conn._conn._version = 5
         conn._conn._addr_type = ADDR_TYPE["IPV4"]
-        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1")
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
         conn._conn._port = 8080
 
         event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["DOMAINNAME"], "www.google.com", 8080)
@@ -175,7 +183,7 @@ class TestServerConnection(unittest.TestCase):
         conn._conn.machine.set_state("response")
         conn._conn._version = 5
         conn._conn._addr_type = ADDR_TYPE["IPV4"]
-        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1")
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
         conn._conn._port = 8080
 
         event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "192.168.0.1", 8080)
@@ -187,7 +195,7 @@ class TestServerConnection(unittest.TestCase):
         conn._conn.machine.set_state("response")
         conn._conn._version = 5
         conn._conn._addr_type = ADDR_TYPE["IPV4"]
-        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1")
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
         conn._conn._port = 8080
 
         event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 5580)
@@ -242,6 +250,40 @@ class TestServerConnection(unittest.TestCase):
         self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
         self.assertEqual(event.name, "Johnny")
 
+    def test_recv_in_greeting_request_socks4a_byte_by_byte(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("greeting_request")
+        raw_data = struct.pack(
+            "!BBH4B6sB14sB", 0x4, 0x1, 5580, 0, 0, 0, 1, b"Johnny", 0, b"www.google.com", 0)
+        for i in range(len(raw_data) - 1):
+            self.assertEqual(conn.recv(raw_data[i:i + 1]), "NeedMoreData")
+        event = conn.recv(raw_data[-1:])
+        self.assertEqual(event, "Socks4Request")
+        self.assertEqual(event.name, "Johnny")
+        self.assertEqual(event.domainname, "www.google.com")
+        self.assertEqual(conn._conn._scan_userid_end, -1)
+
+    def test_recv_in_greeting_request_socks4_userid_too_long(self):
+        conn = Connection(our_role="server", max_userid_length=8)
+        conn._conn.machine.set_state("greeting_request")
+        conn.recv(struct.pack("!BBH4B", 0x4, 0x1, 5580, 127, 0, 0, 1))
+        self.assertEqual(conn.recv(b"a" * 8), "NeedMoreData")
+        with self.assertRaises(ParserError):
+            conn.recv(b"a")
+
+    def test_recv_in_greeting_request_socks4a_domain_too_long(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("greeting_request")
+        with self.assertRaises(ParserError):
+            conn.recv(struct.pack("!BBH4BB", 0x4, 0x1, 5580, 0, 0, 0, 1, 0) + b"a" * 256)
+
+    def test_recv_in_greeting_request_socks4_unbounded(self):
+        conn = Connection(our_role="server", max_userid_length=None)
+        conn._conn.machine.set_state("greeting_request")
+        raw_data = struct.pack("!BBH4B", 0x4, 0x1, 5580, 127, 0, 0, 1) + b"a" * 1024 + b"\0"
+        event = conn.recv(raw_data)
+        self.assertEqual(event.name, "a" * 1024)
+
     def test_recv_in_request(self):
         conn = Connection(our_role="server")
         conn._conn.machine.set_state("request")
@@ -269,6 +311,22 @@ class TestServerConnection(unittest.TestCase):
         with self.assertRaises(ProtocolError):
             conn.recv(b"")
 
+    def test_recv_keeps_trailing_data(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("greeting_request")
+
+        greeting = struct.pack("!BBB", 0x5, 0x1, 0x00)
+        request = struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080)
+        event = conn.recv(greeting + request)
+        self.assertEqual(event, "GreetingRequest")
+        self.assertEqual(conn.trailing_data, request)
+
+        conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+        event = conn.recv(b"")
+        self.assertEqual(event, "Request")
+        self.assertEqual(event.port, 8080)
+        self.assertEqual(conn.trailing_data, b"")
+
 
 class TestClientConnection(unittest.TestCase):
     def test_initiate_connection(self):
@@ -447,7 +505,7 @@ class TestClientConnection(unittest.TestCase):
         conn._conn.machine.set_state("response")
         conn._conn._version = 5
         conn._conn._addr_type = ADDR_TYPE["IPV4"]
-        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1")
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
         conn._conn._port = 8080
 
         raw_data = struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8080)
@@ -459,12 +517,26 @@ class TestClientConnection(unittest.TestCase):
         self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
         self.assertEqual(event.port, 8080)
 
+    def test_recv_in_response_trailing_data(self):
+        conn = Connection(our_role="client")
+        conn._conn.machine.set_state("response")
+        conn._conn._version = 5
+        conn._conn._addr_type = ADDR_TYPE["IPV4"]
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
+        conn._conn._port = 8080
+
+        raw_data = struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8080)
+        event = conn.recv(raw_data + b"HTTP/1.1 200 OK")
+        self.assertEqual(event, "Response")
+        self.assertEqual(conn._conn.state, "end")
+        self.assertEqual(conn.trailing_data, b"HTTP/1.1 200 OK")
+
     def test_recv_in_response_with_incorrect_addr(self):
         conn = Connection(our_role="client")
         conn._conn.machine.set_state("response")
         conn._conn._version = 5
         conn._conn._addr_type = ADDR_TYPE["IPV4"]
-        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1")
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
         conn._conn._port = 8080
 
         raw_data = struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 2, 8080)
@@ -486,3 +558,746 @@ class TestClientConnection(unittest.TestCase):
         raw_data = b""
         with self.assertRaises(ProtocolError):
             conn.recv(raw_data)
+
+
+class TestConnectionBackend(unittest.TestCase):
+    def test_incorrect_backend(self):
+        with self.assertRaises(ValueError):
+            Connection(our_role="server", backend="yoyo")
+
+    def test_struct_backend_handshake(self):
+        client = Connection(our_role="client", backend="struct")
+        server = Connection(our_role="server", backend="struct")
+        client.initiate_connection()
+        server.initiate_connection()
+
+        event = server.recv(client.send(GreetingRequest((AUTH_TYPE["NO_AUTH"], ))))
+        self.assertEqual(event, "GreetingRequest")
+
+        event = client.recv(server.send(GreetingResponse(AUTH_TYPE["NO_AUTH"])))
+        self.assertEqual(event, "GreetingResponse")
+
+        request = Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["DOMAINNAME"], "google.com", 80)
+        event = server.recv(client.send(request))
+        self.assertEqual(event, "Request")
+        self.assertEqual(event.addr, "google.com")
+
+        response = Response(RESP_STATUS["SUCCESS"], event.atyp, event.addr, event.port)
+        event = client.recv(server.send(response))
+        self.assertEqual(event, "Response")
+        self.assertEqual(client._conn.state, "end")
+        self.assertEqual(server._conn.state, "end")
+
+
+class TestRecvEvents(unittest.TestCase):
+    def test_recv_events_need_more_data(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+
+        self.assertEqual(conn.recv_events(b"\x05"), [])
+        self.assertEqual(conn.recv_events(b"\x01"), [])
+        events = conn.recv_events(b"\x00")
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0], "GreetingRequest")
+
+    def test_recv_events_incorrect_state(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("response")
+
+        with self.assertRaises(ProtocolError):
+            conn.recv_events(b"")
+
+    def test_recv_events_greeting_auth_request_in_one_segment(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+
+        greeting = struct.pack("!BBB", 0x5, 0x1, AUTH_TYPE["USERNAME_PASSWD"])
+        auth_request = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+        request = struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080)
+
+        events = conn.recv_events(greeting + auth_request + request)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0], "GreetingRequest")
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+
+        auth_conn = rfc1929.Connection(our_role="server")
+        auth_conn.initiate_connection()
+        events = auth_conn.recv_events(conn.trailing_data)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0], "AuthRequest")
+        auth_conn.send(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"]))
+
+        conn.auth_end(auth_conn.trailing_data)
+        events = conn.recv_events(b"")
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0], "Request")
+        self.assertEqual(events[0].port, 8080)
+
+
+class TestBufferProtocolInput(unittest.TestCase):
+    def _recv_into(self, conn, raw_data, chunk_size):
+        # NOTE: simulate sock.recv_into with a single preallocated buffer.
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        events = []
+        for i in range(0, len(raw_data), chunk_size):
+            chunk = raw_data[i:i + chunk_size]
+            buf[:len(chunk)] = chunk
+            events.extend(conn.recv_events(view[:len(chunk)]))
+            buf[:] = b"\xff" * chunk_size
+        return events
+
+    def test_recv_memoryview(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend)
+            conn._conn.machine.set_state("request")
+
+            raw_data = struct.pack("!BBxBB10sH", 0x5, 0x1, 0x3, 10, b"google.com", 8080)
+            for chunk_size in (1, 3, len(raw_data)):
+                conn._conn.machine.set_state("request")
+                events = self._recv_into(conn, raw_data, chunk_size)
+                self.assertEqual(len(events), 1)
+                self.assertEqual(events[0].addr, "google.com")
+                self.assertEqual(events[0].port, 8080)
+
+    def test_recv_memoryview_socks4(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend)
+            conn.initiate_connection()
+
+            raw_data = struct.pack(
+                "!BBH4B6sB14sB", 0x4, 0x1, 5580, 0, 0, 0, 1, b"Johnny", 0, b"www.google.com", 0)
+            events = self._recv_into(conn, raw_data, 4)
+            self.assertEqual(len(events), 1)
+            self.assertEqual(events[0].name, "Johnny")
+            self.assertEqual(events[0].domainname, "www.google.com")
+
+    def test_recv_memoryview_keeps_trailing_data(self):
+        conn = Connection(our_role="client", backend="struct")
+        conn._conn.machine.set_state("response")
+        conn._conn._version = 5
+        conn._conn._addr_type = ADDR_TYPE["IPV4"]
+        conn._conn._addr = ipaddress.IPv4Address("127.0.0.1").packed
+        conn._conn._port = 8080
+
+        buf = bytearray(struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8080) + b"payload")
+        event = conn.recv(memoryview(buf))
+        buf[:] = b"\x00" * len(buf)
+        self.assertEqual(event, "Response")
+        self.assertEqual(conn.trailing_data, b"payload")
+
+
+class TestBytesNeeded(unittest.TestCase):
+    def test_bytes_needed_server(self):
+        conn = Connection(our_role="server")
+        self.assertEqual(conn.bytes_needed(), 0)
+
+        conn.initiate_connection()
+        self.assertEqual(conn.bytes_needed(), 2)
+
+        conn.recv(b"\x05\x02")
+        self.assertEqual(conn.bytes_needed(), 2)
+
+        conn.recv(b"\x00\x02")
+        self.assertEqual(conn._conn.state, "greeting_response")
+        self.assertEqual(conn.bytes_needed(), 0)
+
+        conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+        self.assertEqual(conn.bytes_needed(), 7)
+
+        conn.recv(b"\x05\x01\x00\x03\x0a")
+        self.assertEqual(conn.bytes_needed(), 12)
+
+        conn.recv(b"google.com")
+        self.assertEqual(conn.bytes_needed(), 2)
+
+    def test_bytes_needed_client(self):
+        conn = Connection(our_role="client")
+        conn.initiate_connection()
+        self.assertEqual(conn.bytes_needed(), 0)
+
+        conn.send(Socks4Request(REQ_COMMAND["CONNECT"], "127.0.0.1", 5580, "Johnny"))
+        self.assertEqual(conn.bytes_needed(), 2)
+
+        conn.recv(b"\x00")
+        self.assertEqual(conn.bytes_needed(), 7)
+
+
+class TestSendInto(unittest.TestCase):
+    def test_send_into(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend)
+            conn.initiate_connection()
+            conn.recv(struct.pack("!BBB", 0x5, 0x1, 0x00))
+
+            buf = bytearray(32)
+            offset = conn.send_into(GreetingResponse(AUTH_TYPE["NO_AUTH"]), buf, 0)
+            self.assertEqual(conn._conn.state, "request")
+
+            request = conn.recv(struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080))
+            response = Response(RESP_STATUS["SUCCESS"], request.atyp, request.addr, request.port)
+            offset += conn.send_into(response, buf, offset)
+            self.assertEqual(conn._conn.state, "end")
+
+            expected_data = struct.pack("!BB", 0x5, 0x0) + struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8080)
+            self.assertEqual(bytes(buf[:offset]), expected_data)
+
+    def test_send_into_buffer_too_small(self):
+        conn = Connection(our_role="server", backend="struct")
+        conn.initiate_connection()
+        conn.recv(struct.pack("!BBB", 0x5, 0x1, 0x00))
+
+        with self.assertRaises(ValueError):
+            conn.send_into(GreetingResponse(AUTH_TYPE["NO_AUTH"]), bytearray(1), 0)
+        self.assertEqual(conn._conn.state, "greeting_response")
+
+    def test_send_into_rejected_event(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend)
+            conn.initiate_connection()
+            conn.recv(struct.pack("!BBB", 0x5, 0x1, 0x00))
+            conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+            conn.recv(struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080))
+
+            buf = bytearray(b"\xaa" * 32)
+            response = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 80)
+            with self.assertRaises(ProtocolError):
+                conn.send_into(response, buf, 0)
+            self.assertEqual(buf, bytearray(b"\xaa" * 32))
+            self.assertEqual(conn._conn.state, "response")
+
+    def test_send_event_reuse(self):
+        conn = Connection(our_role="client")
+        conn._conn.machine.set_state("request")
+        conn._conn._version = 5
+
+        event = Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080)
+        data = conn.send(event)
+        self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
+
+        conn._conn.machine.set_state("request")
+        self.assertEqual(conn.send(event), data)
+
+
+class TestReset(unittest.TestCase):
+    def test_reset_server(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend)
+            conn.initiate_connection()
+            conn.recv(struct.pack("!BBB", 0x5, 0x1, 0x00))
+            conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+            conn.recv(struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080) + b"\x05")
+
+            conn.reset()
+            self.assertEqual(conn._conn.state, "init")
+            self.assertEqual(conn.trailing_data, b"")
+            self.assertEqual(conn._conn._version, 0xff)
+            self.assertEqual(conn._conn._auth_methods, [AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]])
+            self.assertEqual(conn._conn._addr_type, 0xff)
+            self.assertEqual(conn._conn._port, 0)
+
+            conn.initiate_connection()
+            event = conn.recv(struct.pack("!BBB", 0x5, 0x1, 0x02))
+            self.assertEqual(event.methods, [AUTH_TYPE["USERNAME_PASSWD"]])
+            self.assertEqual(conn._conn._auth_methods, [AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"], AUTH_TYPE["USERNAME_PASSWD"]])
+
+    def test_reset_client(self):
+        conn = Connection(our_role="client")
+        conn.initiate_connection()
+        conn._conn._version = 5
+        conn.send(Socks4Request(REQ_COMMAND["CONNECT"], "127.0.0.1", 8080, "Johnny"))
+
+        conn.reset()
+        self.assertEqual(conn._conn.state, "init")
+        self.assertEqual(conn._conn._version, 0xff)
+        self.assertEqual(conn._conn._port, 0)
+
+
+class TestRFC1929Session(unittest.TestCase):
+    GREETING_REQUEST = struct.pack("!BBB", 0x5, 0x1, 0x02)
+    AUTH_REQUEST = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+    REQUEST = struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080)
+
+    def test_server(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend, rfc1929=True)
+            conn.initiate_connection()
+            conn.recv(self.GREETING_REQUEST)
+            self.assertEqual(conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"])), b"\x05\x02")
+            self.assertEqual(conn._conn.state, "auth_request")
+
+            event = conn.recv(self.AUTH_REQUEST)
+            self.assertEqual(event, "AuthRequest")
+            self.assertEqual(event.username, "user")
+            self.assertEqual(event.password, "password")
+            self.assertEqual(conn._conn.state, "auth_response")
+
+            self.assertEqual(conn.send(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"])), b"\x01\x00")
+            self.assertEqual(conn._conn.state, "request")
+            self.assertEqual(conn.recv(self.REQUEST), "Request")
+
+    def test_server_pipelined(self):
+        conn = Connection(our_role="server", rfc1929=True)
+        conn.initiate_connection()
+        events = conn.recv_events(self.GREETING_REQUEST + self.AUTH_REQUEST + self.REQUEST)
+        self.assertEqual(len(events), 1)
+
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        events = conn.recv_events(b"")
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0], "AuthRequest")
+
+        conn.send(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"]))
+        events = conn.recv_events(b"")
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0], "Request")
+        self.assertEqual(conn.trailing_data, b"")
+
+    def test_server_auth_failure(self):
+        conn = Connection(our_role="server", rfc1929=True)
+        conn.initiate_connection()
+        conn.recv(self.GREETING_REQUEST + self.AUTH_REQUEST)
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        conn.recv(b"")
+        self.assertEqual(conn.send(rfc1929.AuthResponse(RESP_STATUS["GENRAL_FAILURE"])), b"\x01\x01")
+        self.assertEqual(conn._conn.state, "end")
+
+    def test_server_incorrect_event(self):
+        conn = Connection(our_role="server", rfc1929=True)
+        conn._conn.machine.set_state("auth_response")
+        with self.assertRaises(ProtocolError):
+            conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+
+    def test_server_without_rfc1929(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+        conn.recv(self.GREETING_REQUEST)
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        self.assertEqual(conn._conn.state, "auth_inprogress")
+
+    def test_client(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="client", backend=backend, rfc1929=True)
+            conn.initiate_connection()
+            conn._conn._version = 5
+            conn._conn._auth_methods.append(AUTH_TYPE["USERNAME_PASSWD"])
+            conn._conn.machine.set_state("greeting_response")
+            conn.recv(b"\x05\x02")
+            self.assertEqual(conn._conn.state, "auth_request")
+
+            self.assertEqual(conn.send(rfc1929.AuthRequest("user", "password")), self.AUTH_REQUEST)
+            self.assertEqual(conn._conn.state, "auth_response")
+            self.assertEqual(conn.bytes_needed(), 2)
+
+            event = conn.recv(b"\x01\x00")
+            self.assertEqual(event, "AuthResponse")
+            self.assertEqual(conn._conn.state, "request")
+
+    def test_client_auth_failure(self):
+        conn = Connection(our_role="client", rfc1929=True)
+        conn._conn.machine.set_state("auth_response")
+        conn.recv(b"\x01\x01")
+        self.assertEqual(conn._conn.state, "end")
+
+    def test_send_into(self):
+        conn = Connection(our_role="server", rfc1929=True)
+        conn._conn.machine.set_state("auth_response")
+        buf = bytearray(4)
+        self.assertEqual(conn.send_into(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"]), buf, 1), 2)
+        self.assertEqual(bytes(buf), b"\x00\x01\x00\x00")
+        self.assertEqual(conn._conn.state, "request")
+
+
+class TestServerPipelining(unittest.TestCase):
+    GREETING_REQUEST = struct.pack("!BBB", 0x5, 0x1, 0x02)
+    AUTH_REQUEST = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+    REQUEST = struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080)
+
+    def test_one_round_trip(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend, rfc1929=True)
+            conn.initiate_connection()
+            buf = bytearray(64)
+
+            events = conn.recv_events(self.GREETING_REQUEST + self.AUTH_REQUEST + self.REQUEST + b"payload")
+            self.assertEqual(events[0], "GreetingRequest")
+            offset = conn.send_into(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]), buf, 0)
+
+            events = conn.recv_events()
+            self.assertEqual(events[0], "AuthRequest")
+            offset += conn.send_into(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"]), buf, offset)
+
+            events = conn.recv_events()
+            self.assertEqual(events[0], "Request")
+            offset += conn.send_into(
+                Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080), buf, offset)
+
+            self.assertEqual(conn._conn.state, "end")
+            self.assertEqual(conn.trailing_data, b"payload")
+            expected_data = b"\x05\x02" + b"\x01\x00" + struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8080)
+            self.assertEqual(bytes(buf[:offset]), expected_data)
+
+    def test_recv_events_without_data(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+        self.assertEqual(conn.recv_events(), [])
+        conn.recv_events(b"\x05\x01\x00" + self.REQUEST[:4])
+        conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+        self.assertEqual(conn.recv_events(), [])
+        self.assertEqual(conn.recv_events(self.REQUEST[4:])[0], "Request")
+
+    def test_pipelined_after_auth_failure(self):
+        conn = Connection(our_role="server", rfc1929=True)
+        conn.initiate_connection()
+        conn.recv_events(self.GREETING_REQUEST + self.AUTH_REQUEST + self.REQUEST)
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        conn.recv_events()
+        conn.send(rfc1929.AuthResponse(RESP_STATUS["CONNECTION_NOT_ALLOWED"]))
+
+        self.assertEqual(conn._conn.state, "end")
+        self.assertEqual(conn.trailing_data, self.REQUEST)
+        with self.assertRaises(ProtocolError):
+            conn.recv_events()
+
+
+class TestClientOptimistic(unittest.TestCase):
+    REQUEST = struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080)
+    RESPONSE = struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8080)
+
+    # NOTE: the greeting requests are written with the struct backend, the
+    # construct one cannot build them on every python version.
+    def _connection(self, **kwargs):
+        kwargs.setdefault("backend", "struct")
+        return Connection(our_role="client", **kwargs)
+
+    def _request(self):
+        return Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080)
+
+    def test_no_auth(self):
+        conn = self._connection(optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        data = conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        self.assertEqual(conn._conn.state, "request")
+        data += conn.send(self._request())
+        self.assertEqual(data, b"\x05\x01\x00" + self.REQUEST)
+
+        self.assertEqual(conn.bytes_needed(), 2)
+        events = conn.recv_events(b"\x05\x00" + self.RESPONSE + b"payload")
+        self.assertEqual(events, ["GreetingResponse", "Response"])
+        self.assertEqual(conn._conn.state, "end")
+        self.assertEqual(conn.trailing_data, b"payload")
+
+    def test_username_password(self):
+        conn = self._connection(rfc1929=True, optimistic_auth=AUTH_TYPE["USERNAME_PASSWD"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["USERNAME_PASSWD"]]))
+        self.assertEqual(conn._conn.state, "auth_request")
+        conn.send(rfc1929.AuthRequest("user", "password"))
+        self.assertEqual(conn._conn.state, "request")
+        conn.send(self._request())
+
+        self.assertEqual(conn.recv_events(b"\x05\x02\x01"), ["GreetingResponse"])
+        self.assertEqual(conn.recv_events(b"\x00" + self.RESPONSE[:4]), ["AuthResponse"])
+        self.assertEqual(conn.recv_events(self.RESPONSE[4:]), ["Response"])
+        self.assertEqual(conn._conn.state, "end")
+
+    def test_reply_before_request(self):
+        conn = self._connection(optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        self.assertEqual(conn.recv(b"\x05\x00"), "GreetingResponse")
+        self.assertEqual(conn._conn.state, "request")
+
+        conn.send(self._request())
+        self.assertEqual(conn.recv(self.RESPONSE), "Response")
+        self.assertEqual(conn._conn.state, "end")
+
+    def test_method_mismatch(self):
+        conn = self._connection(optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"], AUTH_TYPE["USERNAME_PASSWD"]]))
+        conn.send(self._request())
+        with self.assertRaises(ProtocolError):
+            conn.recv(b"\x05\x02")
+
+    def test_no_acceptable_method(self):
+        conn = self._connection(optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        with self.assertRaises(ProtocolError):
+            conn.recv(b"\x05\xff")
+
+    def test_auth_failure(self):
+        conn = self._connection(rfc1929=True, optimistic_auth=AUTH_TYPE["USERNAME_PASSWD"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["USERNAME_PASSWD"]]))
+        conn.send(rfc1929.AuthRequest("user", "password"))
+        conn.send(self._request())
+
+        self.assertEqual(conn.recv_events(b"\x05\x02\x01\x01"), ["GreetingResponse", "AuthResponse"])
+        self.assertEqual(conn._conn.state, "end")
+        self.assertEqual(conn.bytes_needed(), 0)
+
+    def test_response_mismatch(self):
+        conn = self._connection(optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        conn.send(self._request())
+        with self.assertRaises(ProtocolError):
+            conn.recv_events(b"\x05\x00" + struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8081))
+
+    def test_assumed_method_not_offered(self):
+        conn = self._connection(optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        with self.assertRaises(ProtocolError):
+            conn.send(GreetingRequest([AUTH_TYPE["USERNAME_PASSWD"]]))
+
+        # NOTE: the rejected greeting leaves no trace for the next attempt.
+        self.assertEqual(conn._conn.state, "greeting_request")
+        self.assertEqual(conn._conn._version, 0xff)
+        self.assertEqual(conn._conn._auth_methods, [AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]])
+
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        self.assertEqual(conn._conn._auth_methods, [AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"], AUTH_TYPE["NO_AUTH"]])
+        self.assertEqual(conn.recv(b"\x05\x00"), "GreetingResponse")
+
+    def test_send_out_of_order(self):
+        conn = self._connection(rfc1929=True, optimistic_auth=AUTH_TYPE["USERNAME_PASSWD"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["USERNAME_PASSWD"]]))
+        with self.assertRaises(ProtocolError):
+            conn.send(self._request())
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Connection(our_role="client", optimistic_auth=AUTH_TYPE["GSSAPI"])
+        with self.assertRaises(ValueError):
+            Connection(our_role="client", optimistic_auth=AUTH_TYPE["USERNAME_PASSWD"])
+        with self.assertRaises(ValueError):
+            Connection(our_role="server", optimistic_auth=AUTH_TYPE["NO_AUTH"])
+
+    def test_reset(self):
+        conn = self._connection(optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        conn.reset()
+        self.assertEqual(conn._conn._expected, [])
+        self.assertEqual(conn._conn.state, "init")
+
+
+class TestEarlyRejection(unittest.TestCase):
+    def test_junk_rejected_on_first_byte(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend)
+            conn.initiate_connection()
+            with self.assertRaises(ParserError):
+                conn.recv(b"GET / HTTP/1.1\r\nHost: example.com\r\n\r\n")
+            self.assertEqual(len(conn._conn._buffer), 0)
+
+    def test_empty_socks4a_domain_rejected(self):
+        for backend in ("construct", "struct"):
+            conn = Connection(our_role="server", backend=backend)
+            conn.initiate_connection()
+            with self.assertRaises(ParserError):
+                conn.recv(b"\x04\x01\x00P\x00\x00\x00\x01user\x00\x00")
+            self.assertEqual(conn._conn.state, "greeting_request")
+
+    def test_incorrect_command_rejected_early(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("request")
+        with self.assertRaises(ParserError):
+            conn.recv(b"\x05\x09")
+
+    def test_incorrect_address_type_rejected_early(self):
+        conn = Connection(our_role="server")
+        conn._conn.machine.set_state("request")
+        with self.assertRaises(ParserError):
+            conn.recv(b"\x05\x01\x00\x05")
+
+    def test_incorrect_rfc1929_version_rejected_early(self):
+        conn = Connection(our_role="server", rfc1929=True)
+        conn._conn.machine.set_state("auth_request")
+        with self.assertRaises(ParserError):
+            conn.recv(b"\x05")
+
+    def test_max_buffer_size(self):
+        conn = Connection(our_role="server", max_buffer_size=16)
+        conn.initiate_connection()
+        conn.recv(b"\x05\x01\x00" + b"\x05\x01\x00\x03\xff" + b"a" * 8)
+        conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+        self.assertEqual(conn.recv(b"a" * 3), "NeedMoreData")
+        with self.assertRaises(ParserError):
+            conn.recv(b"a")
+        self.assertEqual(len(conn._conn._buffer), 0)
+
+    def test_max_buffer_size_single_recv(self):
+        conn = Connection(our_role="server", max_buffer_size=16)
+        conn.initiate_connection()
+        with self.assertRaises(ParserError):
+            conn.recv(b"\x05\xff" + b"\x00" * 15)
+
+    def test_max_buffer_size_payload_behind_handshake(self):
+        payload = b"x" * 70000
+        conn = Connection(our_role="server", backend="struct")
+        conn.initiate_connection()
+        data = b"\x05\x01\x00" + b"\x05\x01\x00\x01\x7f\x00\x00\x01\x1f\x90" + payload
+        self.assertEqual(conn.recv_events(data), ["GreetingRequest"])
+        conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+        self.assertEqual(conn.recv_events(), ["Request"])
+        conn.send(Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+        self.assertEqual(conn._conn.state, "end")
+        self.assertEqual(conn.trailing_data, payload)
+
+        conn = Connection(our_role="client", backend="struct", optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.initiate_connection()
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        conn.send(Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+        data = b"\x05\x00" + b"\x05\x00\x00\x01\x7f\x00\x00\x01\x1f\x90" + payload
+        self.assertEqual(conn.recv_events(data), ["GreetingResponse", "Response"])
+        self.assertEqual(conn._conn.state, "end")
+        self.assertEqual(conn.trailing_data, payload)
+
+    def test_max_buffer_size_unbounded(self):
+        conn = Connection(our_role="server", max_buffer_size=None)
+        conn.initiate_connection()
+        conn.recv(b"\x05\x01\x00" + b"a" * 65536)
+        self.assertEqual(len(conn.trailing_data), 65536)
+
+
+class TestDeadlines(unittest.TestCase):
+    GREETING_REQUEST = struct.pack("!BBB", 0x5, 0x1, 0x02)
+    AUTH_REQUEST = struct.pack("!BB4sB8s", 0x1, 0x4, b"user", 0x8, b"password")
+    REQUEST = struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080)
+    TIMEOUTS = {"greeting": 5, "auth": 10, "request": 30}
+
+    def setUp(self):
+        self.now = 100.0
+
+    def _connection(self, our_role="server", **kwargs):
+        kwargs.setdefault("timeouts", self.TIMEOUTS)
+        kwargs.setdefault("backend", "struct")
+        conn = Connection(our_role=our_role, clock=lambda: self.now, **kwargs)
+        conn.initiate_connection()
+        return conn
+
+    def test_no_timeouts(self):
+        conn = Connection(our_role="server")
+        conn.initiate_connection()
+        self.assertIsNone(conn.next_deadline())
+        self.assertIsNone(conn.check_timeout(float("inf")))
+        self.assertEqual(conn._conn.state, "greeting_request")
+
+    def test_unknown_phase(self):
+        with self.assertRaises(ValueError):
+            Connection(our_role="server", timeouts={"connect": 5})
+
+        with self.assertRaises(ValueError):
+            Connection(our_role="server", timeouts={"greeting": -1})
+
+    def test_deadline_per_phase(self):
+        conn = self._connection(rfc1929=True)
+        self.assertEqual(conn.next_deadline(), 105.0)
+
+        # NOTE: the deadline runs from the start of the phase, not from the last recv.
+        self.now = 103.0
+        conn.recv(self.GREETING_REQUEST[:1])
+        conn.recv(self.GREETING_REQUEST[1:])
+        self.assertEqual(conn.next_deadline(), 105.0)
+
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        self.assertEqual(conn.next_deadline(), 113.0)
+
+        self.now = 104.0
+        conn.recv(self.AUTH_REQUEST)
+        conn.send(rfc1929.AuthResponse(RESP_STATUS["SUCCESS"]))
+        self.assertEqual(conn.next_deadline(), 134.0)
+
+        conn.recv(self.REQUEST)
+        conn.send(Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+        self.assertIsNone(conn.next_deadline())
+
+    def test_phase_without_budget(self):
+        conn = self._connection(timeouts={"request": 30})
+        self.assertIsNone(conn.next_deadline())
+        conn.recv(struct.pack("!BBB", 0x5, 0x1, 0x00))
+        conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+        self.assertEqual(conn.next_deadline(), 130.0)
+
+    def test_check_timeout(self):
+        conn = self._connection()
+        self.assertIsNone(conn.check_timeout(104.9))
+        self.assertEqual(conn._conn.state, "greeting_request")
+
+        self.assertEqual(conn.check_timeout(105.0), b"")
+        self.assertEqual(conn._conn.state, "end")
+        self.assertIsNone(conn.next_deadline())
+        self.assertIsNone(conn.check_timeout(200.0))
+
+    def test_server_failure_replies(self):
+        conn = self._connection()
+        conn.recv(self.GREETING_REQUEST)
+        self.assertEqual(conn.check_timeout(105.0), b"\x05\xff")
+
+        conn = self._connection()
+        conn.recv(struct.pack("!BBH4B6sB", 0x4, 0x1, 5580, 127, 0, 0, 1, b"Johnny", 0))
+        self.assertEqual(conn.check_timeout(105.0), b"\x00\x5b" + b"\x00" * 6)
+
+        conn = self._connection(rfc1929=True)
+        conn.recv(self.GREETING_REQUEST)
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        self.assertEqual(conn.check_timeout(110.0), b"")
+
+        conn = self._connection(rfc1929=True)
+        conn.recv(self.GREETING_REQUEST)
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        conn.recv(self.AUTH_REQUEST)
+        self.assertEqual(conn.check_timeout(110.0), b"\x01\x01")
+
+        conn = self._connection()
+        conn.recv(struct.pack("!BBB", 0x5, 0x1, 0x00))
+        conn.send(GreetingResponse(AUTH_TYPE["NO_AUTH"]))
+        conn.recv(self.REQUEST)
+        self.assertEqual(
+            conn.check_timeout(130.0),
+            struct.pack("!BBxB4BH", 0x5, RESP_STATUS["GENRAL_FAILURE"], 0x1, 0, 0, 0, 0, 0))
+
+    def test_auth_inprogress(self):
+        conn = self._connection()
+        conn.recv(self.GREETING_REQUEST)
+        conn.send(GreetingResponse(AUTH_TYPE["USERNAME_PASSWD"]))
+        self.assertEqual(conn.next_deadline(), 110.0)
+
+        self.now = 108.0
+        conn.auth_end()
+        self.assertEqual(conn.next_deadline(), 138.0)
+
+    def test_client(self):
+        conn = self._connection("client")
+        self.assertEqual(conn.next_deadline(), 105.0)
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        self.assertEqual(conn.next_deadline(), 105.0)
+
+        conn.recv(b"\x05\x00")
+        self.assertEqual(conn.next_deadline(), 130.0)
+        self.assertEqual(conn.check_timeout(130.0), b"")
+        self.assertEqual(conn._conn.state, "end")
+
+    def test_client_optimistic(self):
+        # NOTE: the phase follows the oldest reply still expected.
+        conn = self._connection("client", optimistic_auth=AUTH_TYPE["NO_AUTH"])
+        conn.send(GreetingRequest([AUTH_TYPE["NO_AUTH"]]))
+        self.now = 101.0
+        conn.send(Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080))
+        self.assertEqual(conn.next_deadline(), 105.0)
+
+        conn.recv(b"\x05\x00")
+        self.assertEqual(conn.next_deadline(), 131.0)
+
+    def test_reset(self):
+        conn = self._connection()
+        self.now = 200.0
+        conn.reset()
+        self.assertIsNone(conn.next_deadline())
+        conn.initiate_connection()
+        self.assertEqual(conn.next_deadline(), 205.0)
+
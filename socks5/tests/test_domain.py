@@ -0,0 +1,93 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+import threading
+
+from socks5 import _domain as domain
+from socks5._domain import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_hit_and_miss(self):
+        calls = []
+
+        def func(key):
+            calls.append(key)
+            return key * 2
+
+        cache = LRUCache(func, maxsize=2)
+        self.assertEqual(cache(1), 2)
+        self.assertEqual(cache(1), 2)
+        self.assertEqual(calls, [1])
+
+        info = domain._info(cache)
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.maxsize, 2)
+        self.assertEqual(info.currsize, 1)
+        self.assertEqual(info.hit_rate, 0.5)
+
+    def test_evict_least_recently_used(self):
+        calls = []
+
+        def func(key):
+            calls.append(key)
+            return key
+
+        cache = LRUCache(func, maxsize=2)
+        cache(1)
+        cache(2)
+        cache(1)
+        cache(3)
+        self.assertEqual(cache.cache_info()[3], 2)
+
+        cache(1)
+        cache(2)
+        self.assertEqual(calls, [1, 2, 3, 2])
+
+    def test_clear(self):
+        cache = LRUCache(lambda key: key)
+        cache(1)
+        cache.cache_clear()
+        self.assertEqual(domain._info(cache), (0, 0, domain.MAXSIZE, 0, 0.0))
+
+    def test_threads(self):
+        cache = LRUCache(lambda key: key, maxsize=8)
+
+        def worker():
+            for i in range(1000):
+                cache(i % 16)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        hits, misses, _, currsize = cache.cache_info()
+        self.assertEqual(hits + misses, 4000)
+        self.assertEqual(currsize, 8)
+
+
+class TestDomain(unittest.TestCase):
+    def setUp(self):
+        domain.clear()
+
+    def test_encode(self):
+        self.assertEqual(domain.encode("www.google.com"), b"www.google.com")
+        self.assertEqual(domain.encode("bücher.de"), b"xn--bcher-kva.de")
+        self.assertEqual(domain.encode("bücher.de"), b"xn--bcher-kva.de")
+
+        encode_info = domain.cache_info()
+        self.assertEqual(encode_info.hits, 1)
+        self.assertEqual(encode_info.misses, 2)
+
+    def test_decode_interned(self):
+        first = domain.decode(bytes(bytearray(b"www.google.com")))
+        second = domain.decode(b"www.google." + b"com")
+        self.assertEqual(first, "www.google.com")
+        self.assertIs(first, second)
+        self.assertEqual(domain.cache_info().currsize, 0)
+
+    def test_decode_invalid(self):
+        self.assertRaises(UnicodeDecodeError, domain.decode, b"\xff")
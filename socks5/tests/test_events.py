@@ -7,11 +7,11 @@ from socks5.events import (
     NeedMoreData,
     Socks4Request, Socks4Response,
     GreetingRequest, GreetingResponse,
-    Request, Response)
+    Request, Response, UDPDatagram)
 
 from socks5.define import (
     REQ_COMMAND, AUTH_TYPE,
-    RESP_STATUS, ADDR_TYPE)
+    RESP_STATUS, ADDR_TYPE, EVENT_TAG)
 
 
 class TestEvents(unittest.TestCase):
@@ -92,6 +92,18 @@ class TestEvents(unittest.TestCase):
         self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
         self.assertEqual(event.port, 8080)
 
+    def test_request_packed_addr(self):
+        event = Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], b"\x7f\x00\x00\x01", 8080)
+        self.assertEqual(event.packed_addr, b"\x7f\x00\x00\x01")
+        self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
+
+        event = Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV6"], "::1", 8080)
+        self.assertEqual(event.packed_addr, b"\x00" * 15 + b"\x01")
+
+        event = Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["DOMAINNAME"], "google.com", 8080)
+        self.assertIsNone(event.packed_addr)
+        self.assertEqual(event.addr, "google.com")
+
     def test_request_unsupported_cmd_type(self):
         with self.assertRaises(ValueError):
             Request(
@@ -148,3 +160,102 @@ class TestEvents(unittest.TestCase):
         with self.assertRaises(ValueError):
             Response(
                 REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV6"], ":::::::1", 8080)
+
+
+class TestFromWire(unittest.TestCase):
+    def test_socks4_request(self):
+        event = Socks4Request.from_wire(b"\x04\x01\x1f\x90\x7f\x00\x00\x01Johnny\x00")
+        self.assertEqual(event, "Socks4Request")
+        self.assertEqual(event.cmd, REQ_COMMAND["CONNECT"])
+        self.assertEqual(event.port, 8080)
+        self.assertFalse(hasattr(event, "_lazy_name"))
+        self.assertEqual(event.name, "Johnny")
+        self.assertEqual(event.domainname, "")
+        self.assertEqual(event.packed_addr, b"\x7f\x00\x00\x01")
+        self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
+
+    def test_socks4a_request(self):
+        event = Socks4Request.from_wire(b"\x04\x01\x1f\x90\x00\x00\x00\x01Johnny\x00google.com\x00")
+        self.assertEqual(event.name, "Johnny")
+        self.assertEqual(event.domainname, "google.com")
+        self.assertEqual(event.addr, ipaddress.IPv4Address("0.0.0.1"))
+
+    def test_socks4_request_unsupported_cmd_type(self):
+        with self.assertRaises(ValueError):
+            Socks4Request.from_wire(b"\x04\x03\x1f\x90\x7f\x00\x00\x01\x00")
+
+    def test_socks4_response(self):
+        event = Socks4Response.from_wire(b"\x00\x5a\x1f\x90\x7f\x00\x00\x01")
+        self.assertEqual(event, "Socks4Response")
+        self.assertEqual(event.status, 0x5a)
+        self.assertEqual(event.port, 8080)
+        self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
+
+        with self.assertRaises(ValueError):
+            Socks4Response.from_wire(b"\x00\x00\x1f\x90\x7f\x00\x00\x01")
+
+    def test_greeting_request(self):
+        event = GreetingRequest.from_wire(b"\x05\x02\x00\x02")
+        self.assertEqual(event, "GreetingRequest")
+        self.assertEqual(event.nmethod, 2)
+        self.assertFalse(hasattr(event, "_lazy_methods"))
+        self.assertEqual(event.methods, [AUTH_TYPE["NO_AUTH"], AUTH_TYPE["USERNAME_PASSWD"]])
+        self.assertIs(event.methods, event.methods)
+
+    def test_greeting_response(self):
+        event = GreetingResponse.from_wire(b"\x05\x02")
+        self.assertEqual(event, "GreetingResponse")
+        self.assertEqual(event.auth_type, AUTH_TYPE["USERNAME_PASSWD"])
+
+    def test_request(self):
+        event = Request.from_wire(b"\x05\x01\x00\x01\x7f\x00\x00\x01\x1f\x90")
+        self.assertEqual(event, "Request")
+        self.assertEqual(event.cmd, REQ_COMMAND["CONNECT"])
+        self.assertEqual(event.atyp, ADDR_TYPE["IPV4"])
+        self.assertEqual(event.port, 8080)
+        self.assertFalse(hasattr(event, "_lazy_packed_addr"))
+        self.assertEqual(event.packed_addr, b"\x7f\x00\x00\x01")
+        self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
+
+        event = Request.from_wire(b"\x05\x01\x00\x04" + b"\x00" * 15 + b"\x01\x1f\x90")
+        self.assertEqual(event.addr, ipaddress.IPv6Address("::1"))
+
+        event = Request.from_wire(b"\x05\x01\x00\x03\x0agoogle.com\x1f\x90")
+        self.assertIsNone(event.packed_addr)
+        self.assertEqual(event.addr, "google.com")
+        self.assertEqual(event.port, 8080)
+
+    def test_request_unsupported_cmd_type(self):
+        with self.assertRaises(ValueError):
+            Request.from_wire(b"\x05\xff\x00\x01\x7f\x00\x00\x01\x1f\x90")
+
+    def test_response(self):
+        event = Response.from_wire(b"\x05\x00\x00\x03\x0agoogle.com\x1f\x90")
+        self.assertEqual(event, "Response")
+        self.assertEqual(event.status, RESP_STATUS["SUCCESS"])
+        self.assertEqual(event.atyp, ADDR_TYPE["DOMAINNAME"])
+        self.assertEqual(event.addr, "google.com")
+        self.assertEqual(event.port, 8080)
+
+        with self.assertRaises(ValueError):
+            Response.from_wire(b"\x05\xff\x00\x01\x7f\x00\x00\x01\x1f\x90")
+
+
+class TestEventTag(unittest.TestCase):
+    def test_event_tag(self):
+        events = [
+            NeedMoreData(),
+            Socks4Request(REQ_COMMAND["CONNECT"], "127.0.0.1", 8080, "Johnny"),
+            Socks4Response(0x5a, "127.0.0.1", 8080),
+            GreetingRequest([AUTH_TYPE["NO_AUTH"]]),
+            GreetingResponse(AUTH_TYPE["NO_AUTH"]),
+            Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080),
+            Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["IPV4"], "127.0.0.1", 8080),
+            UDPDatagram(0, ADDR_TYPE["IPV4"], "127.0.0.1", 53),
+        ]
+        for event in events:
+            self.assertEqual(event.event_tag, EVENT_TAG[event.event_type])
+            self.assertEqual(event, event.event_type)
+            self.assertFalse(hasattr(event, "__dict__"))
+
+        self.assertEqual(len(set(EVENT_TAG.values())), len(EVENT_TAG))
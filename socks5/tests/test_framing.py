@@ -0,0 +1,135 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+import struct
+
+from socks5.exception import ParserError
+
+from socks5._framing import (
+    greeting_request_length, greeting_response_length,
+    request_length, response_length, scan_socks4_request,
+    udp_header_length)
+
+
+class TestFraming(unittest.TestCase):
+    def test_greeting_request_length_socks5(self):
+        raw_data = struct.pack("!BB3B", 0x5, 0x3, 0x00, 0x01, 0x02)
+        self.assertEqual(greeting_request_length(b""), 2)
+        self.assertEqual(greeting_request_length(raw_data[:1]), 2)
+        for i in range(2, len(raw_data) + 1):
+            self.assertEqual(greeting_request_length(raw_data[:i]), 5)
+
+    def test_greeting_request_length_socks4(self):
+        raw_data = struct.pack("!BBH4B6sB", 0x4, 0x1, 5580, 127, 0, 0, 1, b"Johnny", 0)
+        self.assertEqual(greeting_request_length(raw_data[:3]), 9)
+        self.assertEqual(greeting_request_length(raw_data[:8]), 9)
+        self.assertEqual(greeting_request_length(raw_data[:10]), 11)
+        self.assertEqual(greeting_request_length(raw_data), 15)
+        self.assertEqual(greeting_request_length(raw_data + b"extra"), 15)
+
+    def test_greeting_request_length_socks4a(self):
+        raw_data = struct.pack("!BBH4B6sB14sB", 0x4, 0x1, 5580, 0, 0, 0, 1, b"Johnny", 0, b"www.google.com", 0)
+        self.assertEqual(greeting_request_length(raw_data[:8]), 10)
+        self.assertEqual(greeting_request_length(raw_data[:10]), 12)
+        self.assertEqual(greeting_request_length(raw_data[:15]), 16)
+        self.assertEqual(greeting_request_length(raw_data[:20]), 21)
+        self.assertEqual(greeting_request_length(raw_data), 30)
+
+    def test_scan_socks4_request_resume(self):
+        raw_data = struct.pack("!BBH4B6sB14sB", 0x4, 0x1, 5580, 0, 0, 0, 1, b"Johnny", 0, b"www.google.com", 0)
+        self.assertEqual(scan_socks4_request(raw_data[:12]), (14, -1, 12))
+        self.assertEqual(scan_socks4_request(raw_data[:20], -1, 12), (21, 14, 20))
+        self.assertEqual(scan_socks4_request(raw_data, 14, 20), (30, 14, 29))
+
+    def test_scan_socks4_request_resume_skips_scanned_bytes(self):
+        # NOTE: a NUL byte before the resume offset has already been searched for.
+        raw_data = struct.pack("!BBH4B3sB3sB", 0x4, 0x1, 5580, 127, 0, 0, 1, b"Joh", 0, b"nny", 0)
+        self.assertEqual(scan_socks4_request(raw_data, -1, 12)[0], 16)
+
+    def test_scan_socks4_request_userid_too_long(self):
+        header = struct.pack("!BBH4B", 0x4, 0x1, 5580, 127, 0, 0, 1)
+        self.assertEqual(scan_socks4_request(header + b"a" * 4, max_userid_length=4)[0], 13)
+        self.assertEqual(scan_socks4_request(header + b"a" * 4 + b"\0", max_userid_length=4)[0], 13)
+        with self.assertRaises(ParserError):
+            scan_socks4_request(header + b"a" * 5, max_userid_length=4)
+
+    def test_scan_socks4_request_domain_too_long(self):
+        header = struct.pack("!BBH4B", 0x4, 0x1, 5580, 0, 0, 0, 1)
+        self.assertEqual(scan_socks4_request(header + b"\0" + b"a" * 4 + b"\0", max_domain_length=4)[0], 14)
+        with self.assertRaises(ParserError):
+            scan_socks4_request(header + b"\0" + b"a" * 5, max_domain_length=4)
+
+    def test_scan_socks4_request_memoryview(self):
+        raw_data = struct.pack("!BBH4B6sB", 0x4, 0x1, 5580, 127, 0, 0, 1, b"Johnny", 0)
+        self.assertEqual(scan_socks4_request(memoryview(raw_data))[0], 15)
+        with self.assertRaises(ParserError):
+            scan_socks4_request(memoryview(raw_data), max_userid_length=5)
+
+    def test_greeting_request_length_incorrect_version(self):
+        with self.assertRaises(ParserError):
+            greeting_request_length(b"\x03")
+
+    def test_greeting_request_length_socks4_incorrect_command(self):
+        self.assertEqual(greeting_request_length(b"\x04\x01"), 9)
+        with self.assertRaises(ParserError):
+            greeting_request_length(b"\x04\x03")
+
+    def test_greeting_response_length_socks4_incorrect_status(self):
+        self.assertEqual(greeting_response_length(b"\x00\x5a"), 8)
+        with self.assertRaises(ParserError):
+            greeting_response_length(b"\x00\x00")
+
+    def test_greeting_response_length(self):
+        self.assertEqual(greeting_response_length(b""), 2)
+        self.assertEqual(greeting_response_length(b"\x05"), 2)
+        self.assertEqual(greeting_response_length(b"\x00"), 8)
+        with self.assertRaises(ParserError):
+            greeting_response_length(b"\x01")
+
+    def test_request_length(self):
+        self.assertEqual(request_length(b""), 7)
+        self.assertEqual(request_length(b"\x05\x01\x00\x01"), 10)
+        self.assertEqual(request_length(b"\x05\x01\x00\x04"), 22)
+        self.assertEqual(request_length(b"\x05\x01\x00\x03"), 7)
+        self.assertEqual(request_length(b"\x05\x01\x00\x03\x0a"), 17)
+
+    def test_request_length_incorrect_version(self):
+        with self.assertRaises(ParserError):
+            request_length(b"\x04")
+
+    def test_request_length_incorrect_address_type(self):
+        with self.assertRaises(ParserError):
+            request_length(b"\x05\x01\x00\x02")
+
+    def test_response_length(self):
+        self.assertEqual(response_length(b"\x05\x00\x00\x01"), 10)
+        with self.assertRaises(ParserError):
+            response_length(b"\x04")
+
+    def test_request_length_incorrect_command(self):
+        self.assertEqual(request_length(b"\x05\x03"), 7)
+        with self.assertRaises(ParserError):
+            request_length(b"\x05\x04")
+
+    def test_response_length_incorrect_status(self):
+        self.assertEqual(response_length(b"\x05\x08"), 7)
+        with self.assertRaises(ParserError):
+            response_length(b"\x05\x09")
+
+    def test_udp_header_length(self):
+        raw_data = struct.pack("!HBB4BH", 0, 0, 0x1, 127, 0, 0, 1, 53) + b"payload"
+        self.assertEqual(udp_header_length(raw_data[:2]), 7)
+        self.assertEqual(udp_header_length(raw_data), 10)
+        self.assertEqual(udp_header_length(b"\x00\x00\x00\x03\x0bexample.com\x00\x35"), 18)
+        self.assertEqual(udp_header_length(b"\x00\x00\x00\x04"), 22)
+
+    def test_udp_header_length_incorrect_reserved_field(self):
+        with self.assertRaises(ParserError):
+            udp_header_length(b"\x05\x01\x00\x01")
+
+        with self.assertRaises(ParserError):
+            udp_header_length(b"\x00\x00\x00\x05")
+
+    def test_scan_socks4a_empty_domain(self):
+        with self.assertRaises(ParserError):
+            scan_socks4_request(b"\x04\x01\x00P\x00\x00\x00\x01user\x00\x00")
@@ -0,0 +1,42 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+import ipaddress
+
+from socks5 import _inet as inet
+
+
+class TestInet(unittest.TestCase):
+    def test_pack_ipv4(self):
+        packed = b"\x7f\x00\x00\x01"
+        self.assertEqual(inet.pack_ipv4("127.0.0.1"), packed)
+        self.assertEqual(inet.pack_ipv4(0x7f000001), packed)
+        self.assertEqual(inet.pack_ipv4(packed), packed)
+        self.assertEqual(inet.pack_ipv4(ipaddress.IPv4Address("127.0.0.1")), packed)
+
+    def test_pack_ipv6(self):
+        packed = b"\x00" * 15 + b"\x01"
+        self.assertEqual(inet.pack_ipv6("::1"), packed)
+        self.assertEqual(inet.pack_ipv6(1), packed)
+        self.assertEqual(inet.pack_ipv6(packed), packed)
+        self.assertEqual(inet.pack_ipv6(ipaddress.IPv6Address("::1")), packed)
+
+    def test_pack_invalid(self):
+        for addr in ("127.0.0", "::1", b"\x00" * 3, -1, 1 << 32, True, 1.0, None):
+            self.assertRaises(ValueError, inet.pack_ipv4, addr)
+
+        for addr in ("127.0.0.1", "::g", b"\x00" * 4, -1, 1 << 128, None):
+            self.assertRaises(ValueError, inet.pack_ipv6, addr)
+
+    def test_to_text(self):
+        self.assertEqual(inet.to_text(b"\x7f\x00\x00\x01"), "127.0.0.1")
+        self.assertEqual(inet.to_text(b"\x00" * 15 + b"\x01"), "::1")
+
+    def test_to_int(self):
+        self.assertEqual(inet.to_int(b"\x7f\x00\x00\x01"), 0x7f000001)
+        self.assertEqual(inet.to_int(b"\x00" * 15 + b"\x01"), 1)
+        self.assertEqual(inet.to_int(b"\xff" * 16), (1 << 128) - 1)
+
+    def test_to_ip_address(self):
+        self.assertEqual(inet.to_ip_address(b"\x7f\x00\x00\x01"), ipaddress.IPv4Address("127.0.0.1"))
+        self.assertEqual(inet.to_ip_address(b"\x00" * 15 + b"\x01"), ipaddress.IPv6Address("::1"))
@@ -0,0 +1,38 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import sys
+import subprocess
+import unittest
+
+import socks5
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestLazyImport(unittest.TestCase):
+    @unittest.skipIf(sys.version_info < (3, 7), "module __getattr__ requires python 3.7")
+    def test_import_is_lazy(self):
+        script = (
+            "import sys, socks5\n"
+            "print(' '.join(name for name in ('socks5.events', 'socks5.connection', 'construct') "
+            "if name in sys.modules))\n")
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=_ROOT)
+        self.assertEqual(output.strip(), b"")
+
+    def test_lazy_attributes(self):
+        from socks5.connection import Connection
+        from socks5.events import Request
+        from socks5.pool import ConnectionPool
+        self.assertIs(socks5.Connection, Connection)
+        self.assertIs(socks5.Request, Request)
+        self.assertIs(socks5.ConnectionPool, ConnectionPool)
+        self.assertIn("Connection", dir(socks5))
+
+    def test_all(self):
+        for name in socks5.__all__:
+            self.assertTrue(hasattr(socks5, name))
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            socks5.missing
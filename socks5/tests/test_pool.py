@@ -0,0 +1,57 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+
+from socks5 import Connection, ConnectionPool
+from socks5.auth import rfc1929
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_acquire_new(self):
+        pool = ConnectionPool(lambda: Connection(our_role="server"))
+        conn = pool.acquire()
+        self.assertIsInstance(conn, Connection)
+        self.assertEqual(conn._conn.state, "init")
+        self.assertEqual(pool.created, 1)
+        self.assertEqual(pool.reused, 0)
+        self.assertEqual(pool.reuse_rate, 0.0)
+
+    def test_release_and_reuse(self):
+        pool = ConnectionPool(lambda: Connection(our_role="server"))
+        conn = pool.acquire()
+        conn.initiate_connection()
+        conn.recv(b"\x05\x01\x00\x05")
+
+        pool.release(conn)
+        self.assertEqual(len(pool), 1)
+
+        reused = pool.acquire()
+        self.assertIs(reused, conn)
+        self.assertEqual(reused._conn.state, "init")
+        self.assertEqual(reused.trailing_data, b"")
+        self.assertEqual(len(pool), 0)
+
+        self.assertEqual(pool.created, 1)
+        self.assertEqual(pool.reused, 1)
+        self.assertEqual(pool.released, 1)
+        self.assertEqual(pool.reuse_rate, 0.5)
+
+    def test_bounded(self):
+        pool = ConnectionPool(lambda: rfc1929.Connection(our_role="server"), maxsize=1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(pool.released, 2)
+        self.assertEqual(pool.discarded, 1)
+        self.assertIs(pool.acquire(), first)
+
+    def test_clear(self):
+        pool = ConnectionPool(lambda: Connection(our_role="client"))
+        pool.release(pool.acquire())
+        pool.clear()
+        self.assertEqual(len(pool), 0)
+
+    def test_negative_maxsize(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(lambda: Connection(our_role="client"), maxsize=-1)
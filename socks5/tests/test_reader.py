@@ -159,3 +159,13 @@ class TestReader(unittest.TestCase):
         with self.assertRaises(ParserError):
             read_response(
                 struct.pack("!B", 0x4))
+
+    def test_not_enough_data_bytes_needed(self):
+        event = read_greeting_request(struct.pack("!BB", 0x5, 0x3))
+        self.assertEqual(event.bytes_needed, 3)
+
+        event = read_request(struct.pack("!BBxBB", 0x5, 0x1, 0x3, 10))
+        self.assertEqual(event.bytes_needed, 12)
+
+        event = read_greeting_response(b"")
+        self.assertEqual(event.bytes_needed, 2)
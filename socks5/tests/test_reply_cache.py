@@ -0,0 +1,64 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+import struct
+
+from socks5.events import GreetingResponse, Response, Socks4Response
+from socks5.define import AUTH_TYPE, RESP_STATUS, ADDR_TYPE
+
+from socks5 import _reply_cache
+from socks5._struct_writer import write_greeting_response, write_response
+
+
+class TestReplyCache(unittest.TestCase):
+    def setUp(self):
+        _reply_cache.clear()
+
+    def _fail_writer(self, event):
+        raise AssertionError("writer should not be called for {}".format(event))
+
+    def test_static_replies(self):
+        data = _reply_cache.write_reply(GreetingResponse(AUTH_TYPE["NO_AUTH"]), self._fail_writer)
+        self.assertEqual(data, struct.pack("!BB", 0x5, 0x0))
+
+        data = _reply_cache.write_reply(GreetingResponse(AUTH_TYPE["NO_SUPPORT_AUTH_METHOD"]), self._fail_writer)
+        self.assertEqual(data, struct.pack("!BB", 0x5, 0xff))
+
+    def test_dynamic_replies(self):
+        event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["DOMAINNAME"], "google.com", 80)
+        data = _reply_cache.write_reply(event, write_response)
+        self.assertEqual(data, write_response(event))
+        self.assertEqual(len(_reply_cache._replies), 0)
+
+        event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["DOMAINNAME"], "google.com", 80)
+        data = _reply_cache.write_reply(event, write_response)
+        self.assertIs(_reply_cache.write_reply(event, self._fail_writer), data)
+
+        event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["DOMAINNAME"], "google.com", 443)
+        self.assertNotEqual(_reply_cache.write_reply(event, write_response), data)
+
+    def test_one_off_replies_not_cached(self):
+        for port in range(_reply_cache.MAXSIZE + 10):
+            event = Socks4Response(RESP_STATUS["REQUEST_GRANTED"], "127.0.0.1", port)
+            _reply_cache.write_reply(event, write_greeting_response)
+        self.assertEqual(len(_reply_cache._replies), 0)
+        self.assertLessEqual(len(_reply_cache._seen), _reply_cache.MAXSIZE)
+
+    def test_bounded(self):
+        for port in range(_reply_cache.MAXSIZE + 10):
+            event = Socks4Response(RESP_STATUS["REQUEST_GRANTED"], "127.0.0.1", port)
+            _reply_cache.write_reply(event, write_greeting_response)
+            _reply_cache.write_reply(event, write_greeting_response)
+        self.assertLessEqual(len(_reply_cache._replies), _reply_cache.MAXSIZE)
+
+        # NOTE: a full cache keeps its entries instead of being flushed.
+        event = Socks4Response(RESP_STATUS["REQUEST_GRANTED"], "127.0.0.1", 0)
+        self.assertEqual(_reply_cache.write_reply(event, self._fail_writer), write_greeting_response(event))
+
+        data = _reply_cache.write_reply(GreetingResponse(AUTH_TYPE["NO_AUTH"]), self._fail_writer)
+        self.assertEqual(data, struct.pack("!BB", 0x5, 0x0))
+
+    def test_timeout_replies(self):
+        self.assertEqual(_reply_cache.NO_ACCEPTABLE_METHOD, struct.pack("!BB", 0x5, 0xff))
+        self.assertEqual(_reply_cache.SOCKS4_REJECTED, struct.pack("!BBH4B", 0, 0x5b, 0, 0, 0, 0, 0))
+        self.assertEqual(_reply_cache.GENERAL_FAILURE, struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 0, 0, 0, 0, 0))
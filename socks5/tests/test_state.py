@@ -0,0 +1,40 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+
+from socks5 import _framing as framing
+from socks5._state import StateMachine
+from socks5.connection import Connection
+
+
+class _Model(StateMachine):
+    __slots__ = ()
+    states = ("init", "greeting_request", "greeting_response", "end")
+
+
+class TestStateMachine(unittest.TestCase):
+    def test_initial_state(self):
+        model = _Model()
+        self.assertEqual(model.state, "init")
+        self.assertEqual(model._state, 0)
+
+    def test_set_state(self):
+        model = _Model()
+        model.machine.set_state("greeting_response")
+        self.assertEqual(model.state, "greeting_response")
+        self.assertEqual(model._state, 2)
+
+    def test_set_unknown_state(self):
+        model = _Model()
+        with self.assertRaises(ValueError):
+            model.machine.set_state("request")
+        self.assertEqual(model.state, "init")
+
+    def test_handlers(self):
+        self.assertEqual(
+            _Model.handlers(framing, "", "_length"),
+            (None, framing.greeting_request_length, framing.greeting_response_length, None))
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(_Model(), "__dict__"))
+        self.assertFalse(hasattr(Connection(our_role="server")._conn, "__dict__"))
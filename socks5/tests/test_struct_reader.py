@@ -0,0 +1,192 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+import struct
+import ipaddress
+
+from socks5.exception import ParserError
+from socks5.events import NeedMoreData
+from socks5.events import GreetingRequest, GreetingResponse
+from socks5.events import Socks4Request, Socks4Response
+
+from socks5 import _reader
+from socks5._struct_reader import (
+    read_greeting_request, read_greeting_response,
+    read_request, read_response)
+
+
+_FIELDS = {
+    "GreetingRequest": ("nmethod", "methods"),
+    "GreetingResponse": ("auth_type",),
+    "Socks4Request": ("cmd", "port", "packed_addr", "addr", "name", "domainname"),
+    "Socks4Response": ("status", "port", "packed_addr", "addr"),
+    "Request": ("cmd", "atyp", "port", "packed_addr", "addr"),
+    "Response": ("status", "atyp", "port", "packed_addr", "addr"),
+}
+
+
+class TestStructReader(unittest.TestCase):
+    def test_greeting_request_socks5(self):
+        request = read_greeting_request(
+            struct.pack("!BB2B", 0x5, 0x2, 0x00, 0x01))
+        self.assertIsInstance(request, GreetingRequest)
+        self.assertEqual(request.nmethod, 2)
+        self.assertEqual(request.methods, [0, 1])
+
+    def test_greeting_request_socks4(self):
+        raw_data = struct.pack("!BBH4B6sB", 0x4, 0x1, 5580, 127, 0, 0, 1, "Johnny".encode("ascii"), 0)
+
+        request = read_greeting_request(raw_data)
+        self.assertIsInstance(request, Socks4Request)
+        self.assertEqual(request.cmd, 1)
+        self.assertEqual(request.port, 5580)
+        self.assertEqual(request.addr, ipaddress.IPv4Address("127.0.0.1"))
+        self.assertEqual(request.name, "Johnny")
+
+    def test_greeting_request_socks4a(self):
+        raw_data = struct.pack(
+            "!BBH4B6sB14sB", 0x4, 0x1, 5580, 0, 0, 0, 1, "Johnny".encode("ascii"), 0, "www.google.com".encode("idna"), 0)
+
+        request = read_greeting_request(raw_data)
+        self.assertIsInstance(request, Socks4Request)
+        self.assertEqual(request.addr, ipaddress.IPv4Address("0.0.0.1"))
+        self.assertEqual(request.name, "Johnny")
+        self.assertEqual(request.domainname, "www.google.com")
+
+    def test_greeting_request_not_enough_data(self):
+        raw_data = struct.pack(
+            "!BBH4B6sB14sB", 0x4, 0x1, 5580, 0, 0, 0, 1, "Johnny".encode("ascii"), 0, "www.google.com".encode("idna"), 0)
+        for i in range(len(raw_data)):
+            self.assertIsInstance(read_greeting_request(raw_data[:i]), NeedMoreData)
+
+        raw_data = struct.pack("!BB3B", 0x5, 0x3, 0x00, 0x01, 0x02)
+        for i in range(len(raw_data)):
+            self.assertIsInstance(read_greeting_request(raw_data[:i]), NeedMoreData)
+
+    def test_greeting_request_failed_invalid_version(self):
+        with self.assertRaises(ParserError):
+            read_greeting_request(
+                struct.pack("!BB2B", 0x3, 0x3, 0x00, 0x01))
+
+    def test_greeting_response_socks5(self):
+        response = read_greeting_response(
+            struct.pack("!BB", 0x5, 0x0))
+        self.assertIsInstance(response, GreetingResponse)
+        self.assertEqual(response.auth_type, 0)
+
+    def test_greeting_response_socks4(self):
+        raw_data = struct.pack("!BBH4B", 0, 0x5a, 5580, 127, 0, 0, 1)
+        response = read_greeting_response(raw_data)
+        self.assertIsInstance(response, Socks4Response)
+        self.assertEqual(response.status, 0x5a)
+        self.assertEqual(response.port, 5580)
+        self.assertEqual(response.addr, ipaddress.IPv4Address("127.0.0.1"))
+
+    def test_greeting_response_not_enough_data(self):
+        self.assertIsInstance(read_greeting_response(b""), NeedMoreData)
+        self.assertIsInstance(read_greeting_response(b"\x05"), NeedMoreData)
+        self.assertIsInstance(read_greeting_response(b"\x00\x5a\x15"), NeedMoreData)
+
+    def test_greeting_response_failed_incorrect_version(self):
+        with self.assertRaises(ParserError):
+            read_greeting_response(
+                struct.pack("!B", 0x1))
+
+    def test_read_request_ipv4(self):
+        request = read_request(
+            struct.pack("!BBxB4BH", 0x5, 0x1, 0x1, 127, 0, 0, 1, 8080))
+        self.assertEqual(request.cmd, 1)
+        self.assertEqual(request.atyp, 1)
+        self.assertEqual(request.addr, ipaddress.IPv4Address("127.0.0.1"))
+        self.assertEqual(request.port, 8080)
+
+    def test_read_request_ipv6(self):
+        request = read_request(
+            struct.pack("!BBxB8HH",
+                        0x5, 0x1, 0x4,
+                        0x2001, 0xdb8, 0, 0, 0, 0, 0, 1,
+                        8080))
+        self.assertEqual(request.atyp, 4)
+        self.assertEqual(request.addr, ipaddress.IPv6Address("2001:db8::1"))
+        self.assertEqual(request.port, 8080)
+
+    def test_read_request_hostname(self):
+        request = read_request(
+            struct.pack("!BBxBB10sH", 0x5, 0x1, 0x3, 10, b"google.com", 8080))
+        self.assertEqual(request.atyp, 3)
+        self.assertEqual(request.addr, "google.com")
+        self.assertEqual(request.port, 8080)
+
+    def test_read_request_not_enough_data(self):
+        raw_data = struct.pack("!BBxBB10sH", 0x5, 0x1, 0x3, 10, b"google.com", 8080)
+        for i in range(len(raw_data)):
+            self.assertIsInstance(read_request(raw_data[:i]), NeedMoreData)
+
+    def test_read_request_failed_incorrect_version(self):
+        with self.assertRaises(ParserError):
+            read_request(
+                struct.pack("!B", 0x4))
+
+    def test_read_request_failed_incorrect_address_type(self):
+        with self.assertRaises(ParserError):
+            read_request(
+                struct.pack("!BBxB", 0x5, 0x1, 0x2))
+
+    def test_read_response_ipv4(self):
+        response = read_response(
+            struct.pack("!BBxB4BH", 0x5, 0x0, 0x1, 127, 0, 0, 1, 8080))
+        self.assertEqual(response.status, 0)
+        self.assertEqual(response.atyp, 1)
+        self.assertEqual(response.addr, ipaddress.IPv4Address("127.0.0.1"))
+        self.assertEqual(response.port, 8080)
+
+    def test_read_response_hostname(self):
+        response = read_response(
+            struct.pack("!BBxBB10sH", 0x5, 0x0, 0x3, 10, b"google.com", 8080))
+        self.assertEqual(response.atyp, 3)
+        self.assertEqual(response.addr, "google.com")
+
+    def test_read_response_failed_incorrect_version(self):
+        with self.assertRaises(ParserError):
+            read_response(
+                struct.pack("!B", 0x4))
+
+    def test_same_events_as_construct_backend(self):
+        samples = [
+            (read_greeting_request, _reader.read_greeting_request, struct.pack("!BB3B", 0x5, 0x3, 0x00, 0x01, 0x02)),
+            (read_greeting_request, _reader.read_greeting_request,
+             struct.pack("!BBH4B6sB", 0x4, 0x2, 5580, 10, 0, 0, 1, b"Johnny", 0)),
+            (read_greeting_request, _reader.read_greeting_request,
+             struct.pack("!BBH4B6sB10sB", 0x4, 0x1, 5580, 0, 0, 0, 1, b"Johnny", 0, b"google.com", 0)),
+            (read_greeting_response, _reader.read_greeting_response, struct.pack("!BB", 0x5, 0x2)),
+            (read_greeting_response, _reader.read_greeting_response, struct.pack("!BBH4B", 0, 0x5b, 80, 1, 2, 3, 4)),
+            (read_request, _reader.read_request, struct.pack("!BBxB8HH", 0x5, 0x1, 0x4, 0xfe80, 0, 0, 0, 0, 0, 0, 1, 443)),
+            (read_response, _reader.read_response, struct.pack("!BBxBB10sH", 0x5, 0x4, 0x3, 10, b"google.com", 80)),
+        ]
+        for struct_read, construct_read, raw_data in samples:
+            struct_event = struct_read(raw_data)
+            construct_event = construct_read(raw_data)
+            self.assertIs(type(struct_event), type(construct_event))
+            for field in _FIELDS[struct_event.event_type]:
+                self.assertEqual(getattr(struct_event, field), getattr(construct_event, field))
+
+    def test_non_ascii_names_rejected(self):
+        samples = [
+            (read_greeting_request, _reader.read_greeting_request,
+             struct.pack("!BBH4B6sB", 0x4, 0x1, 5580, 10, 0, 0, 1, b"J\xffhnny", 0)),
+            (read_greeting_request, _reader.read_greeting_request,
+             struct.pack("!BBH4B6sB10sB", 0x4, 0x1, 5580, 0, 0, 0, 1, b"Johnny", 0, b"g\xffogle.com", 0)),
+            (read_request, _reader.read_request, struct.pack("!BBxBB2sH", 0x5, 0x1, 0x3, 2, b"\xff\xfe", 80)),
+            (read_response, _reader.read_response, struct.pack("!BBxBB2sH", 0x5, 0x0, 0x3, 2, b"\xff\xfe", 80)),
+        ]
+        for struct_read, construct_read, raw_data in samples:
+            with self.assertRaises(ParserError):
+                struct_read(raw_data)
+            with self.assertRaises(ParserError):
+                construct_read(raw_data)
+
+    def test_empty_socks4a_domain_rejected(self):
+        raw_data = b"\x04\x01\x00P\x00\x00\x00\x01user\x00\x00"
+        for read in (read_greeting_request, _reader.read_greeting_request):
+            with self.assertRaises(ParserError):
+                read(raw_data)
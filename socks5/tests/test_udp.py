@@ -0,0 +1,126 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import unittest
+import struct
+import ipaddress
+
+from socks5.exception import ParserError
+from socks5.events import UDPDatagram
+from socks5.define import ADDR_TYPE
+from socks5 import udp
+
+_BACKENDS = ("construct", "struct")
+
+
+class TestUDPDatagram(unittest.TestCase):
+    IPV4_DATAGRAM = struct.pack("!HBB4BH", 0, 0, 0x1, 127, 0, 0, 1, 53) + b"payload"
+    IPV6_DATAGRAM = struct.pack("!HBB16sH", 0, 0, 0x4, b"\x00" * 15 + b"\x01", 53) + b"payload"
+    DOMAIN_DATAGRAM = struct.pack("!HBBB11sH", 0, 0x81, 0x3, 11, b"example.com", 53) + b"payload"
+
+    def test_event(self):
+        event = UDPDatagram(0, ADDR_TYPE["IPV4"], "127.0.0.1", 53, b"payload")
+        self.assertEqual(event, "UDPDatagram")
+        self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
+        self.assertEqual(event.data, b"payload")
+
+        with self.assertRaises(ValueError):
+            UDPDatagram(0x100, ADDR_TYPE["IPV4"], "127.0.0.1", 53)
+
+        with self.assertRaises(ValueError):
+            UDPDatagram(0, ADDR_TYPE["IPV4"], "::1", 53)
+
+    def test_read(self):
+        for backend in _BACKENDS:
+            event = udp.read_datagram(self.IPV4_DATAGRAM, backend=backend)
+            self.assertIsInstance(event, UDPDatagram)
+            self.assertEqual(event.frag, 0)
+            self.assertEqual(event.atyp, ADDR_TYPE["IPV4"])
+            self.assertEqual(event.addr, ipaddress.IPv4Address("127.0.0.1"))
+            self.assertEqual(event.port, 53)
+            self.assertEqual(event.data, b"payload")
+
+            event = udp.read_datagram(self.IPV6_DATAGRAM, backend=backend)
+            self.assertEqual(event.addr, ipaddress.IPv6Address("::1"))
+            self.assertEqual(event.data, b"payload")
+
+            event = udp.read_datagram(self.DOMAIN_DATAGRAM, backend=backend)
+            self.assertEqual(event.frag, 0x81)
+            self.assertEqual(event.addr, "example.com")
+            self.assertEqual(event.port, 53)
+            self.assertEqual(event.data, b"payload")
+
+    def test_read_payload_not_copied(self):
+        for backend in _BACKENDS:
+            buf = bytearray(self.IPV4_DATAGRAM)
+            event = udp.read_datagram(buf, backend=backend)
+            self.assertIsInstance(event.data, memoryview)
+
+            buf[-7:] = b"PAYLOAD"
+            self.assertEqual(event.data, b"PAYLOAD")
+
+    def test_read_header_copied(self):
+        for backend in _BACKENDS:
+            buf = bytearray(struct.pack("!HBB4BH", 0, 0, 0x1, 8, 8, 8, 8, 53) + b"payload")
+            event = udp.read_datagram(buf, backend=backend)
+            buf[:10] = struct.pack("!HBB4BH", 0, 0, 0x1, 1, 1, 1, 1, 80)
+            self.assertEqual(event.addr, ipaddress.IPv4Address("8.8.8.8"))
+            self.assertEqual(event.port, 53)
+
+    def test_read_empty_payload(self):
+        for backend in _BACKENDS:
+            event = udp.read_datagram(self.IPV4_DATAGRAM[:-7], backend=backend)
+            self.assertEqual(event.data, b"")
+
+    def test_read_malformed(self):
+        for backend in _BACKENDS:
+            for i in range(10):
+                with self.assertRaises(ParserError):
+                    udp.read_datagram(self.IPV4_DATAGRAM[:i], backend=backend)
+
+            with self.assertRaises(ParserError):
+                udp.read_datagram(b"\x00\x01" + self.IPV4_DATAGRAM[2:], backend=backend)
+
+            with self.assertRaises(ParserError):
+                udp.read_datagram(b"\x00\x00\x00\x05" + self.IPV4_DATAGRAM[4:], backend=backend)
+
+            with self.assertRaises(ParserError):
+                udp.read_datagram(b"\x00\x00\x00\x03\x02\xff\xfe\x00\x35payload", backend=backend)
+
+    def test_write(self):
+        for backend in _BACKENDS:
+            event = UDPDatagram(0, ADDR_TYPE["IPV4"], "127.0.0.1", 53, b"payload")
+            self.assertEqual(udp.write_datagram(event, backend=backend), self.IPV4_DATAGRAM)
+
+            event = UDPDatagram(0, ADDR_TYPE["IPV6"], "::1", 53, memoryview(b"payload"))
+            self.assertEqual(udp.write_datagram(event, backend=backend), self.IPV6_DATAGRAM)
+
+            event = UDPDatagram(0x81, ADDR_TYPE["DOMAINNAME"], "example.com", 53, b"payload")
+            self.assertEqual(udp.write_datagram(event, backend=backend), self.DOMAIN_DATAGRAM)
+
+    def test_write_into(self):
+        for backend in _BACKENDS:
+            event = UDPDatagram(0x81, ADDR_TYPE["DOMAINNAME"], "example.com", 53, b"payload")
+            buf = bytearray(64)
+            length = udp.write_datagram_into(event, buf, 4, backend=backend)
+            self.assertEqual(length, len(self.DOMAIN_DATAGRAM))
+            self.assertEqual(bytes(buf[4:4 + length]), self.DOMAIN_DATAGRAM)
+
+            with self.assertRaises(ValueError):
+                udp.write_datagram_into(event, bytearray(length - 1), backend=backend)
+
+    def test_write_header_only(self):
+        for backend in _BACKENDS:
+            event = UDPDatagram(0, ADDR_TYPE["IPV4"], "127.0.0.1", 53)
+            buf = bytearray(32)
+            length = udp.write_datagram_into(event, memoryview(buf), backend=backend)
+            self.assertEqual(bytes(buf[:length]), self.IPV4_DATAGRAM[:-7])
+
+    def test_relay(self):
+        # NOTE: a parsed datagram can be written back without copying its payload first.
+        for backend in _BACKENDS:
+            event = udp.read_datagram(self.DOMAIN_DATAGRAM, backend=backend)
+            self.assertEqual(udp.write_datagram(event, backend=backend), self.DOMAIN_DATAGRAM)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            udp.read_datagram(self.IPV4_DATAGRAM, backend="missing")
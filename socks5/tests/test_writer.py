@@ -14,7 +14,11 @@ from socks5.define import (
 
 from socks5._writer import (
     write_greeting_request, write_greeting_response,
-    write_request, write_response)
+    write_request, write_response, write_response_into)
+
+
+def _slot_values(event):
+    return dict((name, getattr(event, name, None)) for name in event.__slots__)
 
 
 class TestWriter(unittest.TestCase):
@@ -97,3 +101,26 @@ class TestWriter(unittest.TestCase):
         data = write_response(event)
         expected_data = struct.pack("!BBxBB10sH", 0x5, 0x0, 0x3, 10, b"google.com", 8080)
         self.assertEqual(data, expected_data)
+
+    def test_write_does_not_modify_event(self):
+        event = Request(REQ_COMMAND["CONNECT"], ADDR_TYPE["IPV4"], u"127.0.0.1", 8080)
+        expected_fields = _slot_values(event)
+        write_request(event)
+        self.assertEqual(_slot_values(event), expected_fields)
+
+        event = Socks4Response(0x5a, "127.0.0.1", 5580)
+        expected_fields = _slot_values(event)
+        write_greeting_response(event)
+        self.assertEqual(_slot_values(event), expected_fields)
+
+    def test_write_response_into(self):
+        event = Response(RESP_STATUS["SUCCESS"], ADDR_TYPE["DOMAINNAME"], u"google.com", 8080)
+        buf = bytearray(20)
+        length = write_response_into(event, buf, 2)
+        expected_data = struct.pack("!BBxBB10sH", 0x5, 0x0, 0x3, 10, b"google.com", 8080)
+        self.assertEqual(length, len(expected_data))
+        self.assertEqual(bytes(buf[2:2 + length]), expected_data)
+        self.assertEqual(len(buf), 20)
+
+        with self.assertRaises(ValueError):
+            write_response_into(event, bytearray(20), 10)
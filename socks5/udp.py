@@ -0,0 +1,75 @@
+"""
+Codec of the datagrams relayed through a socks5 udp association.
+
+Once a UDP_ASSOCIATE request has been answered, every datagram between the
+client and the relay carries the udp request header defined in section 7 of
+rfc1928: RSV FRAG ATYP DST.ADDR DST.PORT, followed by the payload. Datagrams
+are not part of the connection state machine, each one is parsed and built on
+its own with the codec backend of the caller's choice.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import importlib
+
+from socks5.connection import BACKENDS, _backend_name
+
+# NOTE: the (reader, writer) modules of each backend, imported on first use.
+_codecs = {}
+
+
+def _codec(backend):
+    backend = _backend_name(backend)
+    try:
+        return _codecs[backend]
+    except KeyError:
+        pass
+
+    codec = tuple(importlib.import_module(name) for name in BACKENDS[backend])
+    _codecs[backend] = codec
+    return codec
+
+
+def read_datagram(data, backend=None):
+    """
+    Parse a datagram received from the client or the relay.
+
+    Args:
+        data (bytes/bytearray/memoryview): the whole datagram.
+        backend (str): the codec backend, "construct" or "struct".
+
+    Return:
+        An UDPDatagram event. Its data attribute is a memoryview of the
+        payload within data, which is not copied.
+
+    Raise:
+        ParserError: the header is incomplete or malformed.
+    """
+    return _codec(backend)[0].read_udp_datagram(data)
+
+
+def write_datagram(event, backend=None):
+    """
+    Return the datagram of an UDPDatagram event, header and payload.
+    """
+    return _codec(backend)[1].write_udp_datagram(event)
+
+
+def write_datagram_into(event, buf, offset=0, backend=None):
+    """
+    Serialize the datagram straight into a caller-owned buffer.
+
+    An event with an empty payload only writes the header, the payload can
+    then be received right behind it, e.g. with sock.recv_into.
+
+    Args:
+        event (UDPDatagram): the datagram to send.
+        buf (bytearray/memoryview): a writable buffer.
+        offset (int): the position in buf to write the datagram at.
+
+    Return:
+        The number of bytes written.
+
+    Raise:
+        ValueError: buf is too small to hold the datagram at offset.
+    """
+    return _codec(backend)[1].write_udp_datagram_into(event, buf, offset)